@@ -34,19 +34,25 @@ if "bpy" in locals():
     importlib.reload(utils)
     importlib.reload(ui)
 else:
-    # Running under external instance
-    import bpy
-    from . src import *
-    from . src.instruments import Instruments, MIDIAnimatorObjectProperties, MIDIAnimatorCollectionProperties, MIDIAnimatorSceneProperties
-    from . utils import *
-    from . utils.logger import logger
-    from . ui import *
-    from . ui.operators import SCENE_OT_quick_add_props, SCENE_OT_copy_log
-    from . ui.panels import VIEW3D_PT_edit_instrument_information, VIEW3D_PT_edit_object_information, VIEW3D_PT_add_notes_quick
+    try:
+        import bpy
+    except ModuleNotFoundError:
+        # imported without Blender (e.g. by the tests), only the modules that don't need bpy (the MIDI parsing, algorithms and data structures) can be used
+        bpy = None
 
+    if bpy is not None:
+        # Running under external instance
+        from . src import *
+        from . src.instruments import Instruments, MIDIAnimatorObjectProperties, MIDIAnimatorCollectionProperties, MIDIAnimatorSceneProperties
+        from . utils import *
+        from . utils.logger import logger
+        from . ui import *
+        from . ui.operators import SCENE_OT_quick_add_props, SCENE_OT_copy_log
+        from . ui.panels import VIEW3D_PT_edit_instrument_information, VIEW3D_PT_edit_object_information, VIEW3D_PT_add_notes_quick
 
 
-classes = (SCENE_OT_quick_add_props, SCENE_OT_copy_log, VIEW3D_PT_edit_instrument_information, VIEW3D_PT_edit_object_information, VIEW3D_PT_add_notes_quick, MIDIAnimatorObjectProperties, MIDIAnimatorCollectionProperties, MIDIAnimatorSceneProperties)
+if bpy is not None:
+    classes = (SCENE_OT_quick_add_props, SCENE_OT_copy_log, VIEW3D_PT_edit_instrument_information, VIEW3D_PT_edit_object_information, VIEW3D_PT_add_notes_quick, MIDIAnimatorObjectProperties, MIDIAnimatorCollectionProperties, MIDIAnimatorSceneProperties)
 
 def register():
     for bpyClass in classes:
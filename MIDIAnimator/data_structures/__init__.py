@@ -1,11 +1,13 @@
 from __future__ import annotations
-from typing import Tuple, List, Dict, Union, Optional
-from mathutils import Vector, Euler
+from typing import Tuple, List, Dict, Union, Optional, TYPE_CHECKING
 from dataclasses import dataclass
+from bisect import bisect_left
 from numpy import add as npAdd
-from ..utils.blender import *
+import numpy as np
 from ..data_structures.midi import MIDINote
-import bpy
+
+if TYPE_CHECKING:
+    import bpy
 
 @dataclass
 class Keyframe:
@@ -23,6 +25,328 @@ class Keyframe:
     def __hash__(self) -> int:
         return hash((self.frame, self.value))
 
+class KeyframeArray:
+    """A list of keyframes stored as two float arrays, one for the frames and one for the values.
+    this is what the animation pipeline passes around instead of `List[Keyframe]`, so the keyframes of a FCurve can be sorted, merged and sliced with NumPy.
+    the arrays have spare capacity (doubled when full), so appending keyframes or rewriting the last keyframes does not copy the whole array.
+
+    :param frames: the frames of the keyframes (x), defaults to None (empty)
+    :param values: the values of the keyframes (y), defaults to None (empty)
+    """
+    _frames: np.ndarray
+    _values: np.ndarray
+    _size: int
+
+    def __init__(self, frames=None, values=None):
+        frames = np.array(frames if frames is not None else (), dtype=np.float64).reshape(-1)
+        values = np.array(values if values is not None else (), dtype=np.float64).reshape(-1)
+
+        if len(frames) != len(values):
+            raise ValueError(f"KeyframeArray needs the same number of frames and values (got {len(frames)} frames and {len(values)} values)!")
+
+        self._frames = frames
+        self._values = values
+        self._size = len(frames)
+
+    @property
+    def frames(self) -> np.ndarray:
+        """the frames of the keyframes (a view, it changes when the keyframes change)"""
+        return self._frames[:self._size]
+
+    @property
+    def values(self) -> np.ndarray:
+        """the values of the keyframes (a view, it changes when the keyframes change)"""
+        return self._values[:self._size]
+
+    def _reserve(self, size: int) -> None:
+        """makes room for `size` keyframes, the capacity is at least doubled so appending is amortized O(1) per keyframe"""
+        if size <= len(self._frames):
+            return
+
+        capacity = max(size, 2 * len(self._frames), 16)
+        frames = np.empty(capacity)
+        values = np.empty(capacity)
+        frames[:self._size] = self._frames[:self._size]
+        values[:self._size] = self._values[:self._size]
+        self._frames = frames
+        self._values = values
+
+    @classmethod
+    def fromKeyframes(cls, keyframes: List[Keyframe]) -> KeyframeArray:
+        """creates a `KeyframeArray` from a list of `Keyframe`s
+
+        :param List[Keyframe] keyframes: the keyframes
+        :return KeyframeArray: the new `KeyframeArray`
+        """
+        return cls([key.frame for key in keyframes], [key.value for key in keyframes])
+
+    def toKeyframes(self) -> List[Keyframe]:
+        """:return List[Keyframe]: the keyframes as a list of `Keyframe`s"""
+        return [Keyframe(frame, value) for frame, value in zip(self.frames.tolist(), self.values.tolist())]
+
+    def append(self, frames, values) -> None:
+        """appends one or more keyframes to the end
+
+        :param frames: a frame or an array of frames
+        :param values: a value or an array of values (same length as `frames`)
+        """
+        frames = np.asarray(frames, dtype=np.float64).reshape(-1)
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+
+        if len(frames) != len(values):
+            raise ValueError(f"KeyframeArray needs the same number of frames and values (got {len(frames)} frames and {len(values)} values)!")
+
+        start = self._size
+        self._reserve(start + len(frames))
+        self._frames[start:start + len(frames)] = frames
+        self._values[start:start + len(values)] = values
+        self._size = start + len(frames)
+
+    def extend(self, other: KeyframeArray) -> None:
+        """appends all keyframes of another `KeyframeArray` to the end
+
+        :param KeyframeArray other: the keyframes to append
+        """
+        self.append(other.frames, other.values)
+
+    def replace(self, frames: np.ndarray, values: np.ndarray) -> None:
+        """replaces all keyframes (used by the mutating overlap functions)
+
+        :param np.ndarray frames: the new frames
+        :param np.ndarray values: the new values
+        """
+        self.replaceTail(0, frames, values)
+
+    def replaceTail(self, start: int, frames: np.ndarray, values: np.ndarray) -> None:
+        """replaces the keyframes from index `start` to the end, the keyframes before `start` are not touched
+
+        :param int start: index of the first keyframe to replace
+        :param np.ndarray frames: the new frames
+        :param np.ndarray values: the new values
+        """
+        # copy first, the new keyframes might be a view of the keyframes that get overwritten
+        frames = np.array(frames, dtype=np.float64).reshape(-1)
+        values = np.array(values, dtype=np.float64).reshape(-1)
+
+        self._size = min(max(start, 0), self._size)
+        self.append(frames, values)
+
+    def truncate(self, size: int) -> None:
+        """removes the keyframes from index `size` to the end
+
+        :param int size: the number of keyframes to keep
+        """
+        self._size = min(max(size, 0), self._size)
+
+    def copy(self) -> KeyframeArray:
+        """:return KeyframeArray: a copy of the keyframes"""
+        return KeyframeArray(self.frames.copy(), self.values.copy())
+
+    def sort(self) -> None:
+        """sorts the keyframes by frame. the sort is stable, keyframes on the same frame keep their order"""
+        order = np.argsort(self.frames, kind="stable")
+        self._frames[:self._size] = self.frames[order]
+        self._values[:self._size] = self.values[order]
+
+    def merge(self, other: KeyframeArray) -> KeyframeArray:
+        """merges two sorted `KeyframeArray`s. keyframes on the same frame keep their order, with the keyframes of `self` first
+
+        :param KeyframeArray other: the keyframes to merge with
+        :return KeyframeArray: the merged keyframes, sorted by frame
+        """
+        out = KeyframeArray(np.concatenate((self.frames, other.frames)), np.concatenate((self.values, other.values)))
+        out.sort()
+        return out
+
+    def frameRange(self, startFrame: float, endFrame: float) -> KeyframeArray:
+        """gets the keyframes between two frames (inclusive). the keyframes must be sorted
+
+        :param float startFrame: the first frame
+        :param float endFrame: the last frame
+        :return KeyframeArray: the keyframes from `startFrame` to `endFrame`
+        """
+        start = np.searchsorted(self.frames, startFrame, side="left")
+        end = np.searchsorted(self.frames, endFrame, side="right")
+        return KeyframeArray(self.frames[start:end], self.values[start:end])
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        for frame, value in zip(self.frames.tolist(), self.values.tolist()):
+            yield Keyframe(frame, value)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Keyframe, KeyframeArray]:
+        if isinstance(index, slice):
+            return KeyframeArray(self.frames[index], self.values[index])
+
+        return Keyframe(float(self.frames[index]), float(self.values[index]))
+
+    def __repr__(self) -> str:
+        return f"KeyframeArray({self.toKeyframes()})"
+
+def _segmentValues(x1, y1, x2, y2, slopes, frames):
+    """evaluates linear segments (x1, y1) - (x2, y2) with the given slopes, this is the interpolation `LinearCurve` and `LinearCurves` share.
+    the point-slope form is used, so a frame on a keyframe gives back the keyframe's exact value (a resting key stays 0)
+
+    :return: the value of each segment at its frame
+    """
+    return np.where(frames == x2, y2, y1 + slopes * (frames - x1))
+
+def _segmentSlopes(frames: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """gets the slope of each segment (frames[i], frames[i+1]), keyframes on the same frame have a slope of 0
+
+    :return np.ndarray: the slopes (one less than the number of keyframes)
+    """
+    dx = np.diff(frames)
+    dy = np.diff(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(dx != 0, dy / np.where(dx != 0, dx, 1), 0)
+
+class LinearCurve:
+    """A piecewise linear curve through sorted keyframes, the curve is flat (first/last value) outside of the keyframes.
+    the slope of every segment is computed once, and the segment of a frame is found with a binary search.
+    this gives the same values as `getValue(*interval(keyList, frame), frame)` in `algorithms` (up to rounding, keyframes give back their exact value)
+
+    :param frames: the sorted frames of the keyframes (x)
+    :param values: the values of the keyframes (y)
+    :raises ValueError: if there are no keyframes, or not the same number of frames and values
+    """
+    frames: np.ndarray
+    values: np.ndarray
+    slopes: np.ndarray
+
+    def __init__(self, frames, values):
+        self.frames = np.asarray(frames, dtype=np.float64).reshape(-1)
+        self.values = np.asarray(values, dtype=np.float64).reshape(-1)
+
+        if len(self.frames) != len(self.values):
+            raise ValueError(f"LinearCurve needs the same number of frames and values (got {len(self.frames)} frames and {len(self.values)} values)!")
+        if len(self.frames) == 0:
+            raise ValueError("LinearCurve needs at least one keyframe!")
+
+        self.slopes = _segmentSlopes(self.frames, self.values)
+
+        # for the binary search of single frames
+        self._frameList = self.frames.tolist()
+
+    @classmethod
+    def fromKeyframes(cls, keyframes: Union[KeyframeArray, List[Keyframe]]) -> LinearCurve:
+        """creates a `LinearCurve` from sorted keyframes
+
+        :param Union[KeyframeArray, List[Keyframe]] keyframes: the keyframes
+        :return LinearCurve: the curve
+        """
+        if isinstance(keyframes, KeyframeArray):
+            return cls(keyframes.frames, keyframes.values)
+
+        return cls([key.frame for key in keyframes], [key.value for key in keyframes])
+
+    def segment(self, frame: float) -> int:
+        """gets the index of the first segment (frames[i], frames[i+1]) that contains the frame, clamped to the first/last segment
+
+        :param float frame: the frame
+        :return int: the segment index `i`
+        """
+        return min(max(bisect_left(self._frameList, frame) - 1, 0), max(len(self._frameList) - 2, 0))
+
+    def evaluate(self, frames: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """evaluates the curve
+
+        :param Union[float, np.ndarray] frames: a frame or an array of frames
+        :return Union[float, np.ndarray]: the value at the frame, or an array with the value at each frame
+        """
+        if np.ndim(frames) == 0:
+            # out of range, use the first/last value
+            if len(self.slopes) == 0 or frames < self._frameList[0]:
+                return float(self.values[0])
+            if frames > self._frameList[-1]:
+                return float(self.values[-1])
+
+            i = self.segment(frames)
+            return float(_segmentValues(self.frames[i], self.values[i], self.frames[i + 1], self.values[i + 1], self.slopes[i], frames))
+
+        frames = np.asarray(frames, dtype=np.float64)
+        if len(self.slopes) == 0:
+            return np.full(frames.shape, self.values[0])
+
+        i = np.clip(np.searchsorted(self.frames, frames, side="left") - 1, 0, len(self.slopes) - 1)
+        out = _segmentValues(self.frames[i], self.values[i], self.frames[i + 1], self.values[i + 1], self.slopes[i], frames)
+
+        # out of range, use the first/last value
+        out[frames < self.frames[0]] = self.values[0]
+        out[frames > self.frames[-1]] = self.values[-1]
+        return out
+
+    def __call__(self, frames: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        return self.evaluate(frames)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __repr__(self) -> str:
+        return f"LinearCurve(frames={self.frames.tolist()}, values={self.values.tolist()})"
+
+class LinearCurves:
+    """Many piecewise linear curves (e.g. one for each note) stored back to back, so they can all be evaluated with one binary search.
+    every curve evaluates like a `LinearCurve` of its own keyframes (flat outside of them)
+
+    :param List[KeyframeArray] keyframes: the sorted keyframes of each curve, none of them empty
+    :raises ValueError: if there are no curves or a curve has no keyframes
+    """
+    frames: np.ndarray
+    values: np.ndarray
+    slopes: np.ndarray
+    firsts: np.ndarray
+    lasts: np.ndarray
+
+    def __init__(self, keyframes: List[KeyframeArray]):
+        if len(keyframes) == 0:
+            raise ValueError("LinearCurves needs at least one curve!")
+
+        lengths = np.array([len(keys) for keys in keyframes])
+        if not lengths.all():
+            raise ValueError("LinearCurves needs at least one keyframe for each curve!")
+
+        self.frames = np.concatenate([keys.frames for keys in keyframes])
+        self.values = np.concatenate([keys.values for keys in keyframes])
+        self.lasts = np.cumsum(lengths) - 1
+        self.firsts = self.lasts - lengths + 1
+
+        # the segment after each curve's last keyframe belongs to no curve, it is flat
+        self.slopes = np.append(_segmentSlopes(self.frames, self.values), 0)
+        self.slopes[self.lasts] = 0
+
+        # every curve's frames are moved past the previous curve's, so the frames of all curves are sorted together
+        self._span = self.frames.max() - self.frames.min() + 1
+        self._shifted = self.frames + np.repeat(np.arange(len(keyframes)) * self._span, lengths)
+
+    def evaluate(self, curves: np.ndarray, frames: np.ndarray) -> np.ndarray:
+        """evaluates the curve `curves[k]` at `frames[k]` for every k
+
+        :param np.ndarray curves: the index of the curve for each frame
+        :param np.ndarray frames: the frames
+        :return np.ndarray: the value of each curve at its frame
+        """
+        curves = np.asarray(curves, dtype=np.int64)
+        frames = np.asarray(frames, dtype=np.float64)
+        firsts, lasts = self.firsts[curves], self.lasts[curves]
+
+        i = np.searchsorted(self._shifted, frames + curves * self._span, side="left") - 1
+        i = np.clip(i, firsts, np.maximum(lasts - 1, firsts))
+        j = np.minimum(i + 1, lasts)
+        out = _segmentValues(self.frames[i], self.values[i], self.frames[j], self.values[j], self.slopes[i], frames)
+
+        # out of range, use the first/last value
+        out = np.where(frames < self.frames[firsts], self.values[firsts], out)
+        return np.where(frames > self.frames[lasts], self.values[lasts], out)
+
+    def __len__(self) -> int:
+        return len(self.firsts)
+
+    def __repr__(self) -> str:
+        return f"LinearCurves({len(self)} curves, {len(self.frames)} keyframes)"
+
 @dataclass
 class KeyframeSeconds:
     """A simple keyframe data structure for time in seconds.
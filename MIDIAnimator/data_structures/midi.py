@@ -1,10 +1,16 @@
 from __future__ import annotations
-from .. utils import removeDuplicates, gmProgramToName, _closestTempo
+from .. utils import removeDuplicates, gmProgramToName
 from .. utils.logger import logger
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Iterator, Union
 from dataclasses import dataclass
+from collections import deque
+from operator import itemgetter
 from .. libs import mido
+from .. libs.mido.midifiles.midifiles import read_file_header, read_chunk_header
 from sys import modules
+import numpy as np
+import heapq
+import bisect
 
 @dataclass
 class MIDINote:
@@ -15,6 +21,7 @@ class MIDINote:
     :param int velocity: MIDI velocity of the note, 0-127.
     :param float timeOn: Time the note was turned on, in seconds.
     :param float timeOff: Time the note was turned off, in seconds.
+    :param int voice: Voice (polyphony lane) of the note, set by `MIDITrack.allocateVoices()`, defaults to -1 (not allocated).
     :return: None
     """
     channel: int
@@ -22,6 +29,7 @@ class MIDINote:
     velocity: int
     timeOn: float
     timeOff: float
+    voice: int = -1
     
     def __lt__(self, other):
         return self.timeOn < other.timeOn
@@ -56,6 +64,9 @@ class MIDITrack:
     # key= (channel, noteNumber), value=List[MIDINote]
     _noteTable: Dict[Tuple[int, int], List[MIDINote]]
 
+    # number of voices found by allocateVoices(), 0 if it has not been called
+    voiceCount: int
+
     def __init__(self, name: str):
         """initialize a MIDITrack
 
@@ -70,6 +81,8 @@ class MIDITrack:
 
         self._noteTable = dict()
 
+        self.voiceCount = 0
+
     def addNoteOn(self, channel: int, noteNumber: int, velocity: int, timeOn: float) -> None:
         """adds a Note Event
 
@@ -147,6 +160,112 @@ class MIDITrack:
         """
         self.aftertouch.append(MIDIEvent(channel, value, time))
 
+    def allocateVoices(self, duration: float=None) -> int:
+        """assigns every note a voice (polyphony lane) so that notes on the same voice never overlap,
+        always using the lowest free voice. instruments can use this to size their object pools up front.
+        a voice is free again on the time its note ends, like `CacheInstance`, so the number of voices is `maxSimultaneousObjects()` of the notes.
+
+        :param float duration: if given, every note lasts this long (in seconds) instead of until its `timeOff`, defaults to None
+        :return int: the number of voices needed
+        """
+        # (start time, end time, note), notes that start together are allocated shortest first
+        spans = []
+        for note in self.notes:
+            start = note.timeOn
+            end = start + duration if duration is not None else max(note.timeOff, start)
+            spans.append((start, end, note))
+        spans.sort(key=lambda span: (span[0], span[1]))
+
+        # (end time, voice) of the voices that are in use
+        busy = []
+        # voices that are free again
+        free = []
+        voiceCount = 0
+
+        for start, end, note in spans:
+            # a voice can be reused from the time its note ends (like CacheInstance)
+            while busy and busy[0][0] <= start:
+                heapq.heappush(free, heapq.heappop(busy)[1])
+
+            if free:
+                voice = heapq.heappop(free)
+            else:
+                voice = voiceCount
+                voiceCount += 1
+
+            note.voice = voice
+            heapq.heappush(busy, (end, voice))
+
+        self.voiceCount = voiceCount
+        return voiceCount
+
+    def quantize(self, fps: float, collapsePolicy: str="max") -> int:
+        """snaps the note times to a frame grid and collapses notes with the same note number that land on the same frame.
+        the collapsed note ends at the latest `timeOff` of the notes it replaces (if the kept note has a note off),
+        and every note with a note off ends at least one frame after it starts.
+
+        :param float fps: frames per second of the grid (usually the scene FPS)
+        :param str collapsePolicy: which note is kept when notes collapse, "max" (highest velocity), "first" or "last", defaults to "max"
+        :return int: the number of notes that were removed
+        """
+        if collapsePolicy not in ("max", "first", "last"):
+            raise ValueError(f"Unknown collapse policy '{collapsePolicy}'! Use 'max', 'first' or 'last'.")
+
+        count = len(self.notes)
+        if count == 0:
+            return 0
+
+        noteNumbers = np.fromiter((note.noteNumber for note in self.notes), dtype=np.int64, count=count)
+        velocities = np.fromiter((note.velocity for note in self.notes), dtype=np.int64, count=count)
+        timesOn = np.fromiter((note.timeOn for note in self.notes), dtype=np.float64, count=count)
+        timesOff = np.fromiter((note.timeOff for note in self.notes), dtype=np.float64, count=count)
+        index = np.arange(count)
+
+        framesOn = np.rint(timesOn * fps)
+        # notes without a note off keep timeOff=-1.0
+        timesOff = np.where(timesOff >= 0, np.rint(timesOff * fps) / fps, timesOff)
+
+        # sort so the note to keep is the first one in each (noteNumber, frame) group
+        if collapsePolicy == "max":
+            order = np.lexsort((index, -velocities, framesOn, noteNumbers))
+        elif collapsePolicy == "first":
+            order = np.lexsort((index, framesOn, noteNumbers))
+        else:
+            order = np.lexsort((-index, framesOn, noteNumbers))
+
+        sortedNotes = noteNumbers[order]
+        sortedFrames = framesOn[order]
+        groupStart = np.ones(count, dtype=bool)
+        groupStart[1:] = (sortedNotes[1:] != sortedNotes[:-1]) | (sortedFrames[1:] != sortedFrames[:-1])
+        starts = np.flatnonzero(groupStart)
+
+        keep = order[starts]
+        # a kept note without a note off stays without one
+        keepOff = np.where(timesOff[keep] >= 0, np.maximum.reduceat(timesOff[order], starts), timesOff[keep])
+
+        # keep the original note order
+        byIndex = np.argsort(keep, kind="stable")
+        keep = keep[byIndex]
+        keepOn = framesOn[keep]
+        keepOff = keepOff[byIndex]
+
+        # short notes can snap to the frame they start on, they end 1 frame later instead
+        keepOff = np.where(keepOff >= 0, np.maximum(keepOff, (keepOn + 1) / fps), keepOff)
+
+        keep = keep.tolist()
+        keepOn = (keepOn / fps).tolist()
+        keepOff = keepOff.tolist()
+
+        notes = []
+        for i, timeOn, timeOff in zip(keep, keepOn, keepOff):
+            note = self.notes[i]
+            note.timeOn = timeOn
+            note.timeOff = timeOff
+            notes.append(note)
+
+        self.notes = notes
+        return count - len(notes)
+
     def _isEmpty(self) -> bool:
         """checks if MIDITrack is empty
 
@@ -231,21 +350,120 @@ class MIDITrack:
 
         return f"<{module}.{qualname} object \"{self.name}\", at {hex(id(self))}>"
 
+def _readTrackOffsets(infile) -> Tuple[int, int, List[int]]:
+    """reads the header of a MIDI file and finds where each track chunk starts, without reading the tracks
+
+    :param infile: the MIDI file, opened in binary mode
+    :return Tuple[int, int, List[int]]: the file type, the ticks per beat and the offset of each track chunk
+    """
+    fileType, numTracks, ticksPerBeat = read_file_header(infile)
+
+    offsets = []
+    for _ in range(numTracks):
+        offsets.append(infile.tell())
+        _, size = read_chunk_header(infile)
+        infile.seek(size, 1)
+
+    return fileType, ticksPerBeat, offsets
+
+class _FileView:
+    """reads a file from its own position, so the tracks of a MIDI file can be read side by side from one file handle"""
+
+    def __init__(self, infile, offset: int):
+        """
+        :param infile: the file, opened in binary mode
+        :param int offset: where to start reading
+        """
+        self._infile = infile
+        self._pos = offset
+
+    def read(self, size: int=-1) -> bytes:
+        self._infile.seek(self._pos)
+        data = self._infile.read(size)
+        self._pos += len(data)
+        return data
+
+def _iterTrackEvents(infile, offset: int, skipChecks: bool=False) -> Iterator[Tuple[int, mido.Message]]:
+    """reads a track chunk a block at a time and yields its messages with the tick they are on.
+    the messages are interned (every equal message is the same frozen message, with a time of 0), so repeated notes aren't stored again.
+    the track is read from its own position, so other tracks can be read from `infile` at the same time
+
+    :param infile: the MIDI file, opened in binary mode
+    :param int offset: where the track chunk starts
+    :param bool skipChecks: trust the file and don't check the data bytes, defaults to False
+    :yield Tuple[int, mido.Message]: the tick and the message
+    """
+    tick = 0
+    for delta, msg in mido.iter_track(_FileView(infile, offset), skip_checks=skipChecks, intern=True):
+        tick += delta
+        yield tick, msg
+
+class _TempoMap:
+    """converts ticks to seconds for a MIDI file with tempo changes, used by `MIDIFile` and `MIDIFile.iterNotes()` so both give the same times"""
+    
+    def __init__(self, ticksPerBeat: int):
+        """
+        :param int ticksPerBeat: the ticks per beat of the MIDI file
+        """
+        self._ticksPerBeat = ticksPerBeat
+
+        # the tempo segments: the tick they start on, the time they start at and the seconds per tick
+        self._ticks = [0]
+        self._seconds = [0.0]
+        self._scales = [mido.tick2second(1, ticksPerBeat, 500000)]
+
+    def addTempo(self, tick: int, tempo: int) -> None:
+        """adds a tempo change, tempo changes need to be added in tick order
+
+        :param int tick: the tick of the tempo change
+        :param int tempo: the new tempo, in microseconds per beat
+        """
+        scale = mido.tick2second(1, self._ticksPerBeat, tempo)
+
+        if tick == self._ticks[-1]:
+            # the last tempo change on a tick wins
+            self._scales[-1] = scale
+        else:
+            self._seconds.append(self.seconds(tick))
+            self._ticks.append(tick)
+            self._scales.append(scale)
+
+    def seconds(self, tick: int) -> float:
+        """
+        :param int tick: the tick, from the start of the file
+        :return float: the time of the tick, in seconds
+        """
+        # messages are usually after the last tempo change that was added
+        if tick >= self._ticks[-1]:
+            i = -1
+        else:
+            i = bisect.bisect_right(self._ticks, tick) - 1
+
+        return self._seconds[i] + (tick - self._ticks[i]) * self._scales[i]
+
 class MIDIFile:
     # lists of tracks
     _tracks = List[MIDITrack]
 
-    def __init__(self, midiFile: str):
+    def __init__(self, midiFile: str, quantizeFps: float=None, collapsePolicy: str="max"):
         """
         open file and store it as data in lists
         tracks with channels and track names, timesOn and off information
         for each track, velocity and MIDI CC info for each track, etc
 
         :param str midiFile: MIDI file path
+        :param float quantizeFps: if given, snap the notes of every track to this frame rate, see `MIDITrack.quantize()`, defaults to None
+        :param str collapsePolicy: which note is kept when notes collapse on the same frame, "max", "first" or "last", defaults to "max"
         """
 
         # store lists of info
         self._tracks = self._parseMIDI(midiFile)
+
+        if quantizeFps is not None:
+            for track in self._tracks:
+                removed = track.quantize(quantizeFps, collapsePolicy)
+                if removed:
+                    logger.info(f"Collapsed {removed} notes on the same frame in track '{track.name}'")
         
 
     def getMIDITracks(self) -> List[MIDITrack]:
@@ -255,6 +473,137 @@ class MIDIFile:
         """
         return self._tracks
 
+    @staticmethod
+    def iterNotes(midiFile: str, tracks: List[Union[int, str]]=None, maxHeld: int=10000) -> Iterator[MIDINote]:
+        """streams the notes of a MIDI file (type 0 and 1) in timeOn order, without loading the whole file.
+        the tracks are decoded a block at a time from one file handle and only the notes that are still playing are held in memory,
+        so this works for MIDI files that are too long to load with `MIDIFile`. the note times are the same as `MIDIFile`'s.
+
+        a note is yielded once it has ended and every note that started before it has ended too,
+        so a note that is held for a long time holds back the notes after it. when more than `maxHeld` notes are held back,
+        the oldest playing note is yielded with a `timeOff` of -1.0 (and its note off is ignored), so memory stays bounded.
+        notes that never get a note off are yielded at the end with a `timeOff` of -1.0 (like `MIDIFile`).
+
+        :param str midiFile: MIDI file path
+        :param List[Union[int, str]] tracks: track indices or track names to get the notes from, defaults to None (all tracks)
+        :param int maxHeld: the most notes to hold back behind a playing note, None to never give up on a note off, defaults to 10000
+        :yield MIDINote: the notes of the selected tracks, sorted by `timeOn`
+        """
+        # use abspath "//"
+        if "bpy" in modules:
+            from bpy.path import abspath
+            midiFile = abspath(midiFile)
+
+        with open(midiFile, "rb") as infile:
+            # find where each track chunk starts
+            fileType, ticksPerBeat, offsets = _readTrackOffsets(infile)
+            assert fileType in range(2), "Type 2 MIDI Files are not supported!"
+            numTracks = len(offsets)
+
+            if tracks is None:
+                selected = set(range(numTracks))
+            else:
+                selected = {track for track in tracks if isinstance(track, int)}
+                names = {track for track in tracks if isinstance(track, str)}
+
+                if names:
+                    # the track name is at the start of the track, stop at the first channel message
+                    for i, offset in enumerate(offsets):
+                        for _, msg in _iterTrackEvents(infile, offset, skipChecks=True):
+                            if msg.type == "track_name":
+                                if msg.name in names:
+                                    selected.add(i)
+                                break
+                            if not msg.is_meta:
+                                break
+
+            def trackEvents(index: int) -> Iterator[Tuple[int, int, mido.Message]]:
+                for tick, msg in _iterTrackEvents(infile, offsets[index], skipChecks=True):
+                    yield tick, index, msg
+
+            # the tempo can change in any track so all of them are read
+            # heapq.merge() keeps messages with the same tick in track order (like mido.merge_tracks())
+            events = heapq.merge(*(trackEvents(i) for i in range(numTracks)), key=itemgetter(0))
+
+            tempoMap = _TempoMap(ticksPerBeat)
+
+            # notes are numbered in the order they start, which is also timeOn order
+            seq = 0
+            # key=(track, channel, noteNumber), value=deque of (seq, MIDINote) that are still playing
+            noteTable = dict()
+            # (seq, key) of the notes still playing, ended notes are removed lazily
+            playing = []
+            ended = set()
+            # (seq, MIDINote) of ended notes waiting for the notes before them to end
+            done = []
+            # key=(track, channel, noteNumber), value=number of note offs to ignore, for notes that were given up on
+            skipNoteOffs = dict()
+
+            for tick, index, msg in events:
+                curType = msg.type
+
+                if curType == "set_tempo":
+                    tempoMap.addTempo(tick, msg.tempo)
+                    continue
+
+                if index not in selected or (curType != "note_on" and curType != "note_off"):
+                    continue
+
+                key = (index, msg.channel, msg.note)
+                time = tempoMap.seconds(tick)
+
+                # velocity 0 note_on messages need to be note_off
+                if curType == "note_on" and msg.velocity > 0:
+                    note = MIDINote(msg.channel, msg.note, msg.velocity, time, timeOff=-1.0)
+
+                    if key in noteTable:
+                        noteTable[key].append((seq, note))
+                    else:
+                        noteTable[key] = deque([(seq, note)])
+
+                    heapq.heappush(playing, (seq, key))
+                    seq += 1
+                    continue
+
+                if skipNoteOffs.get(key):
+                    # the note off of a note that was already yielded
+                    skipNoteOffs[key] -= 1
+                    continue
+
+                # assume the first note on message for this note is the one that matches with this note off
+                notesOn = noteTable.get(key)
+                if not notesOn:
+                    raise RuntimeError("NoteOff message has no NoteOn message! Your MIDI File may be corrupt. Please open an issue on GitHub.")
+
+                noteSeq, note = notesOn.popleft()
+                note.timeOff = time
+                heapq.heappush(done, (noteSeq, note))
+                ended.add(noteSeq)
+
+                while True:
+                    while playing and playing[0][0] in ended:
+                        ended.remove(heapq.heappop(playing)[0])
+
+                    # release the notes that no playing note started before
+                    while done and (not playing or done[0][0] < playing[0][0]):
+                        yield heapq.heappop(done)[1]
+
+                    if maxHeld is None or len(done) <= maxHeld:
+                        break
+
+                    # give up on the note off of the oldest playing note, it is the first note in its noteTable entry
+                    oldKey = heapq.heappop(playing)[1]
+                    heapq.heappush(done, noteTable[oldKey].popleft())
+                    skipNoteOffs[oldKey] = skipNoteOffs.get(oldKey, 0) + 1
+
+        # notes without a note off
+        for notesOn in noteTable.values():
+            for item in notesOn:
+                heapq.heappush(done, item)
+
+        while done:
+            yield heapq.heappop(done)[1]
+
     def _parseMIDI(self, file: str) -> List[MIDITrack]:
         """helper method that takes a MIDI file (instrumentType 0 and 1) and returns a list of `MIDITracks`
 
@@ -266,98 +615,90 @@ class MIDIFile:
         if "bpy" in modules:
             from bpy.path import abspath
             file = abspath(file)
-        
-        midiFile = mido.MidiFile(file)
 
-        assert midiFile.type in range(2), "Type 2 MIDI Files are not supported!"
-
-        if midiFile.type == 0:
-            # Type 0
-            # Tracks depend on MIDI Channels for the different tracks
-            # Instance in 16 MIDI tracks
-            midiTracks = [MIDITrack("") for _ in range(16)]
-        else:
-            # Type 1
-            tempoMap = []
-            midiTracks = []
-
-            time = 0
-            tempo = 500000
-
-            # get tempo map first
-            for msg in mido.merge_tracks(midiFile.tracks):
-                time += mido.tick2second(msg.time, midiFile.ticks_per_beat  , tempo)
-                if msg.type == "set_tempo":
-                    tempo = msg.tempo
-                    tempoMap.append((time, msg.tempo))
-
-        for track in midiFile.tracks:
-            time = 0
-            tempo = 500000
-
-            if midiFile.type == 0:
-                curChannel = 0
-                curTrack = midiTracks[curChannel]
+        with open(file, "rb") as infile:
+            fileType, ticksPerBeat, offsets = _readTrackOffsets(infile)
+
+            assert fileType in range(2), "Type 2 MIDI Files are not supported!"
+
+            # the tracks are read a block at a time (twice), instead of loading every message of the file
+            # first pass: the name of each track and the tempo changes, which can be in any track
+            trackNames = []
+            tempoChanges = []
+            for offset in offsets:
+                trackName = None
+                for tick, msg in _iterTrackEvents(infile, offset):
+                    if msg.type == "track_name" and trackName is None:
+                        trackName = msg.name
+                    elif msg.type == "set_tempo":
+                        tempoChanges.append((tick, msg.tempo))
+                trackNames.append(trackName or "")
+
+            # tempo changes on the same tick stay in track order (like mido.merge_tracks())
+            tempoMap = _TempoMap(ticksPerBeat)
+            for tick, tempo in sorted(tempoChanges, key=itemgetter(0)):
+                tempoMap.addTempo(tick, tempo)
+
+            if fileType == 0:
+                # Type 0
+                # Tracks depend on MIDI Channels for the different tracks
+                # Instance in 16 MIDI tracks
+                midiTracks = [MIDITrack("") for _ in range(16)]
             else:
-                curTrack = MIDITrack("")
+                # Type 1
+                midiTracks = []
 
-            if track.name:
-                curTrack.name = track.name
-
-
-            for msg in mido.merge_tracks([track]):
-                time += mido.tick2second(msg.time, midiFile.ticks_per_beat, tempo)
-                curType = msg.type
-
-                # channel messages
-                if midiFile.type == 0 and not msg.is_meta and msg.type != "sysex":
-                    # update tracks as they are read in
-                    curChannel = msg.channel
+            for offset, trackName in zip(offsets, trackNames):
+                if fileType == 0:
+                    curChannel = 0
                     curTrack = midiTracks[curChannel]
+                else:
+                    curTrack = MIDITrack("")
 
-                # velocity 0 note_on messages need to be note_off
-                if curType == "note_on" and msg.velocity <= 0:
-                    curType = "note_off"
+                if trackName:
+                    curTrack.name = trackName
 
-                if curType == "note_on":
-                    curTrack.addNoteOn(msg.channel, msg.note, msg.velocity, time)
+                for tick, msg in _iterTrackEvents(infile, offset):
+                    time = tempoMap.seconds(tick)
+                    curType = msg.type
 
-                elif curType == "note_off":
-                    curTrack.addNoteOff(msg.channel, msg.note, msg.velocity, time)
+                    # channel messages
+                    if fileType == 0 and not msg.is_meta and msg.type != "sysex":
+                        # update tracks as they are read in
+                        curChannel = msg.channel
+                        curTrack = midiTracks[curChannel]
 
-                elif curType == "program_change":
-                    # General MIDI name
-                    gmName = gmProgramToName(msg.program) if msg.channel != 9 else "Drumset"
+                    # velocity 0 note_on messages need to be note_off
+                    if curType == "note_on" and msg.velocity <= 0:
+                        curType = "note_off"
 
-                    if len(curTrack.name) == 0 or (midiFile.type == 0 and curTrack.name == f"Track {curChannel + 1}"):
-                        curTrack.name = gmName
-                    
-                elif curType == "control_change":
-                    curTrack.addControlChange(msg.control, msg.channel, msg.value, time)
+                    if curType == "note_on":
+                        curTrack.addNoteOn(msg.channel, msg.note, msg.velocity, time)
 
-                elif curType == "pitchwheel":
-                    curTrack.addPitchwheel(msg.channel, msg.pitch, time)
+                    elif curType == "note_off":
+                        curTrack.addNoteOff(msg.channel, msg.note, msg.velocity, time)
 
-                elif curType == "aftertouch":
-                    curTrack.addAftertouch(msg.channel, msg.value, time)
-                
-                if midiFile.type == 0 and len(curTrack.name) == 0:
-                    curTrack.name = f"Track {curChannel + 1}"
+                    elif curType == "program_change":
+                        # General MIDI name
+                        gmName = gmProgramToName(msg.program) if msg.channel != 9 else "Drumset"
 
-                # tempo section (must be at end of chain)
-                if midiFile.type == 0 and msg.type == "set_tempo":
-                    tempo = msg.tempo
+                        if len(curTrack.name) == 0 or (fileType == 0 and curTrack.name == f"Track {curChannel + 1}"):
+                            curTrack.name = gmName
+                        
+                    elif curType == "control_change":
+                        curTrack.addControlChange(msg.control, msg.channel, msg.value, time)
 
-                if midiFile.type == 1:
-                    tempo = _closestTempo(tempoMap, time)[1]
-                    if tempo == float('inf'):  # FIXME this should probably just be fixed within the _closestTempo function
-                        tempo = tempoMap[-1][1]
-                    
+                    elif curType == "pitchwheel":
+                        curTrack.addPitchwheel(msg.channel, msg.pitch, time)
 
-                
+                    elif curType == "aftertouch":
+                        curTrack.addAftertouch(msg.channel, msg.value, time)
+                    
+                    if fileType == 0 and len(curTrack.name) == 0:
+                        curTrack.name = f"Track {curChannel + 1}"
 
                 # add track to tracks for instrumentType 1
-                if midiFile.type == 1 and msg.is_meta and curType == "end_of_track" and not curTrack._isEmpty():
+                if fileType == 1 and not curTrack._isEmpty():
                     midiTracks.append(curTrack)
 
         # remove empty tracks
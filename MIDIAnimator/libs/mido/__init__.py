@@ -97,7 +97,7 @@ from .messages import (Message, parse_string, parse_string_stream,
                        format_as_string, MIN_PITCHWHEEL, MAX_PITCHWHEEL,
                        MIN_SONGPOS, MAX_SONGPOS)
 from .parser import Parser, parse, parse_all
-from .midifiles import (MidiFile, MidiTrack, merge_tracks,
+from .midifiles import (MidiFile, MidiTrack, merge_tracks, iter_track,
                         MetaMessage, UnknownMetaMessage,
                         bpm2tempo, tempo2bpm, tick2second, second2tick,
                         KeySignatureError)
@@ -1,5 +1,12 @@
+from collections import OrderedDict
 from .messages import Message
-from .midifiles import MetaMessage, UnknownMetaMessage
+from .midifiles.meta import MetaMessage, UnknownMetaMessage
+
+# Maximum number of messages kept by intern_message().
+INTERN_CACHE_SIZE = 4096
+
+# Interned frozen messages by (class, bytes), least recently used first.
+_intern_cache = OrderedDict()
 
 
 class Frozen(object):
@@ -9,6 +16,12 @@ class Frozen(object):
     def __hash__(self):
         return hash(tuple(sorted(vars(self).items())))
 
+    def __eq__(self, other):
+        # Interned messages are shared, so this is the common case.
+        if self is other:
+            return True
+        return super(Frozen, self).__eq__(other)
+
 
 class FrozenMessage(Frozen, Message):
     pass
@@ -61,6 +74,74 @@ def freeze_message(msg):
     return frozen
 
 
+def get_interned(key):
+    """Return the interned message for a (class, bytes) key or None.
+
+    This is used by the track reader to look up a message before it
+    is decoded. Not a part of the public API.
+    """
+    frozen = _intern_cache.get(key)
+    if frozen is not None:
+        _intern_cache.move_to_end(key)
+    return frozen
+
+
+def add_interned(key, frozen):
+    """Add a frozen message with time 0 to the intern cache.
+
+    Not a part of the public API.
+    """
+    _intern_cache[key] = frozen
+    if len(_intern_cache) > INTERN_CACHE_SIZE:
+        _intern_cache.popitem(last=False)
+
+
+def intern_message(msg):
+    """Intern message.
+
+    Returns a frozen version of the message that is shared by every
+    message of the same class with the same bytes. The time is not a
+    part of the message's bytes, so the interned message always has a
+    time of 0 and messages at different times share it. Keep the time
+    next to the message, for example as the (delta, msg) pairs that
+    iter_track(intern=True) yields.
+
+    This saves memory when the same messages are repeated many times,
+    for example in drum tracks. The cache holds the INTERN_CACHE_SIZE
+    most recently used messages.
+
+    Will return None if called with None.
+    """
+    if msg is None:
+        return None
+    elif isinstance(msg, Frozen):
+        class_ = type(msg)
+    elif isinstance(msg, Message):
+        class_ = FrozenMessage
+    elif isinstance(msg, UnknownMetaMessage):
+        class_ = FrozenUnknownMetaMessage
+    elif isinstance(msg, MetaMessage):
+        class_ = FrozenMetaMessage
+    else:
+        raise ValueError('first argument must be a message or None')
+
+    key = (class_, bytes(msg.bytes()))
+    frozen = get_interned(key)
+
+    if frozen is None:
+        frozen = class_.__new__(class_)
+        vars(frozen).update(vars(msg))
+        vars(frozen)['time'] = 0
+        add_interned(key, frozen)
+
+    return frozen
+
+
+def clear_intern_cache():
+    """Remove all messages from the intern cache."""
+    _intern_cache.clear()
+
+
 def thaw_message(msg):
     """Thaw message.
 
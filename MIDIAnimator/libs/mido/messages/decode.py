@@ -5,55 +5,78 @@ from .checks import check_data
 from ..py2 import convert_py2_bytes
 
 
-def _decode_sysex_data(data):
-    return {'data': tuple(data)}
-
-
-def _decode_quarter_frame_data(data):
-    return {'frame_type': data[0] >> 4,
-            'frame_value': data[0] & 15}
-
-
-def _decode_songpos_data(data):
-    return {'pos': data[0] | (data[1] << 7)}
+def _make_decoder(status_byte, spec):
+    # Return a function that takes the data bytes (without the status
+    # byte) and a time and returns the message as a dictionary. The
+    # decoder does no checking. Length and range checks are done by
+    # the caller.
+    type_ = spec['type']
 
+    if status_byte == SYSEX_START:
+        def decode(data, time):
+            return {'type': type_, 'time': time, 'data': tuple(data)}
 
-def _decode_pitchwheel_data(data):
-    return {'pitch': data[0] | ((data[1] << 7) + MIN_PITCHWHEEL)}
+    elif status_byte == 0xf1:
+        def decode(data, time):
+            return {'type': type_, 'time': time,
+                    'frame_type': data[0] >> 4,
+                    'frame_value': data[0] & 15}
 
+    elif status_byte == 0xf2:
+        def decode(data, time):
+            return {'type': type_, 'time': time,
+                    'pos': data[0] | (data[1] << 7)}
 
-def _make_special_cases():
-    cases = {
-        0xe0: _decode_pitchwheel_data,
-        0xf0: _decode_sysex_data,
-        0xf1: _decode_quarter_frame_data,
-        0xf2: _decode_songpos_data,
-    }
+    elif status_byte in CHANNEL_MESSAGES:
+        # Channel is stored in the lower nibble of the status byte.
+        channel = status_byte & 0x0f
+        names = spec['value_names'][1:]
+
+        if type_ == 'pitchwheel':
+            def decode(data, time):
+                return {'type': type_, 'time': time, 'channel': channel,
+                        'pitch': data[0] | ((data[1] << 7) + MIN_PITCHWHEEL)}
+
+        elif len(names) == 2:
+            name1, name2 = names
+
+            def decode(data, time):
+                return {'type': type_, 'time': time,
+                        name1: data[0], name2: data[1],
+                        'channel': channel}
+        else:
+            name1, = names
+
+            def decode(data, time):
+                return {'type': type_, 'time': time,
+                        name1: data[0],
+                        'channel': channel}
+    else:
+        names = spec['value_names']
 
-    for i in range(16):
-        cases[0xe0 | i] = _decode_pitchwheel_data
+        def decode(data, time):
+            msg = {'type': type_, 'time': time}
+            msg.update(zip(names, data))
+            return msg
 
-    return cases
+    return decode
 
 
-_SPECIAL_CASES = _make_special_cases()
+def _make_decoder_table():
+    decoders = [None] * 256
+    data_lengths = [None] * 256
 
+    for status_byte, spec in SPEC_BY_STATUS.items():
+        decoders[status_byte] = _make_decoder(status_byte, spec)
+        # Subtract 1 for status byte.
+        data_lengths[status_byte] = spec['length'] - 1
 
-def _decode_data_bytes(status_byte, data, spec):
-    # Subtract 1 for status byte.
-    if len(data) != (spec['length'] - 1):
-        raise ValueError(
-            'wrong number of bytes for {} message'.format(spec['type']))
+    return decoders, data_lengths
 
-    # TODO: better name than args?
-    names = [name for name in spec['value_names'] if name != 'channel']
-    args = {name: value for name, value in zip(names, data)}
 
-    if status_byte in CHANNEL_MESSAGES:
-        # Channel is stored in the lower nibble of the status byte.
-        args['channel'] = status_byte & 0x0f
-
-    return args
+# One decoder per status byte. Undefined status bytes (and data bytes)
+# map to None.
+DECODER_BY_STATUS, DATA_LENGTH_BY_STATUS = _make_decoder_table()
 
 
 def decode_message(msg_bytes, time=0, check=True):
@@ -64,7 +87,6 @@ def decode_message(msg_bytes, time=0, check=True):
 
     This is not a part of the public API.
     """
-    # TODO: this function is getting long.
     msg_bytes = convert_py2_bytes(msg_bytes)
 
     if len(msg_bytes) == 0:
@@ -74,16 +96,13 @@ def decode_message(msg_bytes, time=0, check=True):
     data = msg_bytes[1:]
 
     try:
-        spec = SPEC_BY_STATUS[status_byte]
-    except KeyError:
-        raise ValueError('invalid status byte {!r}'.format(status_byte))
+        decoder = DECODER_BY_STATUS[status_byte] if status_byte >= 0 else None
+    except (IndexError, TypeError):
+        decoder = None
 
-    msg = {
-        'type': spec['type'],
-        'time': time,
-    }
+    if decoder is None:
+        raise ValueError('invalid status byte {!r}'.format(status_byte))
 
-    # Sysex.
     if status_byte == SYSEX_START:
         if len(data) < 1:
             raise ValueError('sysex without end byte')
@@ -93,15 +112,11 @@ def decode_message(msg_bytes, time=0, check=True):
         if end != SYSEX_END:
             raise ValueError('invalid sysex end byte {!r}'.format(end))
 
+    elif len(data) != DATA_LENGTH_BY_STATUS[status_byte]:
+        raise ValueError('wrong number of bytes for {} message'.format(
+            SPEC_BY_STATUS[status_byte]['type']))
+
     if check:
         check_data(data)
 
-    if status_byte in _SPECIAL_CASES:
-        if status_byte in CHANNEL_MESSAGES:
-            msg['channel'] = status_byte & 0x0f
-
-        msg.update(_SPECIAL_CASES[status_byte](data))
-    else:
-        msg.update(_decode_data_bytes(status_byte, data, spec))
-
-    return msg
+    return decoder(data, time)
@@ -107,19 +107,24 @@ class SysexData(tuple):
 
 
 class Message(BaseMessage):
-    def __init__(self, type, **args):
+    def __init__(self, type, skip_checks=False, **args):
         msgdict = make_msgdict(type, args)
         if type == 'sysex':
             msgdict['data'] = SysexData(convert_py2_bytes(msgdict['data']))
-        check_msgdict(msgdict)
+        if not skip_checks:
+            check_msgdict(msgdict)
         vars(self).update(msgdict)
 
-    def copy(self, **overrides):
+    def copy(self, skip_checks=False, **overrides):
         """Return a copy of the message.
 
         Attributes will be overridden by the passed keyword arguments.
         Only message specific attributes can be overridden. The message
         type can not be changed.
+
+        Pass skip_checks=True if the overrides are known to be valid
+        (for example a time computed by the caller). This skips all
+        type and value checks.
         """
         if not overrides:
             # Bypass all checks.
@@ -135,19 +140,26 @@ class Message(BaseMessage):
 
         msgdict = vars(self).copy()
         msgdict.update(overrides)
-        check_msgdict(msgdict)
-        return self.__class__(**msgdict)
+        if not skip_checks:
+            check_msgdict(msgdict)
+        # The dict has been checked above so there is no need for the
+        # constructor to check it again.
+        return self.__class__(skip_checks=True, **msgdict)
 
     @classmethod
-    def from_bytes(cl, data, time=0):
+    def from_bytes(cl, data, time=0, skip_checks=False):
         """Parse a byte encoded message.
 
         Accepts a byte string or any iterable of integers.
 
         This is the reverse of msg.bytes() or msg.bin().
+
+        Pass skip_checks=True if the data bytes are already known to be
+        in range (for example when they have been checked while reading
+        a file). The message length and status byte are still checked.
         """
         msg = cl.__new__(cl)
-        msgdict = decode_message(data, time=time)
+        msgdict = decode_message(data, time=time, check=not skip_checks)
         if 'data' in msgdict:
             msgdict['data'] = SysexData(msgdict['data'])
         vars(msg).update(msgdict)
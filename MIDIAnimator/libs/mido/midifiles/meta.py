@@ -465,33 +465,39 @@ def build_meta_message(meta_type, data, delta=0):
 class MetaMessage(BaseMessage):
     is_meta = True
 
-    def __init__(self, type, **kwargs):
+    def __init__(self, type, skip_checks=False, **kwargs):
         # TODO: handle unknown type?
 
         spec = _META_SPEC_BY_TYPE[type]
         self_vars = vars(self)
         self_vars['type'] = type
 
-        for name in kwargs:
-            if name not in spec.settable_attributes:
-                raise ValueError(
-                    '{} is not a valid argument for this message type'.format(
-                        name))
+        if not skip_checks:
+            for name in kwargs:
+                if name not in spec.settable_attributes:
+                    raise ValueError(
+                        '{} is not a valid argument for this message '
+                        'type'.format(name))
 
         for name, value in zip(spec.attributes, spec.defaults):
             self_vars[name] = value
         self_vars['time'] = 0
 
-        for name, value in kwargs.items():
-            # Using setattr here because we want type and value checks.
-            self._setattr(name, value)
+        if skip_checks:
+            self_vars.update(kwargs)
+        else:
+            for name, value in kwargs.items():
+                # Using setattr here because we want type and value checks.
+                self._setattr(name, value)
 
-    def copy(self, **overrides):
+    def copy(self, skip_checks=False, **overrides):
         """Return a copy of the message
 
         Attributes will be overridden by the passed keyword arguments.
         Only message specific attributes can be overridden. The message
         type can not be changed.
+
+        Pass skip_checks=True if the overrides are known to be valid.
         """
         if not overrides:
             # Bypass all checks.
@@ -504,7 +510,7 @@ class MetaMessage(BaseMessage):
 
         attrs = vars(self).copy()
         attrs.update(overrides)
-        return self.__class__(**attrs)
+        return self.__class__(skip_checks=skip_checks, **attrs)
 
     # FrozenMetaMessage overrides __setattr__() but we still need to
     # set attributes in __init__().
@@ -540,7 +546,10 @@ class MetaMessage(BaseMessage):
 
 
 class UnknownMetaMessage(MetaMessage):
-    def __init__(self, type_byte, data=None, time=0):
+    def __init__(self, type_byte, data=None, time=0, type='unknown_meta',
+                 **kwargs):
+        # type and kwargs are accepted so copy() can pass all attributes
+        # back in.
         if data is None:
             data = ()
         else:
@@ -20,13 +20,16 @@ import io
 import time
 import string
 import struct
+from itertools import accumulate
 from numbers import Integral
 
 from ..messages import Message, SPEC_BY_STATUS
+from ..messages.decode import DECODER_BY_STATUS, DATA_LENGTH_BY_STATUS
 from .meta import (MetaMessage, build_meta_message, meta_charset,
                    encode_variable_int)
 
 from .tracks import MidiTrack, merge_tracks, fix_end_of_track
+from ..frozen import FrozenMessage, get_interned, add_interned, intern_message
 from .units import tick2second
 
 # The default tempo is 120 BPM.
@@ -118,7 +121,8 @@ def read_file_header(infile):
         return struct.unpack('>hhh', data[:6])
 
 
-def read_message(infile, status_byte, peek_data, delta, clip=False):
+def read_message(infile, status_byte, peek_data, delta, clip=False,
+                 skip_checks=False):
     try:
         spec = SPEC_BY_STATUS[status_byte]
     except LookupError:
@@ -130,12 +134,15 @@ def read_message(infile, status_byte, peek_data, delta, clip=False):
 
     if clip:
         data_bytes = [byte if byte < 127 else 127 for byte in data_bytes]
-    else:
+    elif not skip_checks:
         for byte in data_bytes:
             if byte > 127:
                 raise IOError('data byte must be in range 0..127')
 
-    return Message.from_bytes([status_byte] + data_bytes, time=delta)
+    # The data bytes have been clipped or checked above (or the caller
+    # trusts the file), so there is no need to check them again.
+    return Message.from_bytes([status_byte] + data_bytes, time=delta,
+                              skip_checks=True)
 
 
 def read_sysex(infile, delta, clip=False):
@@ -172,18 +179,11 @@ def read_meta_message(infile, delta):
     return build_meta_message(meta_type, data, delta)
 
 
-def read_track(infile, debug=False, clip=False):
+def _read_track_debug(infile, size, clip=False, skip_checks=False):
+    # Byte by byte version of the track reader. Slow, but every byte
+    # goes through DebugFileWrapper so it can be printed.
     track = MidiTrack()
 
-    name, size = read_chunk_header(infile)
-
-    if name != b'MTrk':
-        raise IOError('no MTrk header at start of track')
-
-    if debug:
-        _dbg('-> size={}'.format(size))
-        _dbg()
-
     start = infile.tell()
     last_status = None
 
@@ -192,13 +192,11 @@ def read_track(infile, debug=False, clip=False):
         if infile.tell() - start == size:
             break
 
-        if debug:
-            _dbg('Message:')
+        _dbg('Message:')
 
         delta = read_variable_int(infile)
 
-        if debug:
-            _dbg('-> delta={}'.format(delta))
+        _dbg('-> delta={}'.format(delta))
 
         status_byte = read_byte(infile)
 
@@ -220,17 +218,223 @@ def read_track(infile, debug=False, clip=False):
             # f0 and f7 events.
             msg = read_sysex(infile, delta, clip)
         else:
-            msg = read_message(infile, status_byte, peek_data, delta, clip)
+            msg = read_message(infile, status_byte, peek_data, delta, clip,
+                               skip_checks)
 
         track.append(msg)
 
-        if debug:
-            _dbg('-> {!r}'.format(msg))
-            _dbg()
+        _dbg('-> {!r}'.format(msg))
+        _dbg()
 
     return track
 
 
+def _find_message(data, pos, last_status):
+    # Find the message that starts at pos in data, checking every offset
+    # against the end of the buffer before it is read.
+    #
+    # Returns None if the buffer ends before the message does. Otherwise
+    # returns (delta, status_byte, meta_type, start, end, last_status),
+    # where data[start:end] are the message's data bytes.
+    size = len(data)
+
+    # Delta time (variable length int).
+    delta = 0
+    while True:
+        if pos >= size:
+            return None
+        byte = data[pos]
+        pos += 1
+        delta = (delta << 7) | (byte & 0x7f)
+        if byte < 0x80:
+            break
+
+    if pos >= size:
+        return None
+    status_byte = data[pos]
+    pos += 1
+
+    if status_byte < 0x80:
+        if last_status is None:
+            raise IOError('running status without last_status')
+        # The byte we just read is the first data byte.
+        pos -= 1
+        status_byte = last_status
+    elif status_byte != 0xff:
+        # Meta messages don't set running status.
+        last_status = status_byte
+
+    meta_type = None
+    if status_byte == 0xff or status_byte == 0xf0 or status_byte == 0xf7:
+        if status_byte == 0xff:
+            if pos >= size:
+                return None
+            meta_type = data[pos]
+            pos += 1
+
+        length = 0
+        while True:
+            if pos >= size:
+                return None
+            byte = data[pos]
+            pos += 1
+            length = (length << 7) | (byte & 0x7f)
+            if byte < 0x80:
+                break
+
+        if length > MAX_MESSAGE_LENGTH:
+            raise IOError(
+                'Message length {} exceeds maximum length {}'.format(
+                    length, MAX_MESSAGE_LENGTH))
+    else:
+        length = DATA_LENGTH_BY_STATUS[status_byte]
+        if length is None:
+            raise IOError(
+                'undefined status byte 0x{:02x}'.format(status_byte))
+
+    end = pos + length
+    if end > size:
+        return None
+
+    return delta, status_byte, meta_type, pos, end, last_status
+
+
+def _iter_track_data(infile, size, clip=False, skip_checks=False,
+                     block_size=None, intern=False):
+    # Decode a track payload of size bytes from infile, walking a buffer
+    # with an integer offset instead of reading one byte at a time.
+    #
+    # If block_size is None the whole payload is read at once. Otherwise
+    # it is read block_size bytes at a time and only the current block
+    # (plus any message that straddles two blocks) is kept in memory.
+    #
+    # If intern is True (delta, msg) pairs are yielded, where msg is the
+    # interned frozen message (see intern_message()). Channel messages
+    # are looked up by their bytes before they are decoded.
+    new_message = Message.__new__
+    decoders = DECODER_BY_STATUS
+
+    data = bytearray()
+    remaining = size
+    pos = 0
+    last_status = None
+
+    while True:
+        found = _find_message(data, pos, last_status)
+
+        if found is None:
+            # The buffer ends in the middle of a message (or right
+            # after the last one). Read more and start over from the
+            # beginning of the message.
+            if not remaining:
+                if pos == len(data):
+                    # End of track reached.
+                    return
+                # Ran off the end of the track in the middle of a
+                # message.
+                raise EOFError
+
+            more = infile.read(remaining if block_size is None
+                               else min(block_size, remaining))
+            if not more:
+                raise EOFError
+            remaining -= len(more)
+
+            del data[:pos]
+            data += more
+            pos = 0
+            continue
+
+        delta, status_byte, meta_type, start, pos, last_status = found
+
+        if status_byte == 0xff:
+            msg = build_meta_message(meta_type, list(data[start:pos]), delta)
+        elif status_byte == 0xf0 or status_byte == 0xf7:
+            # TODO: I'm not quite clear on the difference between
+            # f0 and f7 events.
+            msg_data = list(data[start:pos])
+
+            # Strip start and end bytes.
+            if msg_data and msg_data[0] == 0xf0:
+                msg_data = msg_data[1:]
+            if msg_data and msg_data[-1] == 0xf7:
+                msg_data = msg_data[:-1]
+
+            if clip:
+                msg_data = [byte if byte < 127 else 127 for byte in msg_data]
+
+            msg = Message('sysex', data=msg_data, time=delta)
+        else:
+            data_bytes = data[start:pos]
+
+            if clip:
+                data_bytes = [byte if byte < 127 else 127
+                              for byte in data_bytes]
+            elif not skip_checks:
+                for byte in data_bytes:
+                    if byte > 127:
+                        raise IOError('data byte must be in range 0..127')
+
+            if intern:
+                key = (FrozenMessage, bytes((status_byte, *data_bytes)))
+                msg = get_interned(key)
+                if msg is None:
+                    msg = new_message(FrozenMessage)
+                    vars(msg).update(decoders[status_byte](data_bytes, 0))
+                    add_interned(key, msg)
+                yield delta, msg
+                continue
+
+            # The data bytes have been clipped or checked above (or the
+            # caller trusts the file), so the message can be built
+            # straight from the decoded dictionary.
+            msg = new_message(Message)
+            vars(msg).update(decoders[status_byte](data_bytes, delta))
+
+        if intern:
+            yield delta, intern_message(msg)
+        else:
+            yield msg
+
+
+def iter_track(infile, clip=False, skip_checks=False, block_size=65536,
+               intern=False):
+    """Read a track from a file and yield its messages one at a time.
+
+    infile must be positioned at the start of an MTrk chunk. The track
+    is read block_size bytes at a time, so only a small part of it is
+    in memory at any time. This can be used to go through very long
+    tracks without loading them.
+
+    If intern is True, (delta, msg) pairs are yielded instead, where
+    msg is a frozen message shared by all equal messages (see
+    intern_message()) and delta is its time in ticks. Repeated messages
+    are then only decoded and stored once.
+    """
+    name, size = read_chunk_header(infile)
+
+    if name != b'MTrk':
+        raise IOError('no MTrk header at start of track')
+
+    return _iter_track_data(infile, size, clip, skip_checks, block_size,
+                            intern)
+
+
+def read_track(infile, debug=False, clip=False, skip_checks=False):
+    name, size = read_chunk_header(infile)
+
+    if name != b'MTrk':
+        raise IOError('no MTrk header at start of track')
+
+    if debug:
+        _dbg('-> size={}'.format(size))
+        _dbg()
+        return _read_track_debug(infile, size, clip, skip_checks)
+
+    # Read the whole chunk at once and decode it from memory.
+    return MidiTrack(_iter_track_data(infile, size, clip, skip_checks))
+
+
 def write_chunk(outfile, name, data):
     """Write an IFF chunk to the file.
 
@@ -299,7 +503,8 @@ class MidiFile(object):
                  charset='latin1',
                  debug=False,
                  clip=False,
-                 tracks=None
+                 tracks=None,
+                 skip_checks=False
                  ):
 
         self.filename = filename
@@ -308,6 +513,8 @@ class MidiFile(object):
         self.charset = charset
         self.debug = debug
         self.clip = clip
+        # Trust the file: don't range check data bytes while loading.
+        self.skip_checks = skip_checks
 
         self.tracks = []
 
@@ -358,7 +565,8 @@ class MidiFile(object):
 
                 self.tracks.append(read_track(infile,
                                               debug=self.debug,
-                                              clip=self.clip))
+                                              clip=self.clip,
+                                              skip_checks=self.skip_checks))
                 # TODO: used to ignore EOFError. I hope things still work.
 
     @property
@@ -372,27 +580,66 @@ class MidiFile(object):
             raise ValueError('impossible to compute length'
                              ' for type 2 (asynchronous) file')
 
-        return sum(msg.time for msg in self)
+        return sum(delta for delta, msg in self.iter_deltas())
 
-    def __iter__(self):
+    def iter_deltas(self):
+        """Yield (delta, msg) pairs in playback order.
+
+        delta is the time in seconds since the previous message, as in
+        iter(). The messages are the ones stored in the tracks, not
+        copies, so msg.time is still the delta time in ticks within
+        the track. Don't modify them.
+
+        End of track messages are dropped and a single new one is
+        yielded at the end, as in merge_tracks().
+        """
         # The tracks of type 2 files are not in sync, so they can
         # not be played back like this.
         if self.type == 2:
             raise TypeError("can't merge tracks in type 2 (asynchronous) file")
 
+        # Absolute time in ticks for every message in every track.
+        messages = []
+        ticks = []
+        for track in self.tracks:
+            messages.extend(track)
+            ticks.extend(accumulate(msg.time for msg in track))
+
+        # sorted() is stable, so messages with the same time stay in
+        # track order like in merge_tracks().
+        order = sorted(range(len(ticks)), key=ticks.__getitem__)
+
         tempo = DEFAULT_TEMPO
-        for msg in merge_tracks(self.tracks):
-            # Convert message time from absolute time
-            # in ticks to relative time in seconds.
-            if msg.time > 0:
-                delta = tick2second(msg.time, self.ticks_per_beat, tempo)
-            else:
-                delta = 0
+        scale = tick2second(1, self.ticks_per_beat, tempo)
+        now = 0
+
+        for i in order:
+            msg = messages[i]
+            if msg.type == 'end_of_track':
+                continue
 
-            yield msg.copy(time=delta)
+            tick = ticks[i]
+            if tick > now:
+                yield (tick - now) * scale, msg
+                now = tick
+            else:
+                yield 0, msg
 
             if msg.type == 'set_tempo':
                 tempo = msg.tempo
+                scale = tick2second(1, self.ticks_per_beat, tempo)
+
+        end = ticks[order[-1]] if order else 0
+        if end > now:
+            delta = (end - now) * scale
+        else:
+            delta = 0
+        yield delta, MetaMessage('end_of_track', time=end - now)
+
+    def __iter__(self):
+        for delta, msg in self.iter_deltas():
+            # delta is computed here, so it doesn't need to be checked.
+            yield msg.copy(skip_checks=True, time=delta)
 
     def play(self, meta_messages=False):
         """Play back all tracks.
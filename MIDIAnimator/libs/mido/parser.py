@@ -27,8 +27,11 @@ class Parser(object):
             self.feed(data)
 
     def _decode(self):
-        for midi_bytes in self._tok:
-            self.messages.append(Message.from_bytes(midi_bytes))
+        # The tokenizer only produces complete messages made of bytes
+        # in range, so there is no need to check them again.
+        from_bytes = Message.from_bytes
+        self.messages.extend(from_bytes(midi_bytes, skip_checks=True)
+                             for midi_bytes in self._tok)
 
     def feed(self, data):
         """Feed MIDI data to the parser.
@@ -46,6 +49,16 @@ class Parser(object):
         self._tok.feed(data)
         self._decode()
 
+    def feed_buffer(self, data):
+        """Feed a byte string or bytearray to the parser.
+
+        This is a faster version of feed() for large amounts of data,
+        for example from a socket or a file. feed() will also use it
+        when passed a byte string or bytearray.
+        """
+        self._tok.feed_buffer(data)
+        self._decode()
+
     def feed_byte(self, byte):
         """Feed one MIDI byte into the parser.
 
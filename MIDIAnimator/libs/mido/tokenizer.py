@@ -1,8 +1,25 @@
+import re
 from collections import deque
 from numbers import Integral
 from .messages.specs import SYSEX_START, SYSEX_END, SPEC_BY_STATUS
 from .py2 import convert_py2_bytes
 
+# Matches any status byte.
+_STATUS_BYTE_RE = re.compile(b'[\x80-\xff]')
+
+
+def _make_length_table():
+    # Message length by status byte for messages that feed_buffer() can
+    # slice out in one go. Sysex and undefined status bytes are None.
+    lengths = [None] * 256
+    for status, spec in SPEC_BY_STATUS.items():
+        if status != SYSEX_START:
+            lengths[status] = spec['length']
+    return lengths
+
+
+_LENGTH_BY_STATUS = _make_length_table()
+
 
 class Tokenizer(object):
     """
@@ -85,9 +102,69 @@ class Tokenizer(object):
 
         Takes an iterable of ints in in range [0..255].
         """
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return self.feed_buffer(data)
+
         for byte in convert_py2_bytes(data):
             self.feed_byte(byte)
 
+    def feed_buffer(self, data):
+        """Feed a byte string or bytearray to the decoder.
+
+        Gives the same result as feed() but complete messages are
+        sliced out of the buffer in one go instead of being fed one
+        byte at a time. Sysex data and messages split across buffers
+        (or interrupted by other status bytes) are handled byte by byte.
+        """
+        data = bytearray(data)
+        lengths = _LENGTH_BY_STATUS
+        search = _STATUS_BYTE_RE.search
+        append = self._messages.append
+        feed_byte = self.feed_byte
+
+        size = len(data)
+        pos = 0
+
+        while pos < size:
+            if self._status == SYSEX_START:
+                # Copy data bytes up to the next status byte.
+                match = search(data, pos)
+                end = match.start() if match else size
+                self._bytes.extend(data[pos:end])
+                pos = end
+                if pos < size:
+                    feed_byte(data[pos])
+                    pos += 1
+                continue
+            elif self._status:
+                # Inside a partial message.
+                feed_byte(data[pos])
+                pos += 1
+                continue
+
+            byte = data[pos]
+
+            if byte < 0x80:
+                # Skip stray data bytes.
+                match = search(data, pos)
+                pos = match.start() if match else size
+                continue
+
+            length = lengths[byte]
+            end = pos + length if length else size + 1
+
+            if length == 1:
+                append([byte])
+                pos += 1
+            elif end <= size and data[pos + 1] < 0x80 \
+                    and (length == 2 or data[pos + 2] < 0x80):
+                # Complete message.
+                append(list(data[pos:end]))
+                pos = end
+            else:
+                feed_byte(byte)
+                pos += 1
+
     def __len__(self):
         return len(self._messages)
 
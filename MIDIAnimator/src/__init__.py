@@ -4,6 +4,8 @@ if "bpy" in locals():
     importlib.reload(animation)
 else:
     from ..data_structures import midi
-    from . import animation
+    from .. import bpy
 
-import bpy
\ No newline at end of file
+    # the animation needs Blender, the algorithms can be imported on their own without it
+    if bpy is not None:
+        from . import animation
@@ -1,9 +1,17 @@
 from __future__ import annotations
-import bpy
-from typing import List, Tuple, TYPE_CHECKING
-from math import sin, cos, pi, e, atan
+from typing import Dict, List, Tuple, Union, TYPE_CHECKING
+from math import sin, cos, pi, e, atan, sqrt, log, ceil, floor, isfinite
+from operator import itemgetter
+from bisect import bisect_left
+import multiprocessing
+import heapq
+import os
+import sys
+import time
+import numpy as np
 from .. data_structures.midi import MIDITrack
-from .. data_structures import Keyframe
+from .. data_structures import Keyframe, KeyframeArray, LinearCurve, LinearCurves
+from .. utils.logger import logger
 
 if TYPE_CHECKING:
     from ..data_structures import FrameRange
@@ -11,66 +19,61 @@ if TYPE_CHECKING:
 def maxSimultaneousObjects(intervals: List[Tuple[float, float]]) -> int:
     """
     gets the max simotaneous objects for List[Tuple[float, float]]`.
+    the intervals should be sorted by start time (and end time for the same start time).
+    an object that ends on the same frame another one starts can be reused (like `CacheInstance` and `MIDITrack.allocateVoices()`),
+    so this is the number of objects they create
     :param intervals: List[Tuple[float, float]]
     :return int: max number of objects that are visible at any point in time
     """
     # keep track of maximum number of active items
     maxCount = 0
 
-    # number of active items currently
-    activeCount = 0
-    # list of end times for currently active items sorted by the end time
+    # min-heap of end times for currently active items
     endTimesForActive = []
 
-    # for testing code
-    # currentActives = []
-
     # for each (start frame, end frame) interval for objects
     for start, end in intervals:
-        endIndex = 0
-        endTimesCount = len(endTimesForActive)
-        # remove active objects whose end time is before this new interval we are processing
-        # while end times left to check and the end time is before the start time for this interval
-        while endIndex < endTimesCount and endTimesForActive[endIndex] < start:
-
-            # testing code to output intermediate steps
-            # for (i, (x, y)) in enumerate(currentActives):
-            #     if y == endTimesForActive[endIndex]:
-            #         del currentActives[i]
-            #         break
-
-            # this one has ended so move to next index and decrease current active count
-            endIndex += 1
-            activeCount -= 1
-
-
-        # remove all the ones from list whose end time is earlier than the start of this interval
-        endTimesForActive = endTimesForActive[endIndex:]
-
-        # testing code
-        # currentActives.append((start, end))
-        # print(start, end, currentActives)
+        # remove active objects whose end time is before (or on) the start of this new interval we are processing
+        while endTimesForActive and endTimesForActive[0] <= start:
+            heapq.heappop(endTimesForActive)
 
         # add the item for this interval
-        activeCount += 1
+        heapq.heappush(endTimesForActive, end)
+
         # update maxCount if new maximum
-        if activeCount > maxCount:
-            maxCount = activeCount
-
-        # put it in the list of endTimesForActive objects
-        endTimesForActive.append(end)
-        # position it in sorted order using insertionSort algorithm
-        # this should be efficient since in general the new end times will usually go at end of list
-        pos = len(endTimesForActive) - 1
-        newItem = endTimesForActive[pos]
-        while pos > 0 and endTimesForActive[pos - 1] > newItem:
-            endTimesForActive[pos] = endTimesForActive[pos - 1]
-            pos -= 1
-        endTimesForActive[pos] = newItem
+        if len(endTimesForActive) > maxCount:
+            maxCount = len(endTimesForActive)
 
     # after processing all intervals return the computed maximum active count
     return maxCount
 
+def maxSimultaneousObjectsSweep(intervals: List[Tuple[float, float]]) -> int:
+    """
+    gets the max simotaneous objects for List[Tuple[float, float]]` by sorting all start and end times once.
+    the intervals don't have to be sorted, this gives the same answer as `maxSimultaneousObjects()` for the sorted intervals
+    :param intervals: List[Tuple[float, float]]
+    :return int: max number of objects that are visible at any point in time
+    """
+    if len(intervals) == 0:
+        return 0
+
+    intervals = np.asarray(intervals, dtype=np.float64).reshape(-1, 2)
+    count = len(intervals)
+    starts = intervals[:, 0]
+    ends = np.maximum(intervals[:, 1], starts)
+    empty = ends == starts
+
+    times = np.concatenate((starts, ends))
+    # +1 for every start, -1 for every end
+    changes = np.concatenate((np.ones(count), -np.ones(count)))
+
+    # on the same time, ends go before starts (an object that ends when another starts can be reused).
+    # intervals of length 0 go in between, each one starts and ends right away
+    kind = np.concatenate((np.where(empty, 1, 2), np.where(empty, 1, 0)))
+    pair = np.tile(np.where(empty, np.arange(count), 0), 2)
+    order = np.lexsort((-changes, pair, kind, times))
+    return int(np.cumsum(changes[order]).max())
+
 def animateSine(time: float, startVal: float, endVal: float, duration: float) -> float:
     """evaluates a sine curve based on paramters
     interactive demo: https://www.desmos.com/calculator/kw2grve25z
@@ -96,81 +99,291 @@ def animateDampedOsc(time: float, period: float, amplitude: float, damp: float):
     """
     return (e ** -((damp * time))) * (-sin((period * time)) * amplitude)
 
-def genDampedOscKeyframes(period: float, amplitude: float, damp: float, frame=0) -> List[Keyframe]:
+# unit amplitude oscillation templates, (period, damp): (extrema frames, extrema values)
+_dampedOscTemplates: Dict[Tuple[float, float], Tuple[np.ndarray, np.ndarray]] = {}
+DAMPED_OSC_CACHE_SIZE = 256
+
+def clearDampedOscCache() -> None:
+    """clears the cached damped oscillation templates"""
+    _dampedOscTemplates.clear()
+
+def dampedOscExtremaCount(period: float, amplitude: float, damp: float, threshold: float = 0.001) -> int:
+    """gets the number of local extrema of a damped oscillation up to (and including) the first one that is `threshold` or less.
+    the extrema are at x_i = atan(period/damp)/period + i*pi/period, where |y_i| = |amplitude| * e^(-damp*x_i) * period/sqrt(period^2 + damp^2),
+    so the count can be solved for directly instead of evaluating the oscillation until it is small enough
+
+    :param float period: how long it takes for the oscillation to repeat one time (positive)
+    :param float amplitude: how large is each oscillation
+    :param float damp: damping of the oscillation (positive)
+    :param float threshold: the cut-off value, defaults to 0.001
+    :return int: the number of extrema (at least 1)
+    """
+    peak = abs(amplitude) * period / sqrt(period**2 + damp**2)
+    if peak <= threshold:
+        return 1
+
+    # first x where the envelope is `threshold` or less, and the first extremum at or after it
+    firstExtremum = atan(period/damp)/period
+    lastX = log(peak / threshold) / damp
+    return max(ceil((lastX - firstExtremum) * period / pi), 0) + 1
+
+def _dampedOscTemplate(period: float, damp: float, amplitude: float) -> Tuple[np.ndarray, np.ndarray]:
+    """gets the local extrema of a damped oscillation with an amplitude of 1, from the cache if possible.
+    there are enough extrema to reach the first one that is 0.001 or less once scaled by `amplitude`
+
+    :param float period: how long it takes for the oscillation to repeat one time (positive)
+    :param float damp: damping of the oscillation (positive)
+    :param float amplitude: the amplitude the template will be scaled by
+    :return Tuple[np.ndarray, np.ndarray]: the frames (from 0) and values of the extrema
+    """
+    key = (period, damp)
+    template = _dampedOscTemplates.get(key)
+    if template is not None and abs(template[1][-1] * amplitude) <= 0.001:
+        return template
+
+    # one extra extremum in case rounding puts the last one just above the cut-off
+    count = dampedOscExtremaCount(period, amplitude, damp) + 1
+    while True:
+        # these are the x intercepts of the first derivative of the wave function
+        # in turn will give us our local extrema for the main wave function
+        frames = (atan(period/damp)/period) + (np.arange(count)*pi/period)
+        values = (e ** -(damp * frames)) * (-np.sin(period * frames))
+
+        if abs(values[-1] * amplitude) <= 0.001:
+            break
+        count += 1
+
+    if len(_dampedOscTemplates) >= DAMPED_OSC_CACHE_SIZE and key not in _dampedOscTemplates:
+        _dampedOscTemplates.clear()
+
+    template = _dampedOscTemplates[key] = (frames, values)
+    return template
+
+def genDampedOscKeyframes(period: float, amplitude: float, damp: float, frame=0) -> KeyframeArray:
     """generates keyframes that will generate the specified dampend oscillation
     Thanks to TheZacher5645 for helping figure out calculating the local extrema & derivative functions for v1
     interactive demo (v2): https://www.desmos.com/calculator/qwmf2xkno3
+    the extrema are computed once for each (period, damp) and then scaled by the amplitude and moved to the frame
     
     :param float period: how long it takes for the oscillation to repeat one time
     :param float amplitude: how large is each oscillation
     :param float damp: damping of the oscillation (how much decrease of energy for each oscillation) 
     :param float frameRate: the framerate of the current scene
-    :return List[Keyframe]: a list of keyframes of the min's and max's of the oscillation. 
+    :raises ValueError: if the period is 0, or the damping is not positive (the oscillation would never end)
+    :return KeyframeArray: the keyframes of the min's and max's of the oscillation. 
     """
+    if period == 0 or not isfinite(period):
+        raise ValueError(f"Damped oscillation period must be a non-zero number (got {period})!")
+    if not damp > 0 or not isfinite(damp):
+        raise ValueError(f"Damped oscillation damping must be bigger than 0 (got {damp}), or the oscillation would never end!")
 
-    def waveFunc(x):
-        return animateDampedOsc(x, period, amplitude, damp)
-
-    def localExtrema(x):
-        # these are the x intercepts of the first derivative of the wave function
-        # in turn will give us our local extrema for the main wave function
-        return (atan(period/damp)/period) + (x*pi/period)
-    
-    y = 1
-    i = 0
-    
-    out = [Keyframe(frame, 0)]
-    
     # negate period to positive and invert the amplitude if period is negative
     if period < 0:
         period = -period
         amplitude = -amplitude
 
-    while abs(y) > 0.001:
-        
-        x = localExtrema(i)
+    extremaFrames, extremaValues = _dampedOscTemplate(period, damp, amplitude)
 
-        if x < 0: continue
-        y = waveFunc(x)
-        
-        out.append(Keyframe(x+frame, waveFunc(x)))
-        i += 1
-    
-    out.append(Keyframe(x + frame + 1, 0))
-    
+    # the oscillation ends at the first extremum that is 0.001 or less
+    values = extremaValues * amplitude
+    count = int(np.argmax(np.abs(values) <= 0.001)) + 1
+
+    frames = np.empty(count + 2)
+    frames[0] = frame
+    frames[1:-1] = extremaFrames[:count] + frame
+    frames[-1] = frames[-2] + 1
+
+    return KeyframeArray(frames, np.concatenate(([0], values[:count], [0])))
+
+def genDampedOscKeyframesBatch(period: float, amplitude: Union[float, np.ndarray], damp: float, frame: np.ndarray) -> List[KeyframeArray]:
+    """generates the damped oscillation keyframes of many notes at once (the same keyframes as `genDampedOscKeyframes()` for each note).
+    all notes share the period and damping, so the extrema are computed once and scaled by each note's amplitude,
+    overlapping oscillations of different notes are left to the overlap modes (see `resolveKeyframes()`)
+
+    :param float period: how long it takes for the oscillation to repeat one time
+    :param Union[float, np.ndarray] amplitude: how large is each oscillation (for each note)
+    :param float damp: damping of the oscillation (how much decrease of energy for each oscillation)
+    :param np.ndarray frame: the frame each oscillation starts at
+    :raises ValueError: if the period is 0, or the damping is not positive (the oscillation would never end)
+    :return List[KeyframeArray]: the keyframes for each note
+    """
+    if period == 0 or not isfinite(period):
+        raise ValueError(f"Damped oscillation period must be a non-zero number (got {period})!")
+    if not damp > 0 or not isfinite(damp):
+        raise ValueError(f"Damped oscillation damping must be bigger than 0 (got {damp}), or the oscillation would never end!")
+
+    frame = np.asarray(frame, dtype=np.float64).reshape(-1)
+    if len(frame) == 0:
+        return []
+
+    amplitude = np.broadcast_to(np.asarray(amplitude, dtype=np.float64), frame.shape)
+
+    # negate period to positive and invert the amplitudes if period is negative
+    if period < 0:
+        period = -period
+        amplitude = -amplitude
+
+    # the template of the largest amplitude is long enough for every note
+    extremaFrames, extremaValues = _dampedOscTemplate(period, damp, float(np.max(np.abs(amplitude))))
+
+    # one row per note: the start, the extrema, and the end key 1 frame after the last extremum
+    # each oscillation ends at its first extremum that is 0.001 or less
+    size = len(extremaFrames)
+    frames = np.empty((len(frame), size + 2))
+    values = np.zeros((len(frame), size + 2))
+    frames[:, 0] = frame
+    frames[:, 1:-1] = extremaFrames + frame[:, None]
+    values[:, 1:-1] = extremaValues * amplitude[:, None]
+
+    counts = np.argmax(np.abs(values[:, 1:-1]) <= 0.001, axis=1) + 1
+    rows = np.arange(len(frame))
+    frames[rows, counts + 1] = frames[rows, counts] + 1
+    values[rows, counts + 1] = 0
+
+    keep = np.arange(size + 2) <= (counts + 1)[:, None]
+    splits = np.cumsum(counts + 2)[:-1]
+    return [KeyframeArray(noteFrames, noteValues) for noteFrames, noteValues in zip(np.split(frames[keep], splits), np.split(values[keep], splits))]
+
+def _adsrValues(time: np.ndarray, timeOn: np.ndarray, timeOff: np.ndarray, attack: float, decay: float, sustainValue: np.ndarray, release: float, peak: np.ndarray, startLevel: np.ndarray) -> np.ndarray:
+    """evaluates the ADSR envelope of each note at a time (see `genADSRKeyframes()`), all arguments are per note
+
+    :return np.ndarray: the value of each note's envelope at its time
+    """
+    # the envelope while the note is held (up to the note off)
+    held = np.minimum(time, timeOff) - timeOn
+    with np.errstate(divide="ignore", invalid="ignore"):
+        heldValue = np.where(
+            held < attack, startLevel + (peak - startLevel) * held / attack,
+            np.where(held < attack + decay, peak + (sustainValue - peak) * (held - attack) / decay, sustainValue)
+        )
+        # after the note off, the release goes from the value at the note off to 0
+        released = np.where(release > 0, heldValue * np.maximum(1 - (time - timeOff) / release, 0), 0)
+
+    return np.where(time <= timeOff, heldValue, released)
+
+def genADSRKeyframes(timeOn: np.ndarray, timeOff: np.ndarray, attack: float, decay: float, sustain: float, release: float, peak: Union[float, np.ndarray] = 1,
+                     hold: float = None) -> List[KeyframeArray]:
+    """generates attack, decay, sustain, release (ADSR) envelope keyframes for many notes at once.
+    the notes share one envelope (like a monophonic synth): a note that starts before the previous note's envelope is over retriggers it,
+    the previous note is cut off at the note on and the attack starts from the value the envelope has reached (and still takes `attack` frames).
+    if a note ends during its attack or decay, the release starts from the value the envelope has reached at the note off.
+    segments of zero length don't get keyframes on the same frame, only the last one (the one Blender would keep) is made,
+    e.g. with no attack the envelope starts at the peak.
+    a note without a note off (`timeOff` < 0, like `MIDINote`) is held until the next note on, the last note is held for `hold` frames
+
+    :param np.ndarray timeOn: the note on time of each note (in frames)
+    :param np.ndarray timeOff: the note off time of each note (in frames), negative if the note has no note off
+    :param float attack: how long it takes to go from 0 to the peak (in frames)
+    :param float decay: how long it takes to go from the peak to the sustain level (in frames)
+    :param float sustain: the sustain level, as a fraction of the peak
+    :param float release: how long it takes to go back to 0 after the note off (in frames)
+    :param Union[float, np.ndarray] peak: the peak value (for each note), defaults to 1
+    :param float hold: how long the last note is held if it has no note off (in frames), defaults to None (`attack + decay`, it releases once it reaches the sustain level)
+    :raises ValueError: if any of the times are negative
+    :return List[KeyframeArray]: the keyframes for each note, in the order of `timeOn`
+    """
+    if hold is None:
+        hold = attack + decay
+    if min(attack, decay, release, hold) < 0:
+        raise ValueError(f"ADSR times must not be negative (got attack {attack}, decay {decay}, release {release}, hold {hold})!")
+
+    timeOn = np.asarray(timeOn, dtype=np.float64).reshape(-1)
+    if len(timeOn) == 0:
+        return []
+
+    # the envelope goes through the notes in the order they start
+    order = np.argsort(timeOn, kind="stable")
+    timeOn = timeOn[order]
+    timeOff = np.asarray(timeOff, dtype=np.float64).reshape(-1)[order]
+    peak = np.broadcast_to(np.asarray(peak, dtype=np.float64), order.shape)[order]
+    sustainValue = peak * sustain
+
+    # notes without a note off are held until the next note on (the last one for `hold` frames)
+    nextOn = np.append(timeOn[1:], np.inf)
+    heldOff = np.where(np.isinf(nextOn), timeOn + hold, nextOn)
+    timeOff = np.where(timeOff < 0, heldOff, np.maximum(timeOff, timeOn))
+
+    # the next note retriggers the envelope if it starts before the release is over
+    retriggered = np.flatnonzero(nextOn < timeOff + release)
+
+    # the value each note's attack starts from, the envelope at the next note on is `slope * startLevel + base`
+    # (the slope is only not 0 if the next note starts, or the note ends, during the attack)
+    startLevel = np.zeros(len(timeOn))
+    def args(i, level):
+        return timeOn[i], timeOff[i], attack, decay, sustainValue[i], release, peak[i], level
+
+    base = _adsrValues(nextOn[retriggered], *args(retriggered, 0))
+    slope = _adsrValues(nextOn[retriggered], *args(retriggered, 1)) - base
+    startLevel[retriggered + 1] = base
+
+    # those depend on the start level of the note before them, so they are followed in order
+    levels = startLevel.tolist()
+    dependent = slope != 0
+    for i, a, b in zip(retriggered[dependent].tolist(), slope[dependent].tolist(), base[dependent].tolist()):
+        levels[i + 1] = a * levels[i] + b
+    startLevel = np.array(levels)
+
+    offValue = _adsrValues(timeOff, *args(np.arange(len(timeOn)), startLevel))
+
+    # one row per note: note on, end of attack, end of decay, note off, end of release
+    frames = np.column_stack((timeOn, timeOn + attack, timeOn + attack + decay, timeOff, timeOff + release))
+    values = np.column_stack((startLevel, peak, sustainValue, offValue, np.zeros(len(timeOn))))
+
+    # the end of the attack/decay is only reached if the note is still held,
+    # a retriggered note is cut off at the next note on (where the next note's first keyframe continues it)
+    keep = frames < nextOn[:, None]
+    keep[:, 0] = True
+    keep[:, 1] &= frames[:, 1] < timeOff
+    keep[:, 2] &= frames[:, 2] < timeOff
+
+    # zero length segments: of the keyframes on the same frame, only the last one is kept (like inserting them in Blender)
+    nextFrame = np.full(len(timeOn), np.inf)
+    for column in range(4, -1, -1):
+        keep[:, column] &= frames[:, column] != nextFrame
+        nextFrame = np.where(keep[:, column], frames[:, column], nextFrame)
+
+    counts = keep.sum(axis=1)
+    splits = np.cumsum(counts)[:-1]
+    noteKeys = [KeyframeArray(noteFrames, noteValues) for noteFrames, noteValues in zip(np.split(frames[keep], splits), np.split(values[keep], splits))]
+
+    # back to the order of the input notes
+    out = [None] * len(noteKeys)
+    for i, keys in zip(order.tolist(), noteKeys):
+        out[i] = keys
     return out
 
 # for handling adding keyframes together
-def findOverlap(keyList1: List[Keyframe], keyList2: List[Keyframe]) -> List[Keyframe]:
+def findOverlap(keyList1: KeyframeArray, keyList2: KeyframeArray) -> int:
     """finds the overlap between two sets of keylists 
     for this to work, the second keylist must be bigger than the first keylist
+    both keylists must be sorted by frame
 
-    :param List[Keyframe] keyList1: first keylist
-    :param List[Keyframe] keyList2: second keylist
+    :param KeyframeArray keyList1: first keylist
+    :param KeyframeArray keyList2: second keylist
     :raises ValueError: if the first keylist's first frame is bigger than the second keylist's first frame
-    :return List[Keyframe]: the list of keyframes that are overlapping
+    :return int: the index in `keyList1` where the overlapping keyframes start (`len(keyList1)` if nothing overlaps), 
+    the overlapping keyframes are the ones after `keyList2`'s first frame plus the keyframe right before it
     """
-    if len(keyList1) == 0 or len(keyList2) == 0:
-        return []
+    size = len(keyList1)
+    if size == 0 or len(keyList2) == 0:
+        return size
     
-    if keyList1[0].frame > keyList2[0].frame:
+    frames = keyList1.frames
+    startFrame = keyList2.frames[0]
+
+    if frames[0] > startFrame:
         # this means a note is somehow going back in time? is this even possible?
         # notes should always be sequential, and not in reverse time
         raise ValueError("first keyframe in keyList1 is bigger than first keyframe in keyList2! Please open a issue on GitHub along with the MIDI file.")
     
-    overlappingKeyList = []
-    overlapping = False
-    for key1 in reversed(keyList1):
-        if key1.frame > keyList2[0].frame:
-            overlapping = True
-            overlappingKeyList.append(key1)
-        else:
-            # not overlapping
-            if overlapping:
-                overlappingKeyList.append(key1)
-            break
+    # the last keyframe that is not after the first frame of keyList2
+    lastBefore = int(np.searchsorted(frames, startFrame, side="right")) - 1
+
+    if lastBefore == size - 1:
+        # not overlapping
+        return size
 
-    return list(reversed(overlappingKeyList))
+    return lastBefore
 
 # for handling adding keyframes together
 def getValue(key1: Keyframe, key2: Keyframe, frame: float) -> float:
@@ -205,6 +418,8 @@ def interval(keyList, frame) -> Tuple[Keyframe]:
     the function would return
     (Keyframe(frame=10.0, value=1.0), Keyframe(frame=20.0, value=0.0))
 
+    this is a linear search, `LinearCurve` finds the interval with a binary search (use it when evaluating many frames)
+
     :param List[Keyframes] keyList: the list of keyframes to check
     :param float frame: the frame to check the interval between
     :return Tuple[Keyframe]: the keyframes that are within that interval
@@ -222,210 +437,770 @@ def interval(keyList, frame) -> Tuple[Keyframe]:
         if keyList[i].frame <= frame <= keyList[i+1].frame:
             return (keyList[i], keyList[i+1])
 
-def addKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
+def _overlapValues(insertedKeys: KeyframeArray, nextKeys: KeyframeArray, overlapStart: int) -> Tuple[np.ndarray, np.ndarray]:
+    """interpolates the overlapping keyframes of `insertedKeys` on `nextKeys` and the other way around
+
+    :return Tuple[np.ndarray, np.ndarray]: the values of `nextKeys` at the overlapping frames, and the values of the overlapping keyframes at the frames of `nextKeys` (None if nothing overlaps)
+    """
+    overlapFrames = insertedKeys.frames[overlapStart:]
+    overlapValues = insertedKeys.values[overlapStart:]
+
+    if len(overlapFrames) == 0:
+        # nothing to interpolate, the next keyframes stay the same
+        return np.zeros(0), None
+
+    return LinearCurve(nextKeys.frames, nextKeys.values).evaluate(overlapFrames), LinearCurve(overlapFrames, overlapValues).evaluate(nextKeys.frames)
+
+def _mergeTail(insertedKeys: KeyframeArray, nextFrames: np.ndarray, nextValues: np.ndarray, overlapStart: int = None, overlapValues: np.ndarray = None, nextFirst: bool = False) -> None:
+    """merges sorted keyframes into the (sorted) inserted keyframes, like appending them and doing a stable sort, but only the end of `insertedKeys` is rewritten.
+    the keyframes from `overlapStart` can get new values at the same time
+
+    :param KeyframeArray insertedKeys: the keyframes that are already inserted on the object (sorted)
+    :param np.ndarray nextFrames: the sorted frames to merge in
+    :param np.ndarray nextValues: the values to merge in
+    :param int overlapStart: index of the first keyframe that gets a new value, defaults to None (no new values)
+    :param np.ndarray overlapValues: the new values of the keyframes from `overlapStart`, defaults to None
+    :param bool nextFirst: if the merged keyframes go before the inserted keyframes on the same frame, defaults to False
+    """
+    if overlapStart is None:
+        overlapStart = len(insertedKeys)
+        overlapValues = np.zeros(0)
+
+    # the keyframes before the first merged keyframe (and before the new values) are not touched
+    start = overlapStart
+    if len(nextFrames) != 0:
+        start = min(start, int(np.searchsorted(insertedKeys.frames, nextFrames[0], side="left" if nextFirst else "right")))
+
+    tailFrames = insertedKeys.frames[start:]
+    tailValues = np.concatenate((insertedKeys.values[start:overlapStart], overlapValues))
+
+    if nextFirst:
+        frames, values = np.concatenate((nextFrames, tailFrames)), np.concatenate((nextValues, tailValues))
+    else:
+        frames, values = np.concatenate((tailFrames, nextFrames)), np.concatenate((tailValues, nextValues))
+    
+    order = np.argsort(frames, kind="stable")
+    insertedKeys.replaceTail(start, frames[order], values[order])
+
+# overlaps with at most this many keyframes (overlapping and next keyframes) are resolved with Python floats,
+# on a few keyframes the NumPy calls cost more than they save
+SCALAR_OVERLAP_SIZE = 16
+
+def _scalarValue(frames: List[float], values: List[float], frame: float) -> float:
+    """evaluates sorted keyframes at a frame like `LinearCurve.evaluate()` (same segment, same rounding), for the scalar overlap path
+
+    :param List[float] frames: the sorted frames (not empty)
+    :param List[float] values: the values
+    :param float frame: the frame to evaluate
+    :return float: the value at the frame
+    """
+    if len(frames) == 1 or frame < frames[0]:
+        return values[0]
+    if frame > frames[-1]:
+        return values[-1]
+
+    i = min(max(bisect_left(frames, frame) - 1, 0), len(frames) - 2)
+    x1, y1, x2, y2 = frames[i], values[i], frames[i + 1], values[i + 1]
+    if frame == x2:
+        return y2
+
+    return y1 + ((y2 - y1) / (x2 - x1) if x2 != x1 else 0) * (frame - x1)
+
+def _mergeTailScalar(insertedKeys: KeyframeArray, start: int, tailFrames: List[float], tailValues: List[float], nextFrames: List[float], nextValues: List[float], nextFirst: bool = False) -> None:
+    """`_mergeTail()` for the scalar overlap path: merges the next keyframes with the (new) keyframes of `insertedKeys` from `start` with a stable sort
+
+    :param KeyframeArray insertedKeys: the keyframes that are already inserted on the object (sorted)
+    :param int start: index of the first keyframe that is rewritten
+    :param List[float] tailFrames: the frames of the keyframes from `start`
+    :param List[float] tailValues: the (new) values of the keyframes from `start`
+    :param List[float] nextFrames: the sorted frames to merge in
+    :param List[float] nextValues: the values to merge in
+    :param bool nextFirst: if the merged keyframes go before the inserted keyframes on the same frame, defaults to False
+    """
+    if not nextFrames:
+        # only new values, the frames stay the same
+        insertedKeys.values[start:] = tailValues
+        return
+
+    if nextFirst:
+        keys = list(zip(nextFrames, nextValues)) + list(zip(tailFrames, tailValues))
+    else:
+        keys = list(zip(tailFrames, tailValues)) + list(zip(nextFrames, nextValues))
+    keys.sort(key=itemgetter(0))
+
+    insertedKeys.replaceTail(start, [frame for frame, _ in keys], [value for _, value in keys])
+
+def addKeyframes(insertedKeys: KeyframeArray, nextKeys: KeyframeArray) -> None:
     """adds the two lists of keyframes together.
     check out the desmos graph to learn a bit more on how this works
     https://www.desmos.com/calculator/t7ullcvosp
     this is a mutating function
     
-    :param List[Keyframe] insertedKeys: the keyframes that are already inserted on the object
-    :param List[Keyframe] nextKeys: the keyframes that will be inserted next (the upcoming note)
+    :param KeyframeArray insertedKeys: the keyframes that are already inserted on the object (sorted)
+    :param KeyframeArray nextKeys: the keyframes that will be inserted next (the upcoming note, sorted)
     :raises ValueError: if the `insertedKeys'` first frame is bigger than `nextKeys'` first frame
     :return None: this function mutates the insertedKeys list
     """
+    overlapStart = findOverlap(insertedKeys, nextKeys)
+
+    if overlapStart == len(insertedKeys):
+        # nothing overlaps, every inserted keyframe is at or before the next keyframes
+        insertedKeys.extend(nextKeys)
+        return
 
-    keysOverlapping = findOverlap(insertedKeys, nextKeys)
+    if len(insertedKeys) - overlapStart + len(nextKeys) <= SCALAR_OVERLAP_SIZE:
+        overlapFrames, overlapValues = insertedKeys.frames[overlapStart:].tolist(), insertedKeys.values[overlapStart:].tolist()
+        nextFrames, nextValues = nextKeys.frames.tolist(), nextKeys.values.tolist()
 
-    insertedKeysInterValues = []
-    nextKeysInterValues = []
+        _mergeTailScalar(insertedKeys, overlapStart, overlapFrames,
+                         [value + _scalarValue(nextFrames, nextValues, frame) for frame, value in zip(overlapFrames, overlapValues)],
+                         nextFrames, [value + _scalarValue(overlapFrames, overlapValues, frame) for frame, value in zip(nextFrames, nextValues)])
+        return
 
     # interpolate the keyframes for each set of keyframes
-    for key in nextKeys:
-        inv1, inv2 = interval(keysOverlapping, key.frame)
-        if inv1 is None and inv2 is None: continue
-        nextKeysInterValues.append(Keyframe(key.frame, getValue(inv1, inv2, key.frame)))
-
-    for key in keysOverlapping:
-        inv1, inv2 = interval(nextKeys, key.frame)
-        if inv1 is None and inv2 is None: continue
-        insertedKeysInterValues.append(Keyframe(key.frame, getValue(inv1, inv2, key.frame)))
+    insertedInterValues, nextInterValues = _overlapValues(insertedKeys, nextKeys, overlapStart)
 
     # now add the keyframe values together (the most important part)
-    for key, interp in zip(keysOverlapping, insertedKeysInterValues):
-        key.value += interp.value
+    overlapValues = insertedKeys.values[overlapStart:] + insertedInterValues
+    nextValues = nextKeys.values if nextInterValues is None else nextKeys.values + nextInterValues
 
-    for key, interp in zip(nextKeys, nextKeysInterValues):
-        key.value += interp.value
+    # the overlapping keyframes and the next keyframes are merged and replace the end of the inserted keyframes
+    _mergeTail(insertedKeys, nextKeys.frames, nextValues, overlapStart, overlapValues)
 
-    # extend the lists 
-    # TODO (need a better method to ensure the keyframes before get cut off and then start )
-    keysOverlapping.extend(nextKeys)
-    keysOverlapping.sort(key=lambda keyframe: keyframe.frame)
 
-    insertedKeys.extend(keysOverlapping)
+def minKeyframes(insertedKeys: KeyframeArray, nextKeys: KeyframeArray) -> None:
+    overlapStart = findOverlap(insertedKeys, nextKeys)
 
+    if overlapStart == len(insertedKeys):
+        # nothing overlaps, every inserted keyframe is at or before the next keyframes
+        insertedKeys.extend(nextKeys)
+        return
 
-def minKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
-    keysOverlapping = findOverlap(insertedKeys, nextKeys)
+    overlapFrames = insertedKeys.frames[overlapStart:]
 
-    insertedKeysInterValues = []
-    nextKeysInterValues = []
+    if len(overlapFrames) + len(nextKeys) <= SCALAR_OVERLAP_SIZE:
+        overlapFrames, overlapValues = overlapFrames.tolist(), insertedKeys.values[overlapStart:].tolist()
+        nextFrames, nextValues = nextKeys.frames.tolist(), nextKeys.values.tolist()
 
-    # interpolate the keyframes for each set of keyframes
-    for key in nextKeys:
-        inv1, inv2 = interval(keysOverlapping, key.frame)
-        if inv1 is None and inv2 is None: continue
-        nextKeysInterValues.append(Keyframe(key.frame, getValue(inv1, inv2, key.frame)))
+        newOverlapValues = []
+        for frame, value in zip(overlapFrames, overlapValues):
+            other = _scalarValue(nextFrames, nextValues, frame)
+            # if they're resting, who cares
+            newOverlapValues.append(min(value, other) if other != 0 and value != 0 else value)
 
-    for key in keysOverlapping:
-        inv1, inv2 = interval(nextKeys, key.frame)
-        if inv1 is None and inv2 is None: continue
-        insertedKeysInterValues.append(Keyframe(key.frame, getValue(inv1, inv2, key.frame)))
+        # insert nextKeys only if they don't already exist in insertedKeys
+        overlapping = set(overlapFrames)
+        newNextFrames, newNextValues = [], []
+        for frame, value in zip(nextFrames, nextValues):
+            if frame not in overlapping:
+                other = _scalarValue(overlapFrames, overlapValues, frame)
+                newNextFrames.append(frame)
+                newNextValues.append(min(value, other) if other != 0 and value != 0 else value)
 
-    # now compare the keyframe values and keep the maximum value
-    for key, interp in zip(keysOverlapping, insertedKeysInterValues):
-        # if they're resting, who cares
-        if interp.value != 0 and key.value != 0:
-            print(key.value, interp.value)
-            key.value = min(key.value, interp.value)
+        _mergeTailScalar(insertedKeys, overlapStart, overlapFrames, newOverlapValues, newNextFrames, newNextValues)
+        return
+
+    insertedInterValues, nextInterValues = _overlapValues(insertedKeys, nextKeys, overlapStart)
+
+    # now compare the keyframe values and keep the minimum value
+    # if they're resting, who cares
+    overlapValues = insertedKeys.values[overlapStart:]
+    overlapValues = np.where((insertedInterValues != 0) & (overlapValues != 0), np.minimum(overlapValues, insertedInterValues), overlapValues)
 
-    for key, interp in zip(nextKeys, nextKeysInterValues):
-        if interp.value != 0 and key.value != 0:
-            key.value = min(key.value, interp.value)
+    nextValues = nextKeys.values
+    if nextInterValues is not None:
+        nextValues = np.where((nextInterValues != 0) & (nextValues != 0), np.minimum(nextValues, nextInterValues), nextValues)
 
     # extend the lists (insert nextKeys only if they don't already exist in insertedKeys)
-    non_overlapping_keys = [key for key in nextKeys if key.frame not in [k.frame for k in keysOverlapping]]
-    insertedKeys.extend(non_overlapping_keys)
-    insertedKeys.sort(key=lambda keyframe: keyframe.frame)
+    nonOverlapping = ~np.isin(nextKeys.frames, overlapFrames)
+    _mergeTail(insertedKeys, nextKeys.frames[nonOverlapping], nextValues[nonOverlapping], overlapStart, overlapValues)
 
 
-def maxKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
-    keysOverlapping = findOverlap(insertedKeys, nextKeys)
+def maxKeyframes(insertedKeys: KeyframeArray, nextKeys: KeyframeArray) -> None:
+    overlapStart = findOverlap(insertedKeys, nextKeys)
 
-    insertedKeysInterValues = []
-    nextKeysInterValues = []
+    if overlapStart == len(insertedKeys):
+        # nothing overlaps, every inserted keyframe is at or before the next keyframes
+        insertedKeys.extend(nextKeys)
+        return
 
-    # interpolate the keyframes for each set of keyframes
-    for key in nextKeys:
-        inv1, inv2 = interval(keysOverlapping, key.frame)
-        if inv1 is None and inv2 is None: continue
-        nextKeysInterValues.append(Keyframe(key.frame, getValue(inv1, inv2, key.frame)))
+    overlapFrames = insertedKeys.frames[overlapStart:]
+
+    if len(overlapFrames) + len(nextKeys) <= SCALAR_OVERLAP_SIZE:
+        overlapFrames, overlapValues = overlapFrames.tolist(), insertedKeys.values[overlapStart:].tolist()
+        nextFrames, nextValues = nextKeys.frames.tolist(), nextKeys.values.tolist()
+
+        newOverlapValues = []
+        for frame, value in zip(overlapFrames, overlapValues):
+            other = _scalarValue(nextFrames, nextValues, frame)
+            newOverlapValues.append(max(value, other))
+
+        # insert nextKeys only if they don't already exist in insertedKeys
+        overlapping = set(overlapFrames)
+        newNextFrames, newNextValues = [], []
+        for frame, value in zip(nextFrames, nextValues):
+            if frame not in overlapping:
+                other = _scalarValue(overlapFrames, overlapValues, frame)
+                newNextFrames.append(frame)
+                newNextValues.append(max(value, other))
+
+        _mergeTailScalar(insertedKeys, overlapStart, overlapFrames, newOverlapValues, newNextFrames, newNextValues)
+        return
 
-    for key in keysOverlapping:
-        inv1, inv2 = interval(nextKeys, key.frame)
-        if inv1 is None and inv2 is None: continue
-        insertedKeysInterValues.append(Keyframe(key.frame, getValue(inv1, inv2, key.frame)))
+    insertedInterValues, nextInterValues = _overlapValues(insertedKeys, nextKeys, overlapStart)
 
     # now compare the keyframe values and keep the maximum value
-    for key, interp in zip(keysOverlapping, insertedKeysInterValues):
-        key.value = max(key.value, interp.value)
+    overlapValues = np.maximum(insertedKeys.values[overlapStart:], insertedInterValues)
 
-    for key, interp in zip(nextKeys, nextKeysInterValues):
-        key.value = max(key.value, interp.value)
+    nextValues = nextKeys.values if nextInterValues is None else np.maximum(nextKeys.values, nextInterValues)
 
     # extend the lists (insert nextKeys only if they don't already exist in insertedKeys)
-    non_overlapping_keys = [key for key in nextKeys if key.frame not in [k.frame for k in keysOverlapping]]
-    insertedKeys.extend(non_overlapping_keys)
-    insertedKeys.sort(key=lambda keyframe: keyframe.frame)
+    nonOverlapping = ~np.isin(nextKeys.frames, overlapFrames)
+    _mergeTail(insertedKeys, nextKeys.frames[nonOverlapping], nextValues[nonOverlapping], overlapStart, overlapValues)
 
-def prevKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
-    keysOverlapping = findOverlap(insertedKeys, nextKeys)
+def prevKeyframes(insertedKeys: KeyframeArray, nextKeys: KeyframeArray) -> None:
+    overlapStart = findOverlap(insertedKeys, nextKeys)
 
     # if there are ANY overlapping keyframes, ignore the nextKeys
-    if not keysOverlapping:
+    # (otherwise every inserted keyframe is before the next keys, so they stay sorted)
+    if overlapStart == len(insertedKeys):
         insertedKeys.extend(nextKeys)
 
-    # sort keys
-    insertedKeys.sort(key=lambda keyframe: keyframe.frame)
 
-
-def nextKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
+def nextKeyframes(insertedKeys: KeyframeArray, nextKeys: KeyframeArray) -> None:
     # Find overlapping keyframes between insertedKeys and nextKeys
-    keysOverlapping = findOverlap(insertedKeys, nextKeys)
+    overlapStart = findOverlap(insertedKeys, nextKeys)
 
     # if there are overlapping keyframes, we need to start from the first overlapping keyframe, and remove all keyframes after it in the insertedKeys
-    if keysOverlapping:
-        firstOverlapFrame = keysOverlapping[0].frame
-        # go backward and pop each element until we reach the last overlapping keyframe
-        for key in reversed(insertedKeys):
-            if key.frame > firstOverlapFrame:
-                insertedKeys.pop()
-            else:
-                break
+    if overlapStart < len(insertedKeys):
+        firstOverlapFrame = insertedKeys.frames[overlapStart]
+        insertedKeys.truncate(int(np.searchsorted(insertedKeys.frames, firstOverlapFrame, side="right")))
 
     # extend the next keys regardless if its overlapping or not
+    # (the keyframes left are all before the next keys, so they stay sorted)
     insertedKeys.extend(nextKeys)
-    insertedKeys.sort(key=lambda keyframe: keyframe.frame)
 
 
-def restValueCrossingKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
+def restValueCrossingKeyframes(insertedKeys: KeyframeArray, nextKeys: KeyframeArray) -> None:
     restValue = 0
-    keysOverlapping = findOverlap(insertedKeys, nextKeys)
+    overlapStart = findOverlap(insertedKeys, nextKeys)
+
+    if len(nextKeys) == 0:
+        return
+    insertedFrames, insertedValues = insertedKeys.frames, insertedKeys.values
+    if len(insertedFrames) == 0 or insertedFrames[-1] < nextKeys.frames[0]:
+        # nothing overlaps or touches the next keyframes (the next keyframes go first on the same frame)
+        insertedKeys.extend(nextKeys)
+        return
+
+    overlapFrames = insertedFrames[overlapStart:]
+
+    if len(overlapFrames) + len(nextKeys) <= SCALAR_OVERLAP_SIZE:
+        overlapFrames, overlapValues = overlapFrames.tolist(), insertedValues[overlapStart:].tolist()
+        nextFrames, nextValues = nextKeys.frames.tolist(), nextKeys.values.tolist()
 
-    for key in keysOverlapping:
-        for nextKey in nextKeys:
-            if key.frame == nextKey.frame:
-                # Interpolate the values to cross the rest value (0) smoothly
-                insertedValueToRest = (key.value + restValue) / 2
-                nextValueFromRest = (nextKey.value + restValue) / 2
-                
-                # Adjust the current keyframe value to fade out to rest value
-                key.value = insertedValueToRest
+        # fade the overlapping keyframes out to the rest value once for every next keyframe on the same frame
+        overlapValues = [(value - restValue) * (0.5 ** nextFrames.count(frame)) + restValue for frame, value in zip(overlapFrames, overlapValues)]
 
-                # Adjust the next keyframe value to fade in from rest value
-                nextKey.value = nextValueFromRest
+        overlapping = set(overlapFrames)
+        nonOverlapping = [(frame, value) for frame, value in zip(nextFrames, nextValues) if frame not in overlapping]
+
+        # the inserted keyframes on the first merged frame go after the merged keyframes too
+        start = overlapStart
+        if nonOverlapping:
+            start = min(start, int(np.searchsorted(insertedFrames, nonOverlapping[0][0], side="left")))
+        tailFrames = insertedFrames[start:overlapStart].tolist() + overlapFrames
+        tailValues = insertedValues[start:overlapStart].tolist() + overlapValues
+
+        _mergeTailScalar(insertedKeys, start, tailFrames, tailValues, [frame for frame, _ in nonOverlapping], [value for _, value in nonOverlapping], nextFirst=True)
+        return
+
+    # Interpolate the values to cross the rest value (0) smoothly
+    # Adjust the current keyframe value to fade out to rest value (once for every next keyframe on the same frame)
+    sameFrameCount = np.searchsorted(nextKeys.frames, overlapFrames, side="right") - np.searchsorted(nextKeys.frames, overlapFrames, side="left")
+    overlapValues = (insertedKeys.values[overlapStart:] - restValue) * (0.5 ** sameFrameCount) + restValue
 
     # Identify non-overlapping keyframes in nextKeys
-    nonOverlappingNextKeys = [key for key in nextKeys if key.frame not in [k.frame for k in keysOverlapping]]
-
-    # Combine non-overlapping nextKeys with insertedKeys
-    finalKeyframes = []
-    i, j = 0, 0
-    while i < len(insertedKeys) and j < len(nonOverlappingNextKeys):
-        if insertedKeys[i].frame < nonOverlappingNextKeys[j].frame:
-            finalKeyframes.append(insertedKeys[i])
-            i += 1
+    # (the next keyframes on the same frames as overlapping keyframes are not used)
+    nonOverlapping = ~np.isin(nextKeys.frames, overlapFrames)
+
+    # Combine non-overlapping nextKeys with insertedKeys (next keyframes go first on the same frame)
+    _mergeTail(insertedKeys, nextKeys.frames[nonOverlapping], nextKeys.values[nonOverlapping], overlapStart, overlapValues, nextFirst=True)
+
+
+def pruneKeyframes(insertedKeys: KeyframeArray, nextKeys: KeyframeArray) -> None:
+    overlapStart = findOverlap(insertedKeys, nextKeys)
+
+    # Prune strategy: remove the last couple of keyframes from insertedKeys
+    # the keyframes are sorted, so every keyframe is at or before the last overlapping keyframe
+    if overlapStart < len(insertedKeys):
+        # If there's overlap, we'll remove the last keyframe or two (always keeping the first one)
+        insertedKeys.truncate(len(insertedKeys) - min(2, len(insertedKeys) - 1))
+
+    # Merge the next keys into the pruned keyframes
+    _mergeTail(insertedKeys, nextKeys.frames, nextKeys.values)
+
+
+def addKeyframesBatch(noteKeys: List[KeyframeArray]) -> KeyframeArray:
+    """adds the keyframes of all notes of a FCurve together in one sweep, this gives the same keyframes as calling `addKeyframes()` for every note.
+    when every note starts and ends at rest (0), adding notes one by one is the same as summing their (piecewise linear) curves,
+    so the sum is evaluated on every keyframe's frame by sorting the slope changes of all notes once (O(K log K) for K keyframes)
+    if a note does not start and end at rest, or has two keyframes on the same frame, this falls back to `addKeyframes()` for each note
+
+    :param List[KeyframeArray] noteKeys: the keyframes of each note (sorted), in the order of the notes
+    :raises ValueError: if a note starts before the first note
+    :return KeyframeArray: the added keyframes, sorted by frame
+    """
+    noteKeys = [keys for keys in noteKeys if len(keys) != 0]
+    if not noteKeys:
+        return KeyframeArray()
+
+    frames = np.concatenate([keys.frames for keys in noteKeys])
+    values = np.concatenate([keys.values for keys in noteKeys])
+    
+    # index of the first and last keyframe of each note
+    lasts = np.cumsum([len(keys) for keys in noteKeys]) - 1
+    firsts = np.concatenate(([0], lasts[:-1] + 1))
+
+    # pairs of keyframes that belong to the same note
+    samePair = np.ones(len(frames) - 1, dtype=bool)
+    samePair[lasts[:-1]] = False
+    frameDiffs = np.diff(frames)
+
+    resting = np.all(values[firsts] == 0) and np.all(values[lasts] == 0) and np.all(frameDiffs[samePair] > 0)
+    if not resting:
+        out = KeyframeArray()
+        for keys in noteKeys:
+            addKeyframes(insertedKeys=out, nextKeys=keys)
+        return out
+    
+    if np.any(frames[firsts] < frames[0]):
+        # same check as findOverlap()
+        raise ValueError("first keyframe in keyList1 is bigger than first keyframe in keyList2! Please open a issue on GitHub along with the MIDI file.")
+
+    # change of slope at every keyframe, each note is flat (0) before its first and after its last keyframe
+    slopes = np.zeros(len(frames) + 1)
+    slopes[1:-1][samePair] = np.diff(values)[samePair] / frameDiffs[samePair]
+    slopeChanges = np.diff(slopes)
+
+    # +1 when a note starts, -1 when it ends, to know when no note is playing
+    activeChanges = np.zeros(len(frames))
+    np.add.at(activeChanges, firsts, 1)
+    np.add.at(activeChanges, lasts, -1)
+
+    # the sweep: group the changes by frame
+    order = np.argsort(frames, kind="stable")
+    breakpoints, starts = np.unique(frames[order], return_index=True)
+    slopeAfter = np.cumsum(np.add.reduceat(slopeChanges[order], starts))
+    activeAfter = np.cumsum(np.add.reduceat(activeChanges[order], starts))
+
+    # nothing is playing, snap back to exactly 0 so rounding errors don't carry over to the next notes
+    resting = activeAfter == 0
+    slopeAfter[resting] = 0
+
+    values = np.zeros(len(breakpoints))
+    values[1:] = np.cumsum(slopeAfter[:-1] * np.diff(breakpoints))
+
+    # the value is exactly 0 at every rest, remove the rounding error collected up to the last rest
+    lastRest = np.maximum.accumulate(np.where(resting, np.arange(len(breakpoints)), -1))
+    values -= np.where(lastRest >= 0, values[np.maximum(lastRest, 0)], 0)
+
+    return KeyframeArray(breakpoints, values)
+
+def _evaluateNotes(noteKeys: List[KeyframeArray], sampleFrames: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """evaluates every note on the sample frames it is playing on (between its first and last keyframe), for all notes at once
+
+    :param List[KeyframeArray] noteKeys: the keyframes of each note (sorted, not empty)
+    :param np.ndarray sampleFrames: the sorted frames to evaluate on
+    :return Tuple[np.ndarray, np.ndarray, np.ndarray]: for every (note, sample frame) pair: the note index, the sample frame index and the value of the note
+    """
+    curves = LinearCurves(noteKeys)
+    frames = curves.frames
+
+    # every (note, sample frame) pair where the note is playing, each note plays over a run of sample frames
+    lo = np.searchsorted(sampleFrames, frames[curves.firsts], side="left")
+    hi = np.searchsorted(sampleFrames, frames[curves.lasts], side="right")
+    counts = hi - lo
+    notes = np.repeat(np.arange(len(noteKeys)), counts)
+    at = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)
+
+    noteValues = curves.evaluate(notes, sampleFrames[at])
+
+    return notes, at, noteValues
+
+def _combineNotes(notes: np.ndarray, at: np.ndarray, noteValues: np.ndarray, size: int, mode: str) -> np.ndarray:
+    """combines the values of the notes playing on the same sample frame with the rule of an overlap mode, sample frames without a note playing are 0
+
+    :param np.ndarray notes: the note index of each value
+    :param np.ndarray at: the sample frame index of each value
+    :param np.ndarray noteValues: the values
+    :param int size: the number of sample frames
+    :param str mode: the overlap mode
+    :return np.ndarray: the value on each sample frame
+    """
+    if mode == "add":
+        return np.bincount(at, weights=noteValues, minlength=size)
+    
+    elif mode == "max":
+        out = np.full(size, -np.inf)
+        np.maximum.at(out, at, noteValues)
+    
+    elif mode == "min":
+        # if they're resting, who cares
+        out = np.full(size, np.inf)
+        np.minimum.at(out, at, np.where(noteValues != 0, noteValues, np.inf))
+    
+    elif mode == "rvc":
+        # every playing note is pulled towards the rest value (0) by the other playing notes
+        count = np.bincount(at, minlength=size)
+        out = np.bincount(at, weights=noteValues, minlength=size) / np.maximum(count, 1)
+    
+    else:
+        # "prev": the note that started first wins, "next" / "prune": the note that started last wins
+        # the pairs are ordered by note, sort them by sample frame and pick the first/last of each
+        out = np.zeros(size)
+        if len(at) != 0:
+            order = np.argsort(at, kind="stable")
+            sortedAt = at[order]
+            if mode == "prev":
+                winners = order[np.flatnonzero(np.r_[True, sortedAt[1:] != sortedAt[:-1]])]
+            else:
+                winners = order[np.flatnonzero(np.r_[sortedAt[1:] != sortedAt[:-1], True])]
+            out[at[winners]] = noteValues[winners]
+
+    # no note playing
+    out[np.isinf(out)] = 0
+    return out
+
+def envelopeKeyframes(noteKeys: List[KeyframeArray], mode: str) -> KeyframeArray:
+    """gets the upper ("max") or lower ("min") envelope of the curves of all notes of a FCurve on every keyframe's frame.
+    a note only takes part between its first and last keyframe, for "min" notes that are resting (0) are ignored, like `minKeyframes()`
+
+    :param List[KeyframeArray] noteKeys: the keyframes of each note (sorted)
+    :param str mode: "max" for the upper envelope, "min" for the lower envelope
+    :raises ValueError: if the mode is not "min" or "max"
+    :return KeyframeArray: one keyframe for every frame any note has a keyframe on, sorted by frame
+    """
+    if mode not in ("min", "max"):
+        raise ValueError(f"Envelope mode '{mode}' is not supported, use 'min' or 'max'!")
+
+    noteKeys = [keys for keys in noteKeys if len(keys) != 0]
+    if not noteKeys:
+        return KeyframeArray()
+
+    breakpoints = np.unique(np.concatenate([keys.frames for keys in noteKeys]))
+    notes, at, noteValues = _evaluateNotes(noteKeys, breakpoints)
+
+    return KeyframeArray(breakpoints, _combineNotes(notes, at, noteValues, len(breakpoints), mode))
+
+# the overlap modes `sampleKeyframes()` can represent, "rvc" and "prune" change the keyframes of the notes themselves
+SAMPLED_MODES = ("add", "min", "max", "prev", "next")
+
+# slope changes smaller than this (relative to the biggest value) are float noise and don't make a keyframe
+SAMPLE_SLOPE_TOLERANCE = 1e-9
+
+def sampleKeyframes(noteKeys: List[KeyframeArray], mode: str, step: float = 1) -> KeyframeArray:
+    """evaluates the curves of all notes of a FCurve on a grid of frames and combines them with the rule of an overlap mode.
+    this costs time for every frame of the grid (plus every frame a note plays on), not for every overlapping pair of notes, which suits dense parts.
+    the curves are only known on the grid, so peaks between grid frames are cut off. keyframes are only made where the combined curve changes direction
+
+    the rules are: "add" sums the playing notes, "min"/"max" like `envelopeKeyframes()`, "prev" uses the note that started first
+    and "next" uses the note that started last. "rvc" and "prune" aren't supported, they need the keyframes backend
+
+    :param List[KeyframeArray] noteKeys: the keyframes of each note (sorted), in the order of the notes
+    :param str mode: the overlap mode (`anim_overlap`), one of `SAMPLED_MODES`
+    :param float step: the distance between grid frames, defaults to 1 (every frame)
+    :raises ValueError: if the mode can't be sampled or the step is not positive
+    :return KeyframeArray: the combined keyframes, sorted by frame
+    """
+    if mode not in SAMPLED_MODES:
+        raise ValueError(f"Overlap mode '{mode}' can't be sampled, use one of {', '.join(SAMPLED_MODES)} or the keyframes backend!")
+    if not step > 0:
+        raise ValueError(f"Sample step must be bigger than 0 (got {step})!")
+
+    noteKeys = [keys for keys in noteKeys if len(keys) != 0]
+    if not noteKeys:
+        return KeyframeArray()
+
+    # the grid covers every note, including one resting frame on each side
+    startFrame = min(keys.frames[0] for keys in noteKeys)
+    endFrame = max(keys.frames[-1] for keys in noteKeys)
+    first = floor(startFrame / step) - 1
+    last = ceil(endFrame / step) + 1
+    grid = np.arange(first, last + 1) * step
+
+    notes, at, noteValues = _evaluateNotes(noteKeys, grid)
+    values = _combineNotes(notes, at, noteValues, len(grid), mode)
+
+    # only keep the grid frames where the curve changes direction (and the first and last one)
+    keep = np.ones(len(grid), dtype=bool)
+    slopes = np.diff(values)
+    tolerance = SAMPLE_SLOPE_TOLERANCE * max(1.0, float(np.abs(values).max()))
+    keep[1:-1] = np.abs(slopes[1:] - slopes[:-1]) > tolerance
+
+    return KeyframeArray(grid[keep], values[keep])
+
+def _simplifyError(frames: np.ndarray, values: np.ndarray, start: int, end: int, valueTolerance: float, frameTolerance: float) -> Tuple[np.ndarray, np.ndarray]:
+    """gets how far the keyframes between `start` and `end` are from the straight line that would replace them
+    
+    :return Tuple[np.ndarray, np.ndarray]: the vertical distance of each keyframe to the line, and if each keyframe is within the tolerances
+    """
+    x, y = frames[start + 1:end], values[start + 1:end]
+    x1, y1, x2, y2 = frames[start], values[start], frames[end], values[end]
+    dx, dy = x2 - x1, y2 - y1
+
+    # vertical distance to the line
+    if dx != 0:
+        vertical = np.abs(y1 + (dy / dx) * (x - x1) - y)
+    else:
+        # keyframes on the same frame, the line is vertical
+        vertical = np.maximum(np.maximum(y - max(y1, y2), min(y1, y2) - y), 0)
+    
+    within = vertical <= valueTolerance
+
+    if frameTolerance > 0 and valueTolerance > 0:
+        # distance to the line segment with the frames scaled by the frame tolerance and the values by the value tolerance,
+        # a distance of 1 or less means there is a point on the line within both tolerances
+        sx, sy = (x - x1) / frameTolerance, (y - y1) / valueTolerance
+        sdx, sdy = dx / frameTolerance, dy / valueTolerance
+        length = sdx**2 + sdy**2
+        t = np.clip((sx * sdx + sy * sdy) / length, 0, 1) if length != 0 else np.zeros(len(x))
+        within |= np.hypot(sx - t * sdx, sy - t * sdy) <= 1
+    
+    elif frameTolerance > 0:
+        # the value has to be exact, so only the frame of the point on the line with the same value can be off
+        if dy != 0:
+            t = (y - y1) / dy
+            horizontal = np.where((t >= 0) & (t <= 1), np.abs(x1 + t * dx - x), np.inf)
         else:
-            finalKeyframes.append(nonOverlappingNextKeys[j])
-            j += 1
+            horizontal = np.where(y == y1, 0, np.inf)
+        within |= horizontal <= frameTolerance
+
+    return vertical, within
 
-    # Add any remaining keyframes
-    finalKeyframes.extend(insertedKeys[i:])
-    finalKeyframes.extend(nonOverlappingNextKeys[j:])
+def simplifyKeyframes(keys: KeyframeArray, valueTolerance: float, frameTolerance: float = 0) -> KeyframeArray:
+    """removes keyframes that are not needed to keep the (linear) curve within the tolerances, using the Ramer-Douglas-Peucker algorithm.
+    every removed keyframe is within `valueTolerance` of the simplified curve on its frame,
+    or (if `frameTolerance` is bigger than 0) within `frameTolerance` frames and `valueTolerance` of a point on the simplified curve.
+    the first and last keyframes are always kept
 
-    # Update insertedKeys with final combined keyframes
-    insertedKeys.clear()
-    insertedKeys.extend(finalKeyframes)
+    :param KeyframeArray keys: the keyframes (sorted)
+    :param float valueTolerance: how far off (in value) the curve can be, 0 only removes keyframes that are exactly on the line
+    :param float frameTolerance: how far off (in frames) the curve can be, defaults to 0
+    :return KeyframeArray: the simplified keyframes
+    """
+    if len(keys) <= 2:
+        return keys.copy()
+    
+    frames, values = keys.frames, keys.values
+    keep = np.zeros(len(keys), dtype=bool)
+    keep[0] = keep[-1] = True
+
+    # split (start, end) at the keyframe furthest off the line until every keyframe in between is within the tolerances
+    stack = [(0, len(keys) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        vertical, within = _simplifyError(frames, values, start, end, valueTolerance, frameTolerance)
+        if not within.all():
+            # split at the keyframe furthest off the line (of the ones outside the tolerances)
+            split = start + 1 + int(np.argmax(np.where(within, -np.inf, vertical)))
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    
+    return KeyframeArray(frames[keep], values[keep])
 
+# the rules `dedupKeyframes()` can merge coincident keyframes with
+DEDUP_RULES = ("last", "first", "max", "min", "sum")
 
-def pruneKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
-    keysOverlapping = findOverlap(insertedKeys, nextKeys)
+# seconds to wait for all planning workers, the FCurves they haven't planned by then are planned in this process
+PARALLEL_PLANNING_TIMEOUT = 60
 
-    # Prune strategy: remove the last couple of keyframes from insertedKeys
-    if keysOverlapping:
-        last_overlap_frame = max(key.frame for key in keysOverlapping)
-        
-        # Identify keyframes in insertedKeys that overlap and are near the end
-        prunedInsertedKeys = [key for key in insertedKeys if key.frame <= last_overlap_frame]
-        
-        # If there's overlap, we'll remove the last keyframe or two
-        if len(prunedInsertedKeys) > 1:
-            prunedInsertedKeys.pop()  # Remove the last overlapping keyframe
-            if len(prunedInsertedKeys) > 1:
-                prunedInsertedKeys.pop()  # Optionally remove one more for smoother transition
-
-        # Remaining keyframes
-        remainingInsertedKeys = [key for key in insertedKeys if key.frame > last_overlap_frame]
-        
-        # Final keyframes after pruning
-        finalKeyframes = prunedInsertedKeys + remainingInsertedKeys + nextKeys
+def dedupKeyframes(keys: KeyframeArray, epsilon: float = 0, rule: str = "last") -> KeyframeArray:
+    """merges keyframes that are (almost) on the same frame in one pass, so each frame only gets one keyframe insert.
+    a keyframe is merged into the current group if it is no more than `epsilon` frames after the group's first keyframe
+    (measured from the first keyframe, so evenly spaced keyframes closer than `epsilon` don't chain into one group),
+    each group of merged keyframes becomes one keyframe on the group's first frame
+
+    :param KeyframeArray keys: the keyframes (sorted)
+    :param float epsilon: how close (in frames) keyframes have to be to get merged, 0 only merges keyframes on the exact same frame, defaults to 0
+    :param str rule: what value a merged keyframe gets, one of `DEDUP_RULES`: "last" (like inserting the keyframes one after another), "first", "max", "min" or "sum", defaults to "last"
+    :raises ValueError: if the rule is not supported
+    :return KeyframeArray: the deduplicated keyframes
+    """
+    if rule not in DEDUP_RULES:
+        raise ValueError(f"Dedup rule '{rule}' is not supported!")
+    
+    frames, values = keys.frames, keys.values
+    if len(keys) <= 1:
+        return keys.copy()
+
+    # runs of keyframes that are each no more than `epsilon` after the one before them, a keyframe farther away always starts a group
+    starts = np.flatnonzero(np.concatenate(([True], np.diff(frames) > epsilon)))
+    if len(starts) == len(keys):
+        return keys.copy()
+
+    # a run can be longer than `epsilon`, split it into groups measured from each group's first keyframe
+    if epsilon > 0:
+        ends = np.append(starts[1:], len(keys))
+        splits = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            while end - start > 1:
+                start = int(frames.searchsorted(frames[start] + epsilon, side="right"))
+                if start >= end:
+                    break
+                splits.append(start)
+        if splits:
+            starts = np.sort(np.concatenate((starts, splits)))
+
+    if rule == "last":
+        merged = values[np.append(starts[1:], len(keys)) - 1]
+    elif rule == "first":
+        merged = values[starts]
+    elif rule == "max":
+        merged = np.maximum.reduceat(values, starts)
+    elif rule == "min":
+        merged = np.minimum.reduceat(values, starts)
     else:
-        # If no overlap, just concatenate the keys
-        finalKeyframes = insertedKeys + nextKeys
+        merged = np.add.reduceat(values, starts)
+
+    return KeyframeArray(frames[starts], merged)
+
+# the overlap functions for each `anim_overlap` mode
+OVERLAP_FUNCTIONS = {
+    "add": addKeyframes,
+    "min": minKeyframes,
+    "max": maxKeyframes,
+    "prev": prevKeyframes,
+    "next": nextKeyframes,
+    "rvc": restValueCrossingKeyframes,
+    "prune": pruneKeyframes,
+}
+
+def resolveKeyframes(noteKeys: List[KeyframeArray], mode: str) -> KeyframeArray:
+    """resolves the overlapping keyframes of all notes of a FCurve with the given overlap mode
+    "add" is done in one sweep with `addKeyframesBatch()`, "min" and "max" with `envelopeKeyframes()`, the other modes call their overlap function for each note
+
+    :param List[KeyframeArray] noteKeys: the keyframes of each note (sorted), in the order of the notes
+    :param str mode: the overlap mode (`anim_overlap`), one of `OVERLAP_FUNCTIONS`
+    :raises ValueError: if the mode is not supported
+    :return KeyframeArray: the resolved keyframes, sorted by frame
+    """
+    if mode not in OVERLAP_FUNCTIONS:
+        raise ValueError(f"Overlap mode '{mode}' is not supported!")
+
+    if mode == "add":
+        return addKeyframesBatch(noteKeys)
+    elif mode in ("min", "max"):
+        return envelopeKeyframes(noteKeys, mode)
+
+    overlapFunc = OVERLAP_FUNCTIONS[mode]
+    out = KeyframeArray()
+    for keys in noteKeys:
+        overlapFunc(insertedKeys=out, nextKeys=keys)
+    
+    return out
 
-    # Sort and update the insertedKeys with pruned results
-    finalKeyframes.sort(key=lambda keyframe: keyframe.frame)
-    insertedKeys.clear()
-    insertedKeys.extend(finalKeyframes)
+def planKeyframes(noteKeys: List[KeyframeArray], mode: str, backend: str = "keyframes", sampleStep: float = 1, dedupEpsilon: float = 0, dedupRule: str = "last",
+                  simplify: bool = False, valueTolerance: float = 0, frameTolerance: float = 0) -> KeyframeArray:
+    """plans the keyframes of one FCurve from the keyframes of each of its notes: resolves the overlaps, merges coincident keyframes and (optionally) simplifies them.
+    this only works on plain data (no bpy), so the FCurves can be planned in other processes (see `planKeyframesParallel()`)
+
+    :param List[KeyframeArray] noteKeys: the keyframes of each note (sorted), in the order of the notes
+    :param str mode: the overlap mode (`anim_overlap`)
+    :param str backend: "keyframes" to resolve with `resolveKeyframes()` or "sampled" for `sampleKeyframes()`, defaults to "keyframes"
+    :param float sampleStep: the grid step for the "sampled" backend, defaults to 1
+    :param float dedupEpsilon: see `dedupKeyframes()`, defaults to 0
+    :param str dedupRule: see `dedupKeyframes()`, defaults to "last"
+    :param bool simplify: simplify the keyframes with `simplifyKeyframes()`, defaults to False
+    :param float valueTolerance: see `simplifyKeyframes()`, defaults to 0
+    :param float frameTolerance: see `simplifyKeyframes()`, defaults to 0
+    :return KeyframeArray: the keyframes to write, sorted by frame
+    """
+    if backend == "sampled":
+        keys = sampleKeyframes(noteKeys, mode, sampleStep)
+    else:
+        keys = resolveKeyframes(noteKeys, mode)
+
+    # merge keyframes that are (almost) on the same frame, Blender would only keep one of them anyway
+    keys = dedupKeyframes(keys, dedupEpsilon, dedupRule)
 
+    # remove the keyframes that don't change the animation (more than the tolerances)
+    if simplify:
+        keys = simplifyKeyframes(keys, valueTolerance, frameTolerance)
 
+    return keys
+
+def _planPacked(job: Tuple[np.ndarray, np.ndarray, np.ndarray, dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """runs `planKeyframes()` in a worker process on the packed keyframes of one FCurve
+
+    :param Tuple[np.ndarray, np.ndarray, np.ndarray, dict] job: the frames and values of all notes, where each note starts (except the first), and the keyword arguments for `planKeyframes()`
+    :return Tuple[np.ndarray, np.ndarray]: the frames and values of the planned keyframes
+    """
+    frames, values, splits, options = job
+    noteKeys = [KeyframeArray(noteFrames, noteValues) for noteFrames, noteValues in zip(np.split(frames, splits), np.split(values, splits))] if len(frames) else []
+    keys = planKeyframes(noteKeys, **options)
+    return keys.frames, keys.values
+
+def _planPackedIndexed(indexedJob: Tuple[int, Tuple[np.ndarray, np.ndarray, np.ndarray, dict]]) -> Tuple[int, np.ndarray, np.ndarray]:
+    """runs `_planPacked()` and returns the index of the job with its result, so results can come back in any order
+
+    :param Tuple[int, Tuple[np.ndarray, np.ndarray, np.ndarray, dict]] indexedJob: the index of the job and the job
+    :return Tuple[int, np.ndarray, np.ndarray]: the index of the job, and the frames and values of the planned keyframes
+    """
+    index, job = indexedJob
+    return (index, *_planPacked(job))
+
+def planKeyframesParallel(jobs: List[Tuple[List[KeyframeArray], dict]], workers: int = None) -> List[KeyframeArray]:
+    """plans the keyframes of many FCurves (see `planKeyframes()`) across a pool of processes.
+    each FCurve only depends on its own notes, so they are planned independently and returned in the order of `jobs`.
+    the workers are forked, so they don't import the add-on (and bpy) again. a spawned worker would have to, which it can't outside of Blender.
+    forking Blender is only safe enough on Linux, so anywhere else and with 1 worker, the FCurves are planned in this process instead.
+    the same goes for the FCurves the pool hasn't planned if it breaks or doesn't finish within `PARALLEL_PLANNING_TIMEOUT` seconds
+    (e.g. a worker is stuck on a lock it inherited), the results it already returned are kept
+
+    :param List[Tuple[List[KeyframeArray], dict]] jobs: the keyframes of each note and the keyword arguments for `planKeyframes()`, for each FCurve
+    :param int workers: the number of processes, defaults to the number of CPUs
+    :return List[KeyframeArray]: the planned keyframes of each FCurve
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+
+    if workers > 1 and sys.platform.startswith("linux"):
+        # one array per FCurve pickles a lot faster than one KeyframeArray per note
+        packed = []
+        for noteKeys, options in jobs:
+            if noteKeys:
+                splits = np.cumsum([len(keys) for keys in noteKeys])[:-1]
+                packed.append((np.concatenate([keys.frames for keys in noteKeys]), np.concatenate([keys.values for keys in noteKeys]), splits, options))
+            else:
+                packed.append((np.empty(0), np.empty(0), np.empty(0, dtype=int), options))
+
+        planned = [None] * len(jobs)
+        pool = None
+        try:
+            pool = multiprocessing.get_context("fork").Pool(workers)
+            # one deadline for the whole pool, the results come back as they finish
+            deadline = time.monotonic() + PARALLEL_PLANNING_TIMEOUT
+            results = pool.imap_unordered(_planPackedIndexed, enumerate(packed), chunksize=max(1, len(jobs) // (workers * 4)))
+            for _ in packed:
+                index, frames, values = results.next(max(0, deadline - time.monotonic()))
+                planned[index] = KeyframeArray(frames, values)
+            pool.close()
+            return planned
+        except (OSError, multiprocessing.TimeoutError) as error:
+            reason = "timed out" if isinstance(error, multiprocessing.TimeoutError) else f"failed ({error})"
+            missing = sum(keys is None for keys in planned)
+            logger.warning(f"Parallel keyframe planning {reason}, planning the {missing} remaining FCurve(s) in this process instead.")
+        finally:
+            if pool is not None:
+                # kills workers that are still running (or stuck), without waiting for them
+                pool.terminate()
+
+        return [keys if keys is not None else planKeyframes(noteKeys, **options) for keys, (noteKeys, options) in zip(planned, jobs)]
+
+    return [planKeyframes(noteKeys, **options) for noteKeys, options in jobs]
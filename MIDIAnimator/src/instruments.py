@@ -6,6 +6,7 @@ from dataclasses import dataclass
 from math import radians, degrees
 from enum import Enum
 import bpy
+import numpy as np
 
 from .. data_structures.midi import MIDITrack
 from .. utils import convertNoteNumbers
@@ -439,7 +440,7 @@ class EvaluateInstrument(Instrument):
     @staticmethod
     def drawInstrument(context: bpy.types.Context, col: bpy.types.UILayout, blCol: bpy.types.Collection,):
         """draws the UI for the instrument view"""
-        pass
+        col.prop(blCol.midi, "parallel_planning")
     
     @staticmethod
     def drawObject(context: bpy.types.Context, col: bpy.types.UILayout, blObj: bpy.types.Object):
@@ -453,9 +454,19 @@ class EvaluateInstrument(Instrument):
         row0.prop(objMidi, "anim_type")
 
         if objMidi.anim_type == "damp_osc":
-            col.prop(objMidi, "osc_period")
-            col.prop(objMidi, "osc_amp")
-            col.prop(objMidi, "osc_damp")
+            # the FCurves of the reference object only pick which channels are animated
+            row1 = col.row()
+            row1.prop(objMidi, "note_on_curve", text="Channels")
+            row1.prop(objMidi, "note_on_anchor_pt", text="")
+            col.prop(objMidi, "osc_units")
+            if objMidi.osc_units == "time":
+                col.prop(objMidi, "osc_length")
+                col.prop(objMidi, "osc_amp")
+                col.prop(objMidi, "osc_decay")
+            else:
+                col.prop(objMidi, "osc_period")
+                col.prop(objMidi, "osc_amp")
+                col.prop(objMidi, "osc_damp")
 
         elif objMidi.anim_type == "keyframed":
             row1 = col.row()
@@ -469,7 +480,16 @@ class EvaluateInstrument(Instrument):
 
 
         elif objMidi.anim_type == "adsr":
-            col.label(text="Coming soon")
+            # the FCurves of the reference object only pick which channels are animated
+            col.prop(objMidi, "note_on_curve", text="Channels")
+            row1 = col.row()
+            row1.prop(objMidi, "note_on_anchor_pt", text="Note On Anchor")
+            row1.prop(objMidi, "note_off_anchor_pt", text="Note Off Anchor")
+            col.prop(objMidi, "adsr_amplitude")
+            col.prop(objMidi, "adsr_attack")
+            col.prop(objMidi, "adsr_decay")
+            col.prop(objMidi, "adsr_sustain", slider=True)
+            col.prop(objMidi, "adsr_release")
         
         col.separator()
 
@@ -480,6 +500,19 @@ class EvaluateInstrument(Instrument):
 
         col.prop(objMidi, "anim_overlap")
 
+        col.prop(objMidi, "anim_backend")
+        if objMidi.anim_backend == "sampled":
+            col.prop(objMidi, "sample_step")
+
+        row3 = col.row()
+        row3.prop(objMidi, "dedup_epsilon")
+        row3.prop(objMidi, "dedup_rule", text="")
+
+        col.prop(objMidi, "simplify_keyframes")
+        if objMidi.simplify_keyframes:
+            col.prop(objMidi, "simplify_value_tolerance")
+            col.prop(objMidi, "simplify_frame_tolerance")
+
     @staticmethod
     def properties():
         """create properties for the instrument"""
@@ -522,7 +555,7 @@ class EvaluateInstrument(Instrument):
         )
         MIDIAnimatorObjectProperties.osc_period = bpy.props.FloatProperty(
             name="Period",
-            description="Period of the oscillation",
+            description="Period of the oscillation, as passed to the oscillation generator (radians per frame, bigger values oscillate faster)",
             default=4,
             options=set()
         )
@@ -534,15 +567,76 @@ class EvaluateInstrument(Instrument):
         )
         MIDIAnimatorObjectProperties.osc_damp = bpy.props.FloatProperty(
             name="Damping",
-            description="Damping of the oscillation",
+            description="Damping of the oscillation, as passed to the oscillation generator (per frame, bigger values ring for less time)",
             default=10,
             options=set()
         )
+        MIDIAnimatorObjectProperties.osc_units = bpy.props.EnumProperty(
+            items=[
+                ("raw", "Raw", "Use Period and Damping as they are (radians per frame and per frame)"),
+                ("time", "Frames/Seconds", "Use the length of one oscillation (in frames) and the decay per second, independent of the frame rate"),
+            ],
+            name="Oscillation Units",
+            default="raw",
+            options=set()
+        )
+        MIDIAnimatorObjectProperties.osc_length = bpy.props.FloatProperty(
+            name="Length",
+            description="Length of one oscillation (in frames)",
+            default=4,
+            min=0,
+            options=set()
+        )
+        MIDIAnimatorObjectProperties.osc_decay = bpy.props.FloatProperty(
+            name="Decay",
+            description="How fast the oscillation dies out (per second), bigger values ring for less time",
+            default=10,
+            min=0,
+            options=set()
+        )
+        MIDIAnimatorObjectProperties.adsr_amplitude = bpy.props.FloatProperty(
+            name="Amplitude",
+            description="Peak value of the envelope",
+            default=1,
+            options=set()
+        )
+        MIDIAnimatorObjectProperties.adsr_attack = bpy.props.FloatProperty(
+            name="Attack",
+            description="Time (in seconds) to go from rest to the peak after the note on",
+            default=0.05,
+            min=0,
+            subtype="TIME_ABSOLUTE",
+            options=set()
+        )
+        MIDIAnimatorObjectProperties.adsr_decay = bpy.props.FloatProperty(
+            name="Decay",
+            description="Time (in seconds) to go from the peak to the sustain level",
+            default=0.1,
+            min=0,
+            subtype="TIME_ABSOLUTE",
+            options=set()
+        )
+        MIDIAnimatorObjectProperties.adsr_sustain = bpy.props.FloatProperty(
+            name="Sustain",
+            description="Level held until the note off, as a fraction of the peak",
+            default=0.5,
+            min=0,
+            max=1,
+            options=set()
+        )
+        MIDIAnimatorObjectProperties.adsr_release = bpy.props.FloatProperty(
+            name="Release",
+            description="Time (in seconds) to go back to rest after the note off",
+            default=0.2,
+            min=0,
+            subtype="TIME_ABSOLUTE",
+            options=set()
+        )
         MIDIAnimatorObjectProperties.anim_overlap = bpy.props.EnumProperty(
             items=[
                 ("add", "Add", "Curves will add motion."),
-                ("min", "Min", ""),
-                ("max", "Max", ""),
+                ("min", "Min", "Curves will use the lowest (non-resting) value of all playing notes."),
+                ("max", "Max", "Curves will use the highest value of all playing notes."),
                 ("prev", "Previous", ""),
                 ("next", "Next", ""),
                 ("rvc", "Rest Value Crossing", ""),
@@ -552,11 +646,79 @@ class EvaluateInstrument(Instrument):
             default="add",
             options=set()
         )
+        MIDIAnimatorObjectProperties.anim_backend = bpy.props.EnumProperty(
+            items=[
+                ("keyframes", "Keyframes", "Combine the keyframes of overlapping notes. Keeps the exact shape of the reference curves"),
+                ("sampled", "Sampled", "Evaluate the notes on a grid of frames and combine them frame by frame. Faster for dense parts, but peaks between grid frames are cut off. Only works with the Add, Min, Max, Previous and Next overlap modes"),
+            ],
+            name="Overlap Backend",
+            default="keyframes",
+            options=set()
+        )
+        MIDIAnimatorObjectProperties.sample_step = bpy.props.FloatProperty(
+            name="Sample Step",
+            description="Distance (in frames) between the grid frames the notes are evaluated on. 1 for every frame, 0.5 for every half frame",
+            default=1,
+            min=0.01,
+            soft_max=4,
+            options=set()
+        )
+        MIDIAnimatorCollectionProperties.parallel_planning = bpy.props.BoolProperty(
+            name="Parallel Planning",
+            description="Plan the keyframes of the objects in separate processes to use all CPU cores. Helps with many objects (e.g. drum kits, marimbas), "
+                        "only on Linux, falls back to planning in one process elsewhere or when a process gets stuck",
+            default=False,
+            options=set()
+        )
+        MIDIAnimatorObjectProperties.dedup_epsilon = bpy.props.FloatProperty(
+            name="Merge Distance",
+            description="Keyframes this close (in frames) to the first keyframe of their group are merged into one keyframe before writing. 0 to only merge keyframes on the exact same frame",
+            default=0,
+            min=0,
+            soft_max=0.5,
+            precision=4,
+            options=set()
+        )
+        MIDIAnimatorObjectProperties.dedup_rule = bpy.props.EnumProperty(
+            items=[
+                ("last", "Last", "Keep the value of the last keyframe (same as inserting them one after another)"),
+                ("first", "First", "Keep the value of the first keyframe"),
+                ("max", "Max", "Keep the biggest value"),
+                ("min", "Min", "Keep the smallest value"),
+                ("sum", "Sum", "Add the values together"),
+            ],
+            name="Merge Rule",
+            default="last",
+            options=set()
+        )
+        MIDIAnimatorObjectProperties.simplify_keyframes = bpy.props.BoolProperty(
+            name="Simplify Keyframes",
+            description="Remove keyframes that are not needed to keep the animation within the tolerances before writing them",
+            default=False,
+            options=set()
+        )
+        MIDIAnimatorObjectProperties.simplify_value_tolerance = bpy.props.FloatProperty(
+            name="Value Tolerance",
+            description="How far off (in value) the simplified animation can be. 0 only removes keyframes that are exactly in line with their neighbours",
+            default=0.001,
+            min=0,
+            soft_max=0.1,
+            precision=4,
+            options=set()
+        )
+        MIDIAnimatorObjectProperties.simplify_frame_tolerance = bpy.props.FloatProperty(
+            name="Frame Tolerance",
+            description="How far off (in frames) the simplified animation can be, 0 to only use the value tolerance",
+            default=0,
+            min=0,
+            soft_max=2,
+            options=set()
+        )
         MIDIAnimatorObjectProperties.anim_type = bpy.props.EnumProperty(
             items=[
                 ("keyframed", "Keyframed", "Pre-defined FCurve objects to refernce the animation from"),
-                ("damp_osc", "Oscillation", "Dampened oscillation. Planned for a future release"),
-                ("adsr", "ADSR", "Attack, Decay, Sustain, Release. Planned for a future release")
+                ("damp_osc", "Oscillation", "Dampened oscillation started by each note, on the channels of a reference object"),
+                ("adsr", "ADSR", "Attack, Decay, Sustain, Release envelope on the channels of a reference object")
             ],
             name="Animation Type",
             default="keyframed",
@@ -639,6 +801,20 @@ class EvaluateInstrument(Instrument):
                 
                 if obj.midi.note_off_curve is not None and len(FCurvesFromObject(obj.midi.note_off_curve)) == 0:
                     logger.warning(f"Object '{obj.name}' has no Note Off FCurves! (note off object '{obj.midi.note_off_curve.name}')")
+            
+            elif obj.midi.anim_type in ("damp_osc", "adsr"):
+                # the reference object picks the channels to animate
+                if obj.midi.note_on_curve is None and obj.midi.note_off_curve is None:
+                    raise ValueError(f"Object '{obj.name}' must have a reference object to pick the animated channels from!")
+                
+                if obj.midi.anim_type == "damp_osc":
+                    if obj.midi.osc_units == "time" and (obj.midi.osc_length <= 0 or obj.midi.osc_decay <= 0):
+                        raise ValueError(f"Object '{obj.name}' must have an oscillation length and decay bigger than 0!")
+                    if obj.midi.osc_units == "raw" and (obj.midi.osc_period == 0 or obj.midi.osc_damp <= 0):
+                        raise ValueError(f"Object '{obj.name}' must have a non-zero oscillation period and a damping bigger than 0!")
+            
+            if obj.midi.anim_backend == "sampled" and obj.midi.anim_overlap not in SAMPLED_MODES:
+                raise ValueError(f"Object '{obj.name}' uses the Sampled backend, which doesn't support the '{obj.midi.anim_overlap}' overlap mode! Use the Keyframes backend.")
                 
 
     def animate(self):
@@ -688,16 +864,19 @@ class EvaluateInstrument(Instrument):
                     generatedOscKeys = genDampedOscKeyframes(period, amplitude, damp, keyframe.co[0] + offset)
                     nextKeys.extend(generatedOscKeys)
                 else:
-                    nextKeys.append(Keyframe(frame, value))
+                    nextKeys.append(frame, value)
 
 
         # create wprToKeyframe
         wprToKeyframe  = {}
+        # notes of each object, for the generated animation types
+        wprToNotes = {}
         for noteNumber in self.noteToWpr:
             wprs = self.noteToWpr[noteNumber]
             
             for wpr in wprs:
                 wprToKeyframe[wpr] = {}
+                wprToNotes[wpr] = []
         
 
         for note in self.midiTrack.notes:
@@ -716,7 +895,7 @@ class EvaluateInstrument(Instrument):
                     # so we can iterate over 1 set of FCurves, and get their datapaths
                     # but if there are no noteOnCurves but there are noteOffCurves, we will need to iterate over that instead 
                     for (noteOnCurve, noteOffCurve) in zip_longest(wpr.noteOnCurves, wpr.noteOffCurves):
-                        nextKeys = []
+                        nextKeys = KeyframeArray()
 
                         # there will never be a time where both noteOnCurve and noteOffCurve will be None
                         # this precondition is checked when creating the wrapper Blender objects
@@ -729,8 +908,6 @@ class EvaluateInstrument(Instrument):
 
                         if key not in wprToKeyframe[wpr]:
                             wprToKeyframe[wpr][key] = []
-                        
-                        keyframes = wprToKeyframe[wpr][key]
 
                         # process next keys
                         if wpr.noteOnCurves:
@@ -739,43 +916,79 @@ class EvaluateInstrument(Instrument):
                         if wpr.noteOffCurves:
                             processNextKeys(noteOffCurve, note, wpr, nextKeys)
 
-                        # take keyframes that are next and "add" them to the already insrted keyframes
-                        if obj.midi.anim_overlap == "add":
-                            addKeyframes(insertedKeys=keyframes, nextKeys=nextKeys)
-                        elif obj.midi.anim_overlap == "min":
-                            minKeyframes(insertedKeys=keyframes, nextKeys=nextKeys)
-                        elif obj.midi.anim_overlap == "max":
-                            maxKeyframes(insertedKeys=keyframes, nextKeys=nextKeys)
-                        elif obj.midi.anim_overlap == "prev":
-                            prevKeyframes(insertedKeys=keyframes, nextKeys=nextKeys)
-                        elif obj.midi.anim_overlap == "next":
-                            nextKeyframes(insertedKeys=keyframes, nextKeys=nextKeys)
-                        elif obj.midi.anim_overlap == "rvc":
-                            restValueCrossingKeyframes(insertedKeys=keyframes, nextKeys=nextKeys)
-                        elif obj.midi.anim_overlap == "prune":
-                            pruneKeyframes(insertedKeys=keyframes, nextKeys=nextKeys)
-                
-                elif obj.midi.anim_type == "osc":
-                    # for now, we're going to use a keyframed object to determine which channels to keyframe to
-                    # this will eventually be replaced with a more permanent solution, like a UI element where you can add the different channels
-                    # evaluate the parameters on the object and add them to list of nextKeys list
-                    # using function genDampedOscKeyframes()
-                    pass
+                        # the overlap functions expect both sets of keyframes sorted by frame
+                        nextKeys.sort()
+
+                        # keep the keyframes of each note, the overlaps are resolved after all notes are processed
+                        wprToKeyframe[wpr][key].append(nextKeys)
                 
-                elif obj.midi.anim_type == "adsr":
-                    # for now, we're going to use a keyframed object to determine which channels to keyframe to
-                    # this will eventually be replaced with a more permanent solution, like a UI element where you can add the different channels
-                    # evaluate the parameters on the object and add them to list of nextKeys list
-                    # using function genADSRKeyframes() (not yet implemented)
-                    pass
+                elif obj.midi.anim_type in ("damp_osc", "adsr"):
+                    # the oscillations/envelopes of all notes are generated at once after this loop
+                    wprToNotes[wpr].append(note)
+
+        # generate the oscillations/ADSR envelopes of all notes of each object at once
+        for wpr, notes in wprToNotes.items():
+            midi = wpr.obj.midi
+            if not notes:
+                continue
+
+            timeOn = secToFrames(np.array([note.timeOn for note in notes])) + midi.note_on_anchor_pt
+
+            if midi.anim_type == "damp_osc":
+                amplitude = np.full(len(notes), midi.osc_amp)
+                if midi.velocity_intensity != 0:
+                    amplitude *= np.array([note.velocity for note in notes]) / 127 * midi.velocity_intensity
+
+                if midi.osc_units == "time":
+                    # the length of one oscillation (in frames) and the decay per second, converted to what the generator takes
+                    period, damp = 2 * np.pi / midi.osc_length, midi.osc_decay / secToFrames(1)
+                else:
+                    period, damp = midi.osc_period, midi.osc_damp
+
+                noteKeys = genDampedOscKeyframesBatch(period, amplitude, damp, timeOn)
+            else:
+                # notes without a note off keep a negative time off, `genADSRKeyframes()` holds them until the next note
+                timeOff = np.array([note.timeOff for note in notes])
+                timeOff = np.where(timeOff < 0, -1, np.maximum(secToFrames(timeOff) + midi.note_off_anchor_pt, 0))
+                peak = np.full(len(notes), midi.adsr_amplitude)
+                if midi.velocity_intensity != 0:
+                    peak *= np.array([note.velocity for note in notes]) / 127 * midi.velocity_intensity
+
+                noteKeys = genADSRKeyframes(timeOn, timeOff, secToFrames(midi.adsr_attack), secToFrames(midi.adsr_decay), midi.adsr_sustain, secToFrames(midi.adsr_release), peak)
+
+            # for now, we're going to use a keyframed object to determine which channels to keyframe to
+            # this will eventually be replaced with a more permanent solution, like a UI element where you can add the different channels
+            for fCrv in (wpr.noteOnCurves or wpr.noteOffCurves):
+                wprToKeyframe[wpr][(fCrv.data_path, fCrv.array_index)] = noteKeys
 
         
+        # take the keyframes of each note and "add" them together (or the other overlap modes)
+        # from here on, every FCurve only needs its own (plain) keyframes, so they can be planned in parallel
+        jobs = []
+        for wpr in wprToKeyframe:
+            midi = wpr.obj.midi
+            options = dict(
+                mode=midi.anim_overlap, backend=midi.anim_backend, sampleStep=midi.sample_step,
+                dedupEpsilon=midi.dedup_epsilon, dedupRule=midi.dedup_rule,
+                simplify=midi.simplify_keyframes, valueTolerance=midi.simplify_value_tolerance, frameTolerance=midi.simplify_frame_tolerance
+            )
+            for key in wprToKeyframe[wpr]:
+                jobs.append((wpr, key, wprToKeyframe[wpr][key], options))
+
+        if self.collection.midi.parallel_planning:
+            planned = planKeyframesParallel([(noteKeys, options) for _, _, noteKeys, options in jobs])
+        else:
+            planned = [planKeyframes(noteKeys, **options) for _, _, noteKeys, options in jobs]
+
+        for (wpr, key, _, _), keys in zip(jobs, planned):
+            wprToKeyframe[wpr][key] = keys
+
         # write keyframes after iterating over all notes
         for noteNumber in self.noteToWpr:
             for wpr in self.noteToWpr[noteNumber]:
                 obj = wpr.obj
 
-                if obj.midi.anim_type == "keyframed":
+                if obj.midi.anim_type in ("keyframed", "damp_osc", "adsr"):
                     for noteOnCurve, noteOffCurve in zip_longest(wpr.noteOnCurves, wpr.noteOffCurves):
                         # make sure curve exists. if it doesn't this is probably a noteOff only object
                         fCrv = noteOnCurve if noteOnCurve is not None else noteOffCurve
@@ -786,7 +999,7 @@ class EvaluateInstrument(Instrument):
                         # keyframes = wpr.keyframes.listOfKeys[(fCrv.data_path, fCrv.array_index)]
                         
                         if isinstance(fCrv, bpy.types.FCurve):
-                            for keyframe in sorted(keyframes, key=lambda x: x.frame):
+                            for keyframe in keyframes:
                                 # set value
                                 if fCrv.data_path[:2] == '["' and fCrv.data_path[-2:] == '"]':
                                     # custom prop
@@ -808,7 +1021,7 @@ class EvaluateInstrument(Instrument):
                                     obj.keyframe_insert(data_path=fCrv.data_path, index=fCrv.array_index, frame=keyframe.frame)
                         
                         elif isinstance(fCrv, ObjectShapeKey):
-                            for keyframe in sorted(keyframes, key=lambda x: x.frame):
+                            for keyframe in keyframes:
                                 fCrv.targetKey.value = keyframe.value
                                 fCrv.targetKey.keyframe_insert(data_path="value", frame=keyframe.frame)
                 else:
@@ -1,8 +1,11 @@
+from __future__ import annotations
 from . gmInstrumentMap import _gmInst
 from math import sin, cos, pi, e, sqrt, asin, atan, log
-from typing import Tuple, List
+from typing import Tuple, List, TYPE_CHECKING
 from re import search as reSearch
-from mathutils import Vector
+
+if TYPE_CHECKING:
+    from mathutils import Vector
 
 
 def noteToName(nVal: int) -> str:
@@ -79,26 +82,6 @@ def gmProgramToName(pcNum: int) -> str:
     return _gmInst[int(pcNum+1)]
 
 
-def _closestTempo(vals: list, n: float, sortList=False) -> tuple:
-    """takes a list of tempos and times and returns the one closest to n
-
-    :param list vals: list of values to compare to, List[(time, tempo)]
-    :param float n: the time to compare to
-    :param bool sortList: have the tempo list sorted, defaults to False
-    :return tuple: returns the closest time value's tempo & time as a tuple, e.g. (2.50 sec, 500000 ticks)
-    """
-    if sortList:
-        vals.sort()
-    
-    if len(vals) == 1:
-        return vals[0]
-    
-    for first, second in zip(vals, vals[1:] + [(0, float('inf'))]):
-        if first[0] <= n < second[0]:
-            return first
-    
-    return second
-
 def removeDuplicates(vals: list) -> list:
     """Removes duplicate items from a list. Useful for getting all used note numbers in a MIDI File.
 
@@ -0,0 +1,82 @@
+"""micro-benchmark for message decoding in the bundled copy of mido
+
+compares the checked and the trusted (`skip_checks=True`) construction paths,
+both for `Message.from_bytes()` on its own and for loading a whole `MidiFile`.
+
+usage: python benchmarks/bench_mido_decode.py [--tracks 16] [--events 20000] [--repeat 5]
+"""
+import io
+import os
+import sys
+import random
+import argparse
+from timeit import default_timer as timer
+
+# the bundled mido lives in MIDIAnimator/libs and does not need Blender
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "MIDIAnimator", "libs"))
+import mido
+
+
+def buildMIDIFile(tracks: int, events: int, seed: int = 0) -> bytes:
+    """builds a large type 1 MIDI file in memory
+
+    :param int tracks: number of tracks
+    :param int events: number of channel messages per track
+    :param int seed: random seed, defaults to 0
+    :return bytes: the encoded MIDI file
+    """
+    rng = random.Random(seed)
+    midiFile = mido.MidiFile(type=1)
+
+    for trackIndex in range(tracks):
+        track = midiFile.add_track(name=f"Track {trackIndex}")
+        channel = trackIndex % 16
+        for _ in range(events // 2):
+            note = rng.randrange(128)
+            if rng.random() < 0.2:
+                track.append(mido.Message("control_change", channel=channel, control=rng.randrange(128), value=rng.randrange(128), time=rng.randrange(8)))
+            track.append(mido.Message("note_on", channel=channel, note=note, velocity=rng.randrange(1, 128), time=rng.randrange(60)))
+            track.append(mido.Message("note_off", channel=channel, note=note, velocity=0, time=rng.randrange(60)))
+
+    out = io.BytesIO()
+    midiFile.save(file=out)
+    return out.getvalue()
+
+
+def best(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = timer()
+        func()
+        times.append(timer() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark checked vs trusted message decoding")
+    parser.add_argument("--tracks", type=int, default=16)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(sys.argv[1:])
+
+    data = buildMIDIFile(args.tracks, args.events)
+    messages = [msg.bytes() for track in mido.MidiFile(file=io.BytesIO(data)).tracks for msg in track if not msg.is_meta]
+
+    print(f"file size: {len(data) / 1024:.1f} KiB, {len(messages)} channel messages")
+
+    checked = best(lambda: [mido.Message.from_bytes(msg) for msg in messages], args.repeat)
+    trusted = best(lambda: [mido.Message.from_bytes(msg, skip_checks=True) for msg in messages], args.repeat)
+    print(f"Message.from_bytes()        checked {checked:.3f}s  trusted {trusted:.3f}s  speedup {checked / trusted:.2f}x")
+
+    checked = best(lambda: mido.MidiFile(file=io.BytesIO(data)), args.repeat)
+    trusted = best(lambda: mido.MidiFile(file=io.BytesIO(data), skip_checks=True), args.repeat)
+    print(f"MidiFile()                  checked {checked:.3f}s  trusted {trusted:.3f}s  speedup {checked / trusted:.2f}x")
+
+    midiFile = mido.MidiFile(file=io.BytesIO(data))
+    checked = best(lambda: mido.merge_tracks(midiFile.tracks), args.repeat)
+    trusted = best(lambda: mido.merge_tracks(midiFile.tracks, skip_checks=True), args.repeat)
+    print(f"merge_tracks()              checked {checked:.3f}s  trusted {trusted:.3f}s  speedup {checked / trusted:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""equivalence check and benchmark for the "add" overlap mode
+
+resolves random note keyframes (and a fast trill on one object) both note by note with `addKeyframes()`
+and in one sweep with `addKeyframesBatch()`, checks that both give the same keyframes and times them.
+
+usage: blender -b --python benchmarks/bench_overlap_add.py -- [--notes 10000] [--trials 2000] [--repeat 3]
+"""
+import os
+import sys
+import random
+import argparse
+from timeit import default_timer as timer
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from MIDIAnimator.data_structures import KeyframeArray
+from MIDIAnimator.src.algorithms import addKeyframes, addKeyframesBatch
+
+
+def randomNotes(rng: random.Random, count: int) -> list:
+    """random note keyframes that start and end at rest, some of them overlapping
+
+    :param random.Random rng: random number generator
+    :param int count: number of notes
+    :return list: a KeyframeArray for each note
+    """
+    notes = []
+    time = 0.0
+    for _ in range(count):
+        time += rng.choice((0, 0.5, 1, 2, 3, 5, 20))
+        frames = sorted({time} | {time + rng.choice((0.25, 1, 2, 3, 4, 6, 8)) for _ in range(rng.randrange(1, 6))})
+        values = [rng.choice((-1, 0, 0.5, 1, 2)) for _ in frames]
+        values[0] = values[-1] = 0
+        notes.append(KeyframeArray(frames, values))
+    return notes
+
+
+def trillNotes(count: int) -> list:
+    """a fast trill, every note overlaps the next one
+
+    :param int count: number of notes
+    :return list: a KeyframeArray for each note
+    """
+    return [KeyframeArray([i * 2 + frame for frame in (0, 1, 3, 6)], [0, 1, 0.5, 0]) for i in range(count)]
+
+
+def sequential(notes: list) -> KeyframeArray:
+    out = KeyframeArray()
+    for keys in notes:
+        addKeyframes(insertedKeys=out, nextKeys=keys)
+    return out
+
+
+def canonical(keys: KeyframeArray) -> np.ndarray:
+    """the keyframes as Blender would insert them, one keyframe per frame (the last one wins)"""
+    keys = keys.copy()
+    keys.sort()
+    last = np.append(keys.frames[1:] != keys.frames[:-1], True)
+    return np.column_stack((keys.frames[last], keys.values[last]))
+
+
+def same(a: KeyframeArray, b: KeyframeArray) -> bool:
+    a, b = canonical(a), canonical(b)
+    return a.shape == b.shape and np.allclose(a, b, atol=1e-9)
+
+
+def best(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = timer()
+        func()
+        times.append(timer() - start)
+    return min(times)
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description="add overlap mode equivalence check and benchmark")
+    parser.add_argument("--notes", type=int, default=10000)
+    parser.add_argument("--trials", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    failed = 0
+    for _ in range(args.trials):
+        notes = randomNotes(rng, rng.randrange(1, 12))
+        if not same(sequential(notes), addKeyframesBatch(notes)):
+            failed += 1
+
+    print(f"equivalence: {args.trials - failed}/{args.trials} random note sets match")
+
+    notes = trillNotes(args.notes)
+    if not same(sequential(notes), addKeyframesBatch(notes)):
+        failed += 1
+        print("equivalence: trill does not match")
+
+    seqTime = best(lambda: sequential(notes), args.repeat)
+    batchTime = best(lambda: addKeyframesBatch(notes), args.repeat)
+    print(f"trill ({args.notes} notes)  addKeyframes() {seqTime:.3f}s  addKeyframesBatch() {batchTime:.3f}s  speedup {seqTime / batchTime:.1f}x")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""check and benchmark for the "min" and "max" overlap modes
+
+checks `envelopeKeyframes()` against a brute force envelope (every note evaluated on every breakpoint) on random notes,
+then times it against calling `minKeyframes()` / `maxKeyframes()` for every note of a fast trill on one object.
+
+usage: blender -b --python benchmarks/bench_overlap_envelope.py -- [--notes 10000] [--trials 1000] [--repeat 3]
+"""
+import os
+import sys
+import random
+import argparse
+from timeit import default_timer as timer
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from MIDIAnimator.data_structures import KeyframeArray
+from MIDIAnimator.src.algorithms import minKeyframes, maxKeyframes, envelopeKeyframes
+
+
+def randomNotes(rng: random.Random, count: int) -> list:
+    """random note keyframes, some of them overlapping
+
+    :param random.Random rng: random number generator
+    :param int count: number of notes
+    :return list: a KeyframeArray for each note
+    """
+    notes = []
+    time = 0.0
+    for _ in range(count):
+        time += rng.choice((0, 0.5, 1, 2, 7))
+        frames = sorted({time} | {time + rng.choice((0.25, 1, 2, 3, 5)) for _ in range(rng.randrange(0, 5))})
+        notes.append(KeyframeArray(frames, [rng.choice((-1, 0, 0.5, 1, 2)) for _ in frames]))
+    return notes
+
+
+def trillNotes(count: int) -> list:
+    """a fast trill, every note overlaps the next one
+
+    :param int count: number of notes
+    :return list: a KeyframeArray for each note
+    """
+    return [KeyframeArray([i * 2 + frame for frame in (0, 1, 3, 6)], [0, 1, 0.5, 0]) for i in range(count)]
+
+
+def bruteForceEnvelope(notes: list, mode: str) -> KeyframeArray:
+    breakpoints = np.unique(np.concatenate([keys.frames for keys in notes]))
+    out = []
+    for frame in breakpoints:
+        playing = [float(np.interp(frame, keys.frames, keys.values)) for keys in notes if keys.frames[0] <= frame <= keys.frames[-1]]
+        if mode == "max":
+            out.append(max(playing))
+        else:
+            playing = [value for value in playing if value != 0]
+            out.append(min(playing) if playing else 0)
+    return KeyframeArray(breakpoints, out)
+
+
+def best(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = timer()
+        func()
+        times.append(timer() - start)
+    return min(times)
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description="min/max overlap mode check and benchmark")
+    parser.add_argument("--notes", type=int, default=10000)
+    parser.add_argument("--trials", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    failed = 0
+    for _ in range(args.trials):
+        notes = randomNotes(rng, rng.randrange(1, 10))
+        for mode in ("min", "max"):
+            expected = bruteForceEnvelope(notes, mode)
+            result = envelopeKeyframes(notes, mode)
+            if not (np.array_equal(result.frames, expected.frames) and np.allclose(result.values, expected.values)):
+                failed += 1
+
+    print(f"envelope: {2 * args.trials - failed}/{2 * args.trials} random note sets match the brute force envelope")
+
+    notes = trillNotes(args.notes)
+    for mode, overlapFunc in (("min", minKeyframes), ("max", maxKeyframes)):
+        def perNote():
+            out = KeyframeArray()
+            for keys in notes:
+                overlapFunc(insertedKeys=out, nextKeys=keys)
+
+        perNoteTime = best(perNote, args.repeat)
+        envelopeTime = best(lambda: envelopeKeyframes(notes, mode), args.repeat)
+        print(f"{mode} trill ({args.notes} notes)  {overlapFunc.__name__}() {perNoteTime:.3f}s  "
+              f"envelopeKeyframes() {envelopeTime:.3f}s  speedup {perNoteTime / envelopeTime:.1f}x")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
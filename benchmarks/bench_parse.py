@@ -0,0 +1,229 @@
+"""parse throughput benchmark for MIDI files
+
+generates a fixed corpus of synthetic MIDI files (see generate_midi.py), parses each one and records
+the parse time, peak memory (tracemalloc) and events per second, then compares them to stored baselines.
+
+targets:
+    midifile    MIDIAnimator's `MIDIFile`
+    mido        the bundled mido's `MidiFile`
+
+usage:
+    python benchmarks/bench_parse.py [--target midifile] [--corpus small medium] [--repeat 5] [--tolerance 0.25] [--update-baselines]
+
+parse times are stored relative to a fixed pure Python workload timed on the same machine (see `calibrate()`),
+so the baselines can be compared on other machines. the ratio still changes a bit between machines and Python
+versions, re-record the baselines (--update-baselines) on your machine for a strict comparison.
+
+exits with 1 if any relative parse time or peak memory is worse than its baseline by more than the tolerance.
+corpus files without a baseline are only reported.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import platform
+import tracemalloc
+from timeit import default_timer as timer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+BASELINES_PATH = os.path.join(BENCH_DIR, "baselines.json")
+
+sys.path.insert(0, BENCH_DIR)
+from generate_midi import generateMIDI
+
+# name: keyword arguments for generateMIDI()
+CORPUS = {
+    "small": dict(tracks=4, duration=60.0, notesPerSecond=4.0, ccPerSecond=1.0, tempoChanges=2, seed=1),
+    "medium": dict(tracks=16, duration=300.0, notesPerSecond=8.0, ccPerSecond=4.0, tempoChanges=16, seed=2),
+    "large": dict(tracks=16, duration=1800.0, notesPerSecond=12.0, ccPerSecond=8.0, tempoChanges=64, seed=3),
+    "no_running_status": dict(tracks=16, duration=300.0, notesPerSecond=8.0, ccPerSecond=4.0, tempoChanges=16, runningStatus=False, seed=2),
+}
+
+
+def getParser(target: str):
+    """returns a function that parses a MIDI file path for the given target
+
+    :param str target: "midifile" or "mido"
+    :return: the parse function
+    """
+    if target == "midifile":
+        sys.path.insert(0, ROOT_DIR)
+        from MIDIAnimator.data_structures.midi import MIDIFile
+        return MIDIFile
+
+    sys.path.insert(0, os.path.join(ROOT_DIR, "MIDIAnimator", "libs"))
+    import mido
+    return mido.MidiFile
+
+
+def calibrate(repeat: int=5) -> float:
+    """times a fixed pure Python workload (integer math, dicts and lists, like parsing), parse times are stored relative to it
+
+    :param int repeat: number of timed runs
+    :return float: the best time, in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = timer()
+        table = {}
+        items = []
+        for i in range(200000):
+            key = (i * 7919) & 0xffff
+            table[key] = table.get(key, 0) + (i >> 3)
+            items.append(key)
+        items.sort()
+        times.append(timer() - start)
+    return min(times)
+
+
+def countEvents(path: str) -> int:
+    """counts the track events (including meta messages) of a MIDI file without a MIDI library
+
+    :param str path: MIDI file path
+    :return int: the number of events
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    count = 0
+    pos = 14  # after the MThd chunk
+    while pos < len(data):
+        size = int.from_bytes(data[pos + 4:pos + 8], "big")
+        end = pos + 8 + size
+        pos += 8
+        status = None
+        while pos < end:
+            # delta time
+            while data[pos] & 0x80:
+                pos += 1
+            pos += 1
+
+            byte = data[pos]
+            if byte in (0xff, 0xf0, 0xf7):
+                # meta and sysex messages: (type byte) + length + data
+                pos += 2 if byte == 0xff else 1
+                length = 0
+                while True:
+                    length = (length << 7) | (data[pos] & 0x7f)
+                    pos += 1
+                    if data[pos - 1] < 0x80:
+                        break
+                pos += length
+            else:
+                if byte & 0x80:
+                    status = byte
+                    pos += 1
+                # (running status if there was no status byte)
+                pos += 1 if 0xc0 <= status < 0xe0 else 2
+            count += 1
+    return count
+
+
+def measure(parse, path: str, repeat: int) -> dict:
+    """parses a file `repeat` times and returns the best time (per parse) and the peak memory
+
+    :param parse: function that parses a MIDI file path
+    :param str path: MIDI file path
+    :param int repeat: number of timed runs
+    :return dict: "seconds", "peakMemory" (bytes)
+    """
+    # a warm-up run, small files are parsed several times per timed run so the timer is accurate enough
+    start = timer()
+    parse(path)
+    number = max(1, int(0.05 / (timer() - start)))
+
+    times = []
+    for _ in range(repeat):
+        start = timer()
+        for _ in range(number):
+            parse(path)
+        times.append((timer() - start) / number)
+
+    # memory is measured in a separate run, tracemalloc slows down parsing
+    tracemalloc.start()
+    parse(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": min(times), "peakMemory": peak}
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description="MIDI parse throughput benchmark")
+    parser.add_argument("--target", choices=("midifile", "mido"), default="midifile")
+    parser.add_argument("--corpus", nargs="*", choices=list(CORPUS), default=list(CORPUS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown / memory growth, 0.25 = 25%%")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args(argv)
+
+    parse = getParser(args.target)
+    calibration = calibrate()
+
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as f:
+            baselines = json.load(f)
+    else:
+        baselines = {}
+
+    targetBaselines = baselines.get(args.target, {})
+    results = {}
+    regressions = []
+    missing = []
+
+    print(f"target: {args.target}, python {platform.python_version()}, calibration {calibration * 1000:.1f} ms")
+    print(f"{'corpus':<20}{'events':>10}{'seconds':>10}{'relative':>10}{'events/s':>12}{'peak MiB':>10}{'vs baseline':>14}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.corpus:
+            path = os.path.join(tmp, f"{name}.mid")
+            with open(path, "wb") as f:
+                f.write(generateMIDI(**CORPUS[name]))
+
+            events = countEvents(path)
+            result = measure(parse, path, args.repeat)
+            result["events"] = events
+            result["eventsPerSecond"] = events / result["seconds"]
+            result["relativeTime"] = result["seconds"] / calibration
+            results[name] = result
+
+            baseline = targetBaselines.get(name)
+            # (baselines recorded before the times were stored relative to calibrate() can't be compared)
+            if baseline is None or "relativeTime" not in baseline:
+                missing.append(name)
+                comparison = "no baseline !"
+            else:
+                timeRatio = result["relativeTime"] / baseline["relativeTime"]
+                memoryRatio = result["peakMemory"] / baseline["peakMemory"]
+                comparison = f"{timeRatio:.2f}x {memoryRatio:.2f}m"
+                if timeRatio > 1 + args.tolerance or memoryRatio > 1 + args.tolerance:
+                    regressions.append(name)
+                    comparison += " !"
+
+            print(f"{name:<20}{events:>10}{result['seconds']:>10.3f}{result['relativeTime']:>10.2f}{result['eventsPerSecond']:>12.0f}"
+                  f"{result['peakMemory'] / 2**20:>10.1f}{comparison:>14}")
+
+    if args.update_baselines:
+        # seconds and events per second only mean something on this machine, they aren't stored
+        baselines[args.target] = {name: {key: round(result[key], 6) for key in ("events", "peakMemory", "relativeTime")}
+                                  for name, result in results.items()}
+        with open(args.baselines, "w") as f:
+            json.dump(baselines, f, indent=4, sort_keys=True)
+            f.write("\n")
+        print(f"baselines written to {args.baselines}")
+    else:
+        if missing:
+            print(f"no {args.target} baselines in {args.baselines} for: {', '.join(missing)}, "
+                  f"record them with --update-baselines to compare them")
+        if regressions:
+            print(f"regressions (more than {args.tolerance:.0%} worse): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
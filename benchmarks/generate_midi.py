@@ -0,0 +1,148 @@
+"""deterministic generator of synthetic standard MIDI files
+
+the files are written byte by byte (no mido), so the generator does not depend on the parser it is used to benchmark.
+the same parameters and seed always give the same bytes, so a generated file can stand in for a MIDI file we can't share.
+
+usage: python benchmarks/generate_midi.py out.mid [--tracks 8] [--duration 60] [--notes-per-second 8] [--cc-per-second 2]
+                                                   [--tempo-changes 4] [--no-running-status] [--seed 0]
+"""
+import sys
+import random
+import struct
+import argparse
+
+# times are generated in seconds and converted to ticks at this tempo (120 BPM)
+DEFAULT_TEMPO = 500000
+
+
+def encodeVariableInt(value: int) -> bytes:
+    """encodes an int as a MIDI variable length quantity
+
+    :param int value: the value to encode, must be positive
+    :return bytes: the encoded value
+    """
+    out = [value & 0x7f]
+    value >>= 7
+    while value:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    return bytes(reversed(out))
+
+
+def encodeTrack(events: list, runningStatus: bool = True) -> bytes:
+    """encodes a list of events as an MTrk chunk
+
+    :param list events: list of (tick, message bytes) tuples, must be sorted by tick
+    :param bool runningStatus: leave out repeated channel status bytes, defaults to True
+    :return bytes: the MTrk chunk
+    """
+    data = bytearray()
+    lastTick = 0
+    lastStatus = None
+
+    for tick, msg in events:
+        data += encodeVariableInt(tick - lastTick)
+        lastTick = tick
+
+        status = msg[0]
+        if status >= 0xf0:
+            # meta and sysex messages cancel running status
+            lastStatus = None
+            data += msg
+        elif runningStatus and status == lastStatus:
+            data += msg[1:]
+        else:
+            lastStatus = status
+            data += msg
+
+    data += encodeVariableInt(0) + b"\xff\x2f\x00"
+    return b"MTrk" + struct.pack(">L", len(data)) + bytes(data)
+
+
+def generateMIDI(tracks: int = 8, duration: float = 60.0, notesPerSecond: float = 8.0, ccPerSecond: float = 2.0,
+                 tempoChanges: int = 4, runningStatus: bool = True, ticksPerBeat: int = 480, seed: int = 0) -> bytes:
+    """generates a type 1 MIDI file with a conductor track (name and tempo changes) and `tracks` note tracks
+
+    :param int tracks: number of note tracks, defaults to 8
+    :param float duration: length of the file in seconds (at 120 BPM), defaults to 60.0
+    :param float notesPerSecond: average notes per second in each track, defaults to 8.0
+    :param float ccPerSecond: average control change messages per second in each track, defaults to 2.0
+    :param int tempoChanges: number of tempo changes in the conductor track, defaults to 4
+    :param bool runningStatus: use running status for channel messages, defaults to True
+    :param int ticksPerBeat: file resolution, defaults to 480
+    :param int seed: random seed, defaults to 0
+    :return bytes: the MIDI file
+    """
+    rng = random.Random(seed)
+    ticksPerSecond = ticksPerBeat * 1000000 / DEFAULT_TEMPO
+    endTick = int(duration * ticksPerSecond)
+
+    def toTick(sec: float) -> int:
+        return min(int(sec * ticksPerSecond), endTick)
+
+    chunks = [b"MThd" + struct.pack(">LHHH", 6, 1, tracks + 1, ticksPerBeat)]
+
+    # conductor track
+    name = b"Conductor"
+    conductor = [(0, b"\xff\x03" + encodeVariableInt(len(name)) + name),
+                 (0, b"\xff\x51\x03" + DEFAULT_TEMPO.to_bytes(3, "big"))]
+    for _ in range(tempoChanges):
+        tempo = rng.randrange(300000, 1000000)
+        conductor.append((rng.randrange(endTick + 1), b"\xff\x51\x03" + tempo.to_bytes(3, "big")))
+    conductor.sort(key=lambda event: event[0])
+    chunks.append(encodeTrack(conductor, runningStatus))
+
+    for trackIndex in range(tracks):
+        # skip the drum channel
+        channel = trackIndex % 15
+        channel += channel >= 9
+
+        name = f"Track {trackIndex + 1}".encode()
+        events = [(0, b"\xff\x03" + encodeVariableInt(len(name)) + name),
+                  (0, bytes((0xc0 | channel, rng.randrange(128))))]
+
+        # (tick, order, bytes), order keeps note offs before note ons on the same tick
+        timed = []
+        for _ in range(int(duration * notesPerSecond)):
+            start = rng.random() * duration
+            length = rng.expovariate(4.0)
+            note = rng.randrange(24, 108)
+            startTick = toTick(start)
+            # note off as note_on with velocity 0, so running status applies
+            timed.append((startTick, 1, bytes((0x90 | channel, note, rng.randrange(1, 128)))))
+            timed.append((max(toTick(start + length), startTick + 1), 0, bytes((0x90 | channel, note, 0))))
+
+        for _ in range(int(duration * ccPerSecond)):
+            timed.append((toTick(rng.random() * duration), 2, bytes((0xb0 | channel, rng.choice((1, 7, 10, 11, 64)), rng.randrange(128)))))
+
+        timed.sort(key=lambda event: (event[0], event[1]))
+        events += [(tick, msg) for tick, _, msg in timed]
+        chunks.append(encodeTrack(events, runningStatus))
+
+    return b"".join(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generate a deterministic synthetic MIDI file")
+    parser.add_argument("output")
+    parser.add_argument("--tracks", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--notes-per-second", type=float, default=8.0)
+    parser.add_argument("--cc-per-second", type=float, default=2.0)
+    parser.add_argument("--tempo-changes", type=int, default=4)
+    parser.add_argument("--no-running-status", action="store_true")
+    parser.add_argument("--ticks-per-beat", type=int, default=480)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(sys.argv[1:])
+
+    data = generateMIDI(args.tracks, args.duration, args.notes_per_second, args.cc_per_second,
+                        args.tempo_changes, not args.no_running_status, args.ticks_per_beat, args.seed)
+
+    with open(args.output, "wb") as f:
+        f.write(data)
+
+    print(f"wrote {args.output} ({len(data) / 1024:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+"""differential check and benchmark for the overlap modes in algorithms.py
+
+generates random note keyframes, resolves them with the original list-based overlap functions (kept below as the reference)
+and with every variant in `VARIANTS`, and checks that they give the same animation. then times every implementation
+on notes at a few densities and reports the time per note.
+
+to check a new optimization, add it to `VARIANTS` and run the harness, it exits with 1 if any variant does not match the reference.
+
+usage: blender -b --python benchmarks/overlap_harness.py -- [--modes add next] [--trials 1000] [--notes 2000] [--repeat 3] [--seed 0]
+"""
+import os
+import sys
+import random
+import argparse
+from dataclasses import dataclass
+from typing import List, Tuple
+from timeit import default_timer as timer
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from MIDIAnimator.data_structures import KeyframeArray
+from MIDIAnimator.src.algorithms import OVERLAP_FUNCTIONS, resolveKeyframes, envelopeKeyframes
+
+# the gap (in frames) between note starts for each density, every note is 6 frames long
+DENSITIES = {
+    "sparse": 8,
+    "medium": 3,
+    "dense": 1,
+    "chord": 0,
+}
+
+
+# reference implementations
+# these are the list-based overlap functions from before the overlap pipeline moved to KeyframeArray, kept as they were
+# so every optimization is compared to the same behaviour. the only changes are a removed debug print, and `getValue()`
+# giving back the exact value of a keyframe on its own frame (like `LinearCurve`), before it could be off by rounding,
+# which made "min" treat a resting (0) key as playing
+
+@dataclass
+class Keyframe:
+    frame: float
+    value: float
+
+
+def findOverlap(keyList1: List[Keyframe], keyList2: List[Keyframe]) -> List[Keyframe]:
+    if len(keyList1) == 0 or len(keyList2) == 0:
+        return []
+
+    if keyList1[0].frame > keyList2[0].frame:
+        raise ValueError("first keyframe in keyList1 is bigger than first keyframe in keyList2!")
+
+    overlappingKeyList = []
+    overlapping = False
+    for key1 in reversed(keyList1):
+        if key1.frame > keyList2[0].frame:
+            overlapping = True
+            overlappingKeyList.append(key1)
+        else:
+            if overlapping:
+                overlappingKeyList.append(key1)
+            break
+
+    return list(reversed(overlappingKeyList))
+
+
+def getValue(key1: Keyframe, key2: Keyframe, frame: float) -> float:
+    x1, y1 = key1.frame, key1.value
+    x2, y2 = key2.frame, key2.value
+    if frame == x1:
+        return y1
+    if frame == x2:
+        return y2
+    try:
+        m = (y2 - y1) / (x2 - x1)
+    except ZeroDivisionError:
+        m = 0
+
+    c = y1 - m * x1
+    return (m * frame) + c
+
+
+def interval(keyList, frame) -> Tuple[Keyframe]:
+    if len(keyList) == 0:
+        return (None, None)
+    if keyList[0].frame > frame:
+        return (keyList[0], keyList[0])
+    elif keyList[-1].frame < frame:
+        return (keyList[-1], keyList[-1])
+
+    for i in range(len(keyList) - 1):
+        if keyList[i].frame <= frame <= keyList[i+1].frame:
+            return (keyList[i], keyList[i+1])
+
+
+def _interpolateBoth(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]):
+    keysOverlapping = findOverlap(insertedKeys, nextKeys)
+
+    insertedKeysInterValues = []
+    nextKeysInterValues = []
+
+    for key in nextKeys:
+        inv1, inv2 = interval(keysOverlapping, key.frame)
+        if inv1 is None and inv2 is None: continue
+        nextKeysInterValues.append(Keyframe(key.frame, getValue(inv1, inv2, key.frame)))
+
+    for key in keysOverlapping:
+        inv1, inv2 = interval(nextKeys, key.frame)
+        if inv1 is None and inv2 is None: continue
+        insertedKeysInterValues.append(Keyframe(key.frame, getValue(inv1, inv2, key.frame)))
+
+    return keysOverlapping, insertedKeysInterValues, nextKeysInterValues
+
+
+def refAddKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
+    keysOverlapping, insertedKeysInterValues, nextKeysInterValues = _interpolateBoth(insertedKeys, nextKeys)
+
+    for key, interp in zip(keysOverlapping, insertedKeysInterValues):
+        key.value += interp.value
+
+    for key, interp in zip(nextKeys, nextKeysInterValues):
+        key.value += interp.value
+
+    keysOverlapping.extend(nextKeys)
+    keysOverlapping.sort(key=lambda keyframe: keyframe.frame)
+
+    insertedKeys.extend(keysOverlapping)
+
+
+def refMinKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
+    keysOverlapping, insertedKeysInterValues, nextKeysInterValues = _interpolateBoth(insertedKeys, nextKeys)
+
+    for key, interp in zip(keysOverlapping, insertedKeysInterValues):
+        if interp.value != 0 and key.value != 0:
+            key.value = min(key.value, interp.value)
+
+    for key, interp in zip(nextKeys, nextKeysInterValues):
+        if interp.value != 0 and key.value != 0:
+            key.value = min(key.value, interp.value)
+
+    non_overlapping_keys = [key for key in nextKeys if key.frame not in [k.frame for k in keysOverlapping]]
+    insertedKeys.extend(non_overlapping_keys)
+    insertedKeys.sort(key=lambda keyframe: keyframe.frame)
+
+
+def refMaxKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
+    keysOverlapping, insertedKeysInterValues, nextKeysInterValues = _interpolateBoth(insertedKeys, nextKeys)
+
+    for key, interp in zip(keysOverlapping, insertedKeysInterValues):
+        key.value = max(key.value, interp.value)
+
+    for key, interp in zip(nextKeys, nextKeysInterValues):
+        key.value = max(key.value, interp.value)
+
+    non_overlapping_keys = [key for key in nextKeys if key.frame not in [k.frame for k in keysOverlapping]]
+    insertedKeys.extend(non_overlapping_keys)
+    insertedKeys.sort(key=lambda keyframe: keyframe.frame)
+
+
+def refPrevKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
+    keysOverlapping = findOverlap(insertedKeys, nextKeys)
+
+    if not keysOverlapping:
+        insertedKeys.extend(nextKeys)
+
+    insertedKeys.sort(key=lambda keyframe: keyframe.frame)
+
+
+def refNextKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
+    keysOverlapping = findOverlap(insertedKeys, nextKeys)
+
+    if keysOverlapping:
+        firstOverlapFrame = keysOverlapping[0].frame
+        for key in reversed(insertedKeys):
+            if key.frame > firstOverlapFrame:
+                insertedKeys.pop()
+            else:
+                break
+
+    insertedKeys.extend(nextKeys)
+    insertedKeys.sort(key=lambda keyframe: keyframe.frame)
+
+
+def refRestValueCrossingKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
+    restValue = 0
+    keysOverlapping = findOverlap(insertedKeys, nextKeys)
+
+    for key in keysOverlapping:
+        for nextKey in nextKeys:
+            if key.frame == nextKey.frame:
+                insertedValueToRest = (key.value + restValue) / 2
+                nextValueFromRest = (nextKey.value + restValue) / 2
+
+                key.value = insertedValueToRest
+                nextKey.value = nextValueFromRest
+
+    nonOverlappingNextKeys = [key for key in nextKeys if key.frame not in [k.frame for k in keysOverlapping]]
+
+    finalKeyframes = []
+    i, j = 0, 0
+    while i < len(insertedKeys) and j < len(nonOverlappingNextKeys):
+        if insertedKeys[i].frame < nonOverlappingNextKeys[j].frame:
+            finalKeyframes.append(insertedKeys[i])
+            i += 1
+        else:
+            finalKeyframes.append(nonOverlappingNextKeys[j])
+            j += 1
+
+    finalKeyframes.extend(insertedKeys[i:])
+    finalKeyframes.extend(nonOverlappingNextKeys[j:])
+
+    insertedKeys.clear()
+    insertedKeys.extend(finalKeyframes)
+
+
+def refPruneKeyframes(insertedKeys: List[Keyframe], nextKeys: List[Keyframe]) -> None:
+    keysOverlapping = findOverlap(insertedKeys, nextKeys)
+
+    if keysOverlapping:
+        last_overlap_frame = max(key.frame for key in keysOverlapping)
+
+        prunedInsertedKeys = [key for key in insertedKeys if key.frame <= last_overlap_frame]
+
+        if len(prunedInsertedKeys) > 1:
+            prunedInsertedKeys.pop()
+            if len(prunedInsertedKeys) > 1:
+                prunedInsertedKeys.pop()
+
+        remainingInsertedKeys = [key for key in insertedKeys if key.frame > last_overlap_frame]
+
+        finalKeyframes = prunedInsertedKeys + remainingInsertedKeys + nextKeys
+    else:
+        finalKeyframes = insertedKeys + nextKeys
+
+    finalKeyframes.sort(key=lambda keyframe: keyframe.frame)
+    insertedKeys.clear()
+    insertedKeys.extend(finalKeyframes)
+
+
+REFERENCE_FUNCTIONS = {
+    "add": refAddKeyframes,
+    "min": refMinKeyframes,
+    "max": refMaxKeyframes,
+    "prev": refPrevKeyframes,
+    "next": refNextKeyframes,
+    "rvc": refRestValueCrossingKeyframes,
+    "prune": refPruneKeyframes,
+}
+
+
+def reference(notes: List[List[Tuple[float, float]]], mode: str) -> KeyframeArray:
+    """resolves the notes with the reference overlap function of the mode
+
+    :param List[List[Tuple[float, float]]] notes: (frame, value) pairs of each note
+    :param str mode: the overlap mode
+    :return KeyframeArray: the resolved keyframes
+    """
+    overlapFunc = REFERENCE_FUNCTIONS[mode]
+    out = []
+    for note in notes:
+        # the reference functions change the values of the next keys, so every run gets new Keyframes
+        overlapFunc(out, [Keyframe(frame, value) for frame, value in note])
+    return KeyframeArray([key.frame for key in out], [key.value for key in out])
+
+
+# optimized variants
+# name: (function(noteKeys, mode) -> KeyframeArray, the modes it should match the reference in,
+#        function(notes, mode) -> the notes it is compared on, None to compare on every random note set)
+
+def perNote(noteKeys: List[KeyframeArray], mode: str) -> KeyframeArray:
+    overlapFunc = OVERLAP_FUNCTIONS[mode]
+    out = KeyframeArray()
+    for keys in noteKeys:
+        overlapFunc(insertedKeys=out, nextKeys=keys)
+    return out
+
+
+def envelopeNotes(notes: List[List[Tuple[float, float]]], mode: str) -> List[List[Tuple[float, float]]]:
+    """changes random notes into notes the reference "min"/"max" and `envelopeKeyframes()` should agree on.
+    the reference merges every note into the keyframes so far, instead of comparing all notes like the envelope, so it only gives
+    the envelope when at most two notes overlap (more would compare against a line through the merged keyframes), when a note's first
+    and last value don't change the other notes (the reference compares the keyframes next to a note with them too), and for "min"
+    when no value is or passes through 0 (the reference keeps a resting key where the envelope ignores it)
+
+    :param List[List[Tuple[float, float]]] notes: (frame, value) pairs of each note
+    :param str mode: "min" or "max"
+    :return List[List[Tuple[float, float]]]: the notes that overlap at most two at a time, with their values changed for the mode
+    """
+    kept = []
+    for note in notes:
+        if sum(other[-1][0] > note[0][0] for other in kept) >= 2:
+            continue
+
+        if mode == "min":
+            # only positive values, starting and ending at the highest one
+            note = [(frame, value if value > 0 else 0.25) for frame, value in note]
+            rest = 2
+        else:
+            # no negative values, starting and ending at the lowest one
+            note = [(frame, max(value, 0)) for frame, value in note]
+            rest = 0
+        note[0], note[-1] = (note[0][0], rest), (note[-1][0], rest)
+        kept.append(note)
+    return kept
+
+
+VARIANTS = {
+    # the KeyframeArray overlap functions, called note by note
+    "keyframearray": (perNote, ("add", "min", "max", "prev", "next", "rvc", "prune"), None),
+    # what `EvaluateInstrument.animate()` uses, "add" is the batch sweep
+    "resolve": (resolveKeyframes, ("add", "prev", "next", "rvc", "prune"), None),
+    # "min"/"max" in `EvaluateInstrument.animate()`, a full envelope of all notes instead of the note by note comparison,
+    # so it is only compared on the notes both agree on (bench_overlap_envelope.py checks it on any notes against a brute force envelope)
+    "envelope": (envelopeKeyframes, ("min", "max"), envelopeNotes),
+}
+
+
+def randomNotes(rng: random.Random, count: int) -> List[List[Tuple[float, float]]]:
+    """random note keyframes, some of them overlapping, some starting on the same frame
+
+    :param random.Random rng: random number generator
+    :param int count: number of notes
+    :return List[List[Tuple[float, float]]]: (frame, value) pairs of each note, sorted by frame
+    """
+    notes = []
+    time = 0.0
+    for _ in range(count):
+        time += rng.choice((0, 0.5, 1, 2, 3, 7))
+        frames = sorted({time} | {time + rng.choice((0.25, 1, 2, 3, 5)) for _ in range(rng.randrange(1, 5))})
+        values = [rng.choice((-1, 0, 0.5, 1, 2)) for _ in frames]
+        # most notes start and end at rest, like the reference curves do
+        if rng.random() < 0.8:
+            values[0] = values[-1] = 0
+        notes.append(list(zip(frames, values)))
+    return notes
+
+
+def densityNotes(count: int, gap: float) -> List[List[Tuple[float, float]]]:
+    """notes `gap` frames apart, each one 6 frames long
+
+    :param int count: number of notes
+    :param float gap: frames between note starts
+    :return List[List[Tuple[float, float]]]: (frame, value) pairs of each note
+    """
+    return [[(i * gap + frame, value) for frame, value in ((0, 0), (1, 1), (3, 0.5), (6, 0))] for i in range(count)]
+
+
+def toKeyframeArrays(notes: List[List[Tuple[float, float]]]) -> List[KeyframeArray]:
+    return [KeyframeArray([frame for frame, _ in note], [value for _, value in note]) for note in notes]
+
+
+def canonical(keys: KeyframeArray) -> np.ndarray:
+    """the keyframes as Blender would insert them, one keyframe per frame (the last one wins)"""
+    keys = keys.copy()
+    keys.sort()
+    last = np.append(keys.frames[1:] != keys.frames[:-1], True)
+    return np.column_stack((keys.frames[last], keys.values[last]))
+
+
+def same(a: KeyframeArray, b: KeyframeArray, tolerance: float) -> bool:
+    a, b = canonical(a), canonical(b)
+    return a.shape == b.shape and np.allclose(a, b, rtol=0, atol=tolerance)
+
+
+def best(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = timer()
+        func()
+        times.append(timer() - start)
+    return min(times)
+
+
+def expectedKeys(noteSets: List[List[List[Tuple[float, float]]]], mode: str) -> List[KeyframeArray]:
+    """resolves every note set with the reference, None for the sets the reference fails on
+
+    :param List[List[List[Tuple[float, float]]]] noteSets: the note sets
+    :param str mode: the overlap mode
+    :return List[KeyframeArray]: the resolved keyframes of each set
+    """
+    expected = []
+    for notes in noteSets:
+        try:
+            expected.append(reference(notes, mode))
+        except TypeError:
+            # the reference can't interpolate some overlaps (`interval()` returns None), those sets are skipped
+            expected.append(None)
+    return expected
+
+
+def check(modes: List[str], trials: int, tolerance: float, seed: int) -> int:
+    """runs every variant against the reference on random notes
+
+    :param List[str] modes: the overlap modes to check
+    :param int trials: number of random note sets
+    :param float tolerance: allowed difference in frames and values
+    :param int seed: random seed
+    :return int: the number of mismatches
+    """
+    rng = random.Random(seed)
+    noteSets = [randomNotes(rng, rng.randrange(1, 12)) for _ in range(trials)]
+    failed = 0
+
+    for mode in modes:
+        expected = expectedKeys(noteSets, mode)
+
+        for name, (variant, variantModes, comparedNotes) in VARIANTS.items():
+            if mode not in variantModes:
+                continue
+
+            variantSets, variantExpected = noteSets, expected
+            if comparedNotes is not None:
+                variantSets = [comparedNotes(notes, mode) for notes in noteSets]
+                variantExpected = expectedKeys(variantSets, mode)
+            skipped = sum(keys is None for keys in variantExpected)
+
+            mismatches = 0
+            for notes, keys in zip(variantSets, variantExpected):
+                if keys is not None and not same(variant(toKeyframeArrays(notes), mode), keys, tolerance):
+                    mismatches += 1
+                    if mismatches == 1:
+                        print(f"  first mismatch ({name}, {mode}): {notes}")
+
+            failed += mismatches
+            print(f"{mode:<6}{name:<16}{trials - skipped - mismatches}/{trials - skipped} match"
+                  + (f" ({skipped} skipped, the reference fails on them)" if skipped else ""))
+
+    return failed
+
+
+def benchmark(modes: List[str], count: int, repeat: int) -> None:
+    """times the reference and every variant at each density
+
+    :param List[str] modes: the overlap modes to time
+    :param int count: number of notes
+    :param int repeat: number of timed runs (the best one is reported)
+    """
+    names = ["reference"] + list(VARIANTS)
+    print(f"\nmicroseconds per note ({count} notes)")
+    print(f"{'mode':<6}{'density':<10}" + "".join(f"{name:>16}" for name in names))
+
+    for mode in modes:
+        for density, gap in DENSITIES.items():
+            notes = densityNotes(count, gap)
+            noteKeys = toKeyframeArrays(notes)
+
+            row = [best(lambda: reference(notes, mode), repeat)]
+            for variant, variantModes, _ in VARIANTS.values():
+                row.append(best(lambda: variant(noteKeys, mode), repeat) if mode in variantModes else None)
+
+            print(f"{mode:<6}{density:<10}" + "".join(f"{'-':>16}" if seconds is None else f"{seconds / count * 1e6:>16.2f}" for seconds in row))
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description="overlap mode differential check and benchmark")
+    parser.add_argument("--modes", nargs="*", choices=list(REFERENCE_FUNCTIONS), default=list(REFERENCE_FUNCTIONS))
+    parser.add_argument("--trials", type=int, default=1000)
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-benchmark", action="store_true")
+    args = parser.parse_args(argv)
+
+    failed = check(args.modes, args.trials, args.tolerance, args.seed)
+
+    if not args.no_benchmark:
+        benchmark(args.modes, args.notes, args.repeat)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
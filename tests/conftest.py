@@ -0,0 +1,15 @@
+"""shared fixtures, the synthetic MIDI file generator and the overlap harness live in benchmarks/"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+from generate_midi import generateMIDI
+
+
+@pytest.fixture(scope="session")
+def midiBytes():
+    # tempo changes, control changes and running status, like a real file
+    return generateMIDI(tracks=4, duration=20, tempoChanges=4, seed=1)
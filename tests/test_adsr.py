@@ -0,0 +1,50 @@
+"""regression tests for `genADSRKeyframes()`"""
+import numpy as np
+import pytest
+
+from MIDIAnimator.src.algorithms import genADSRKeyframes, resolveKeyframes
+
+
+def keyList(keys):
+    return list(zip(keys.frames.tolist(), np.round(keys.values, 9).tolist()))
+
+
+def test_overlapping_notes_retrigger():
+    # the second note starts during the first note's release (at 0.5 * (1 - 2/8) = 0.375)
+    first, second = genADSRKeyframes([0, 22], [20, 40], attack=4, decay=4, sustain=0.5, release=8)
+
+    # the first note is cut off at the second note on
+    assert keyList(first) == [(0, 0), (4, 1), (8, 0.5), (20, 0.5)]
+    # the attack starts from the level the envelope reached
+    assert keyList(second) == [(22, 0.375), (26, 1), (30, 0.5), (40, 0.5), (48, 0)]
+
+    # so adding the notes together never goes above the peak
+    combined = resolveKeyframes([first, second], "add")
+    assert combined.values.max() == pytest.approx(1)
+
+
+def test_retrigger_during_attack():
+    first, second = genADSRKeyframes([0, 2], [20, 30], attack=4, decay=4, sustain=0.5, release=8)
+
+    assert keyList(first) == [(0, 0)]
+    assert keyList(second) == [(2, 0.5), (6, 1), (10, 0.5), (30, 0.5), (38, 0)]
+
+
+def test_zero_length_segments_have_no_duplicate_frames():
+    for attack, decay, release in ((0, 4, 8), (4, 0, 8), (4, 4, 0), (0, 0, 0)):
+        keys, = genADSRKeyframes([0], [10], attack, decay, sustain=0.5, release=release)
+        assert np.all(np.diff(keys.frames) > 0), (attack, decay, release)
+
+    keys, = genADSRKeyframes([0], [10], attack=0, decay=4, sustain=0.5, release=8)
+    assert keyList(keys) == [(0, 1), (4, 0.5), (10, 0.5), (18, 0)]
+
+
+def test_notes_without_note_off_are_held():
+    # the first note is held until the second note on, the last one until it reaches the sustain level
+    first, second = genADSRKeyframes([0, 30], [-1, -1], attack=4, decay=4, sustain=0.5, release=8)
+
+    assert keyList(first) == [(0, 0), (4, 1), (8, 0.5)]
+    assert keyList(second) == [(30, 0.5), (34, 1), (38, 0.5), (46, 0)]
+
+    keys, = genADSRKeyframes([0], [-1], attack=4, decay=4, sustain=0.5, release=8, hold=20)
+    assert keyList(keys) == [(0, 0), (4, 1), (8, 0.5), (20, 0.5), (28, 0)]
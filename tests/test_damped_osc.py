@@ -0,0 +1,93 @@
+"""regression tests for the damped oscillation keyframes"""
+import numpy as np
+import pytest
+
+from MIDIAnimator.src import algorithms
+from MIDIAnimator.src.algorithms import genDampedOscKeyframes, genDampedOscKeyframesBatch, clearDampedOscCache, _dampedOscTemplate, dampedOscExtremaCount, animateDampedOsc
+
+
+@pytest.fixture(autouse=True)
+def emptyCache():
+    clearDampedOscCache()
+    yield
+    clearDampedOscCache()
+
+
+def test_template_is_cached_and_grows_for_larger_amplitudes():
+    small = _dampedOscTemplate(1.0, 0.5, 1)
+    assert _dampedOscTemplate(1.0, 0.5, 1) is small
+    # a smaller amplitude needs fewer extrema, the cached template is long enough
+    assert _dampedOscTemplate(1.0, 0.5, 0.5) is small
+
+    large = _dampedOscTemplate(1.0, 0.5, 100)
+    assert len(large[0]) > len(small[0])
+    assert _dampedOscTemplate(1.0, 0.5, 1) is large
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(algorithms, "DAMPED_OSC_CACHE_SIZE", 4)
+    for i in range(10):
+        _dampedOscTemplate(1.0 + i, 0.5, 1)
+        assert len(algorithms._dampedOscTemplates) <= 4
+
+
+def test_cached_keyframes_match_uncached():
+    cold = genDampedOscKeyframes(2.0, 3.0, 0.4, frame=10)
+    warm = genDampedOscKeyframes(2.0, 3.0, 0.4, frame=10)
+    assert np.array_equal(cold.frames, warm.frames) and np.array_equal(cold.values, warm.values)
+
+
+@pytest.mark.parametrize("period, amplitude, damp", [(1.0, 1.0, 0.5), (0.3, 5.0, 0.05), (2.0, 0.01, 1.0), (1.0, 0.0005, 0.5), (4.0, 20.0, 3.0)])
+def test_extrema_count_matches_brute_force(period, amplitude, damp):
+    # walk the extrema one by one until one is 0.001 or less
+    x = np.arctan(period / damp) / period
+    count = 1
+    while abs(amplitude * animateDampedOsc(x, period, 1, damp)) > 0.001:
+        x += np.pi / period
+        count += 1
+    assert dampedOscExtremaCount(period, amplitude, damp) == count
+
+
+@pytest.mark.parametrize("period, amplitude, damp", [(1.0, 1.0, 0.5), (0.3, -5.0, 0.05), (-2.0, 3.0, 1.0)])
+def test_keyframes_are_the_extrema(period, amplitude, damp):
+    keys = genDampedOscKeyframes(period, amplitude, damp, frame=4)
+    frames, values = keys.frames[1:-1], keys.values[1:-1]
+
+    # the keyframes start and end at rest, 1 frame after the last extremum
+    assert keys.values[0] == 0 and keys.values[-1] == 0
+    assert keys.frames[0] == 4 and keys.frames[-1] == frames[-1] + 1
+
+    # every keyframe is on the curve, and it ends at the first extremum that is 0.001 or less
+    if period < 0:
+        period, amplitude = -period, -amplitude
+    assert np.allclose(values, [animateDampedOsc(frame - 4, period, amplitude, damp) for frame in frames], rtol=0, atol=1e-12)
+    assert np.all(np.abs(values[:-1]) > 0.001) and abs(values[-1]) <= 0.001
+
+    # and each one is a turning point of the curve
+    for frame, value in zip(frames - 4, values):
+        for offset in (-1e-4, 1e-4):
+            assert abs(animateDampedOsc(frame + offset, period, amplitude, damp)) <= abs(value)
+
+
+def test_invalid_oscillations_raise():
+    with pytest.raises(ValueError):
+        genDampedOscKeyframes(0, 1, 0.5)
+    with pytest.raises(ValueError):
+        genDampedOscKeyframes(1, 1, 0)
+
+
+@pytest.mark.parametrize("period, damp", [(1.0, 0.5), (-0.7, 0.1), (2 * np.pi / 4, 10 / 24), (4.0, 10.0)])
+def test_batch_matches_per_note(period, damp):
+    rng = np.random.default_rng(0)
+    amplitude = rng.choice([0, 0.001, 0.5, 1, 4, -2, 30], size=40)
+    frames = np.sort(rng.uniform(0, 500, size=40))
+
+    batch = genDampedOscKeyframesBatch(period, amplitude, damp, frames)
+    assert len(batch) == len(frames)
+    for keys, amp, frame in zip(batch, amplitude, frames):
+        clearDampedOscCache()
+        expected = genDampedOscKeyframes(period, amp, damp, frame)
+        assert np.array_equal(keys.frames, expected.frames), (amp, frame)
+        assert np.array_equal(keys.values, expected.values), (amp, frame)
+
+    assert genDampedOscKeyframesBatch(period, 1, damp, []) == []
@@ -0,0 +1,47 @@
+"""regression tests for `dedupKeyframes()`"""
+import random
+
+import numpy as np
+import pytest
+
+from MIDIAnimator.data_structures import KeyframeArray
+from MIDIAnimator.src.algorithms import dedupKeyframes, DEDUP_RULES
+
+
+def naiveDedup(frames, values, epsilon, rule):
+    """groups the keyframes one by one, measured from the first keyframe of each group"""
+    groups = []
+    for frame, value in zip(frames, values):
+        if groups and frame - groups[-1][0] <= epsilon:
+            groups[-1][1].append(value)
+        else:
+            groups.append((frame, [value]))
+
+    merge = {"last": lambda v: v[-1], "first": lambda v: v[0], "max": max, "min": min, "sum": sum}[rule]
+    return [frame for frame, _ in groups], [merge(groupValues) for _, groupValues in groups]
+
+
+@pytest.mark.parametrize("rule", DEDUP_RULES)
+@pytest.mark.parametrize("epsilon", [0, 0.3, 1, 2.5])
+def test_dedup_matches_naive(rule, epsilon):
+    rng = random.Random(0)
+    for _ in range(200):
+        frames = sorted(rng.choice((0, 0.25, 0.5, 1, 3)) * rng.randrange(0, 8) + rng.randrange(0, 20) for _ in range(rng.randrange(0, 15)))
+        values = [rng.uniform(-2, 2) for _ in frames]
+
+        keys = dedupKeyframes(KeyframeArray(frames, values), epsilon, rule)
+        expectedFrames, expectedValues = naiveDedup(frames, values, epsilon, rule)
+        assert keys.frames.tolist() == expectedFrames
+        assert np.allclose(keys.values, expectedValues, rtol=0, atol=1e-12)
+
+
+def test_dedup_does_not_chain():
+    # every keyframe is within epsilon of the one before it, but not of the group's first keyframe
+    keys = dedupKeyframes(KeyframeArray([0, 0.6, 1.2, 1.8, 2.4], [1, 2, 3, 4, 5]), epsilon=1, rule="last")
+    assert keys.frames.tolist() == [0, 1.2, 2.4]
+    assert keys.values.tolist() == [2, 4, 5]
+
+
+def test_dedup_rejects_unknown_rules():
+    with pytest.raises(ValueError):
+        dedupKeyframes(KeyframeArray([0, 0], [1, 2]), rule="mean")
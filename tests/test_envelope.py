@@ -0,0 +1,35 @@
+"""regression tests for `envelopeKeyframes()`"""
+import random
+
+import numpy as np
+import pytest
+
+from MIDIAnimator.src.algorithms import envelopeKeyframes
+from bench_overlap_envelope import randomNotes, bruteForceEnvelope
+from overlap_harness import envelopeNotes, expectedKeys, same, toKeyframeArrays
+import overlap_harness
+
+
+@pytest.mark.parametrize("mode", ["min", "max"])
+def test_envelope_matches_brute_force(mode):
+    rng = random.Random(0)
+    for _ in range(300):
+        notes = randomNotes(rng, rng.randrange(1, 10))
+        keys = envelopeKeyframes(notes, mode)
+        expected = bruteForceEnvelope(notes, mode)
+        assert np.array_equal(keys.frames, expected.frames)
+        assert np.allclose(keys.values, expected.values, rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("mode", ["min", "max"])
+def test_envelope_matches_reference_when_two_notes_overlap(mode):
+    rng = random.Random(1)
+    sets = [envelopeNotes(overlap_harness.randomNotes(rng, rng.randrange(1, 12)), mode) for _ in range(300)]
+    for notes, expected in zip(sets, expectedKeys(sets, mode)):
+        if expected is not None:
+            assert same(envelopeKeyframes(toKeyframeArrays(notes), mode), expected, 1e-9), notes
+
+
+def test_envelope_rejects_other_modes():
+    with pytest.raises(ValueError):
+        envelopeKeyframes([], "add")
@@ -0,0 +1,59 @@
+"""regression tests for `LinearCurve` and `LinearCurves`"""
+import random
+
+import numpy as np
+import pytest
+
+from MIDIAnimator.data_structures import Keyframe, KeyframeArray, LinearCurve, LinearCurves
+from MIDIAnimator.src.algorithms import getValue, interval, _scalarValue
+
+
+def randomKeys(rng, duplicates=False):
+    frames = sorted(rng.choice(range(20)) / 2 for _ in range(rng.randrange(1, 8)))
+    if not duplicates:
+        frames = sorted(set(frames))
+    return KeyframeArray(frames, [rng.choice((-1, 0, 0.5, 1, 2, 3.3)) for _ in frames])
+
+
+def test_linear_curve_matches_interval_and_get_value():
+    rng = random.Random(0)
+    for _ in range(300):
+        keys = randomKeys(rng)
+        if len(keys) < 2:
+            # `interval()` can't find an interval in a single keyframe
+            continue
+        curve = LinearCurve(keys.frames, keys.values)
+        keyList = keys.toKeyframes()
+        frames = np.arange(-2, 12, 0.25)
+
+        values = curve.evaluate(frames)
+        for frame, value in zip(frames.tolist(), values.tolist()):
+            assert value == pytest.approx(getValue(*interval(keyList, frame), frame), abs=1e-12)
+            # the single frame path and the array path agree
+            assert curve.evaluate(frame) == value
+
+        # a keyframe gives back its exact value
+        assert np.array_equal(curve.evaluate(keys.frames), keys.values)
+
+
+def test_linear_curves_match_linear_curve():
+    rng = random.Random(1)
+    for _ in range(100):
+        curves = [randomKeys(rng, duplicates=True) for _ in range(rng.randrange(1, 6))]
+        together = LinearCurves(curves)
+        frames = np.arange(-2, 12, 0.25)
+
+        for index, keys in enumerate(curves):
+            curve = LinearCurve(keys.frames, keys.values)
+            expected = curve.evaluate(frames)
+            assert np.array_equal(together.evaluate(np.full(len(frames), index), frames), expected)
+            # the scalar overlap path evaluates the same way
+            assert [_scalarValue(keys.frames.tolist(), keys.values.tolist(), frame) for frame in frames.tolist()] == expected.tolist()
+
+
+def test_linear_curve_needs_keyframes():
+    with pytest.raises(ValueError):
+        LinearCurve([], [])
+    with pytest.raises(ValueError):
+        LinearCurves([KeyframeArray([0], [1]), KeyframeArray()])
+    assert LinearCurve.fromKeyframes([Keyframe(0, 1), Keyframe(2, 3)])(1) == 2
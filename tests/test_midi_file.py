@@ -0,0 +1,74 @@
+"""regression tests for `MIDIFile` and `MIDIFile.iterNotes()`"""
+import builtins
+
+from MIDIAnimator.libs import mido
+from MIDIAnimator.data_structures import midi
+from MIDIAnimator.data_structures.midi import MIDIFile
+
+
+def noteTuple(note):
+    return (note.channel, note.noteNumber, note.velocity, note.timeOn, note.timeOff)
+
+
+def writeMIDI(tmp_path, data):
+    path = tmp_path / "test.mid"
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_note_times_match_mido(tmp_path, midiBytes):
+    path = writeMIDI(tmp_path, midiBytes)
+
+    # mido gives the exact time of every message, also when the tempo changes between two messages of a track
+    timesOn = []
+    time = 0
+    for msg in mido.MidiFile(path):
+        time += msg.time
+        if msg.type == "note_on" and msg.velocity > 0:
+            timesOn.append(time)
+
+    notes = [note for track in MIDIFile(path) for note in track.notes]
+    assert len(notes) == len(timesOn)
+    for expected, timeOn in zip(sorted(timesOn), sorted(note.timeOn for note in notes)):
+        assert abs(expected - timeOn) < 1e-9
+
+
+def test_iter_notes_matches_midifile(tmp_path, midiBytes, monkeypatch):
+    path = writeMIDI(tmp_path, midiBytes)
+    expected = sorted(noteTuple(note) for track in MIDIFile(path) for note in track.notes)
+
+    # every track is read from one file handle
+    opened = []
+    def countingOpen(*args, **kwargs):
+        opened.append(args[0])
+        return builtins.open(*args, **kwargs)
+    monkeypatch.setattr(midi, "open", countingOpen, raising=False)
+
+    notes = list(MIDIFile.iterNotes(path))
+    assert len(opened) == 1
+    assert [note.timeOn for note in notes] == sorted(note.timeOn for note in notes)
+    assert sorted(noteTuple(note) for note in notes) == expected
+
+
+def test_iter_notes_gives_up_on_held_note(tmp_path):
+    track = mido.MidiTrack([
+        mido.Message("note_on", note=60, velocity=100, time=0),
+        *(msg for i in range(5) for msg in (mido.Message("note_on", note=70 + i, velocity=100, time=10),
+                                            mido.Message("note_off", note=70 + i, velocity=0, time=10))),
+        # the note off of the held note comes after it was given up on, it doesn't end the next note 60
+        mido.Message("note_off", note=60, velocity=0, time=10),
+        mido.Message("note_on", note=60, velocity=90, time=10),
+        mido.Message("note_off", note=60, velocity=0, time=10),
+    ])
+    midiFile = mido.MidiFile(type=1, ticks_per_beat=10)
+    midiFile.tracks.append(track)
+    path = str(tmp_path / "held.mid")
+    midiFile.save(path)
+
+    held = list(MIDIFile.iterNotes(path, maxHeld=2))
+    unbounded = list(MIDIFile.iterNotes(path, maxHeld=None))
+
+    assert [note.noteNumber for note in held] == [60, 70, 71, 72, 73, 74, 60]
+    assert held[0].timeOff == -1.0
+    assert unbounded[0].timeOff == 5.5
+    assert [noteTuple(note) for note in held[1:]] == [noteTuple(note) for note in unbounded[1:]]
@@ -0,0 +1,38 @@
+"""regression tests for `MIDITrack.quantize()`"""
+import pytest
+
+from MIDIAnimator.data_structures.midi import MIDITrack, MIDINote
+
+
+def makeTrack(notes):
+    track = MIDITrack("test")
+    track.notes = [MIDINote(0, noteNumber, velocity, timeOn, timeOff) for noteNumber, velocity, timeOn, timeOff in notes]
+    return track
+
+
+def test_short_note_ends_one_frame_after_it_starts():
+    # 1.0 s to 1.01 s both snap to frame 24 at 24 FPS
+    track = makeTrack([(60, 100, 1.0, 1.01)])
+    track.quantize(24)
+
+    note = track.notes[0]
+    assert note.timeOn == 1.0
+    assert note.timeOff == pytest.approx(25 / 24)
+
+
+def test_collapsed_note_without_note_off_keeps_no_note_off():
+    # the louder note (kept) has no note off, the quieter one ends at 2 s
+    track = makeTrack([(60, 100, 1.0, -1.0), (60, 50, 1.01, 2.0)])
+    removed = track.quantize(24)
+
+    assert removed == 1
+    assert len(track.notes) == 1
+    assert track.notes[0].velocity == 100
+    assert track.notes[0].timeOff == -1.0
+
+
+def test_collapsed_note_ends_at_latest_note_off():
+    track = makeTrack([(60, 100, 1.0, 1.5), (60, 50, 1.01, 2.0), (62, 80, 1.0, -1.0)])
+    track.quantize(24)
+
+    assert [(note.noteNumber, note.timeOff) for note in track.notes] == [(60, 2.0), (62, -1.0)]
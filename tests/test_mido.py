@@ -0,0 +1,181 @@
+"""regression tests for the changes to the bundled mido"""
+import io
+import random
+import struct
+
+import pytest
+
+from MIDIAnimator.libs import mido
+from MIDIAnimator.libs.mido.frozen import intern_message
+from MIDIAnimator.libs.mido.tokenizer import Tokenizer
+from MIDIAnimator.libs.mido.midifiles.meta import UnknownMetaMessage
+from MIDIAnimator.libs.mido.midifiles.midifiles import read_file_header, read_track, iter_track
+
+
+def readTracks(data, **kwargs):
+    return [list(track) for track in mido.MidiFile(file=io.BytesIO(data), **kwargs).tracks]
+
+
+def test_skip_checks_reads_the_same_messages(midiBytes):
+    assert readTracks(midiBytes, skip_checks=True) == readTracks(midiBytes)
+
+
+def test_copy_skip_checks():
+    msg = mido.Message("note_on", note=60, velocity=64)
+    assert msg.copy(skip_checks=True, time=1.5) == mido.Message("note_on", note=60, velocity=64, time=1.5)
+    # without skip_checks the overrides are still checked
+    with pytest.raises(ValueError):
+        msg.copy(note=200)
+
+    meta = UnknownMetaMessage(0x60, (1, 2))
+    assert meta.copy(time=3).time == 3
+
+
+def trackChunk(payload, size=None):
+    return b"MTrk" + struct.pack(">L", len(payload) if size is None else size) + payload
+
+
+def test_track_read_in_blocks(midiBytes):
+    midiFile = mido.MidiFile(file=io.BytesIO(midiBytes))
+    infile = io.BytesIO(midiBytes)
+    read_file_header(infile)
+
+    for track in midiFile.tracks:
+        # blocks that end in the middle of most messages
+        assert list(iter_track(infile, block_size=3)) == list(track)
+
+
+def test_malformed_message_is_not_end_of_file():
+    # a set_tempo with 1 data byte instead of 3, in a complete track
+    payload = b"\x00\xff\x51\x01\x07" + b"\x00\xff\x2f\x00"
+    with pytest.raises(IndexError):
+        read_track(io.BytesIO(trackChunk(payload)))
+
+    # a track that really ends in the middle of a message (a note_on without its velocity)
+    with pytest.raises(EOFError):
+        read_track(io.BytesIO(trackChunk(b"\x00\x90\x3c")))
+
+
+# one message of every type, on every channel and with the pitchwheel limits
+MESSAGES = [
+    *(mido.Message("note_on", channel=channel, note=60 + channel, velocity=100) for channel in range(16)),
+    mido.Message("note_off", channel=2, note=0, velocity=127),
+    mido.Message("polytouch", channel=4, note=64, value=3),
+    mido.Message("control_change", channel=9, control=7, value=90),
+    mido.Message("program_change", channel=15, program=127),
+    mido.Message("aftertouch", channel=1, value=55),
+    *(mido.Message("pitchwheel", channel=5, pitch=pitch) for pitch in (-8192, -1, 0, 1234, 8191)),
+    mido.Message("sysex", data=(1, 2, 3)),
+    mido.Message("quarter_frame", frame_type=5, frame_value=9),
+    mido.Message("songpos", pos=12345),
+    mido.Message("song_select", song=17),
+    *(mido.Message(type) for type in ("tune_request", "clock", "start", "continue", "stop", "active_sensing", "reset")),
+]
+
+
+@pytest.mark.parametrize("msg", MESSAGES)
+def test_decoder_table_round_trip(msg):
+    assert mido.Message.from_bytes(msg.bytes()) == msg
+    assert mido.Message.from_bytes(msg.bytes(), skip_checks=True) == msg
+
+
+def test_decoder_table_in_track():
+    # the track reader calls the decoders directly. realtime messages can't be saved in a file,
+    # and a reset's status byte (0xff) starts a meta message there
+    messages = [msg.copy(time=i) for i, msg in enumerate(MESSAGES) if not msg.is_realtime and msg.type != "reset"]
+    midiFile = mido.MidiFile()
+    midiFile.tracks.append(mido.MidiTrack(messages))
+    out = io.BytesIO()
+    midiFile.save(file=out)
+
+    assert readTracks(out.getvalue())[0][:-1] == messages
+
+
+def randomStream(rng, size):
+    # mostly whole messages, with stray data bytes, sysex, undefined status bytes and realtime messages in the middle of others
+    stream = bytearray()
+    while len(stream) < size:
+        kind = rng.random()
+        if kind < 0.6:
+            msg = rng.choice(MESSAGES)
+            stream += bytes(msg.bytes())
+        elif kind < 0.7:
+            stream += bytes([0xf0] + [rng.randrange(128) for _ in range(rng.randrange(5))] + [0xf7])
+        elif kind < 0.8:
+            stream += bytes([rng.randrange(128)])
+        elif kind < 0.9:
+            stream += bytes([rng.choice((0xf4, 0xf5, 0xf7, 0xf8, 0xfe))])
+        else:
+            stream += bytes([rng.randrange(0x80, 0xf0), rng.randrange(128)])
+    return bytes(stream)
+
+
+def test_feed_buffer_matches_feed_byte():
+    rng = random.Random(0)
+    for _ in range(200):
+        stream = randomStream(rng, 200)
+
+        expected = Tokenizer()
+        for byte in stream:
+            expected.feed_byte(byte)
+
+        # the buffer split at random places, so messages straddle buffers
+        tokens = Tokenizer()
+        parser = mido.Parser()
+        cuts = sorted(rng.sample(range(1, len(stream)), 5))
+        for start, end in zip([0] + cuts, cuts + [len(stream)]):
+            tokens.feed_buffer(stream[start:end])
+            parser.feed(stream[start:end])
+
+        expected = list(expected)
+        assert list(tokens) == expected
+        assert [msg.bytes() for msg in parser] == expected
+
+
+def test_iter_deltas_matches_merge_tracks(midiBytes):
+    midiFile = mido.MidiFile(file=io.BytesIO(midiBytes))
+
+    # what MidiFile.__iter__() did before, through merge_tracks()
+    expected = []
+    tempo = 500000
+    for msg in mido.merge_tracks(midiFile.tracks):
+        expected.append((mido.tick2second(msg.time, midiFile.ticks_per_beat, tempo) if msg.time > 0 else 0, msg))
+        if msg.type == "set_tempo":
+            tempo = msg.tempo
+
+    deltas = list(midiFile.iter_deltas())
+    assert [msg.copy(time=0) for _, msg in deltas] == [msg.copy(time=0) for _, msg in expected]
+    assert [delta for delta, _ in deltas] == pytest.approx([delta for delta, _ in expected], rel=1e-12)
+
+    # the messages aren't copies
+    stored = {id(msg) for track in midiFile.tracks for msg in track}
+    assert all(id(msg) in stored for _, msg in deltas[:-1])
+
+    # and iterating the file copies them with the delta as their time
+    assert [msg.time for msg in midiFile] == [delta for delta, _ in deltas]
+
+
+def test_iter_deltas_type_2():
+    with pytest.raises(TypeError):
+        next(mido.MidiFile(type=2).iter_deltas())
+
+
+def test_intern_message_ignores_time():
+    first = mido.Message("note_on", note=60, velocity=64, time=10)
+    second = mido.Message("note_on", note=60, velocity=64, time=20)
+    interned = intern_message(first)
+    assert interned is intern_message(second)
+    assert interned.time == 0
+    assert intern_message(mido.Message("note_on", note=61)) is not interned
+
+
+def test_iter_track_intern(midiBytes):
+    infile = io.BytesIO(midiBytes)
+    read_file_header(infile)
+    plain = list(iter_track(infile))
+    infile.seek(0)
+    read_file_header(infile)
+    interned = list(iter_track(infile, intern=True))
+
+    assert [msg.copy(time=0) for msg in plain] == [msg for _, msg in interned]
+    assert [msg.time for msg in plain] == [delta for delta, _ in interned]
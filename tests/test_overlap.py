@@ -0,0 +1,76 @@
+"""regression tests for the overlap modes against the list-based reference in benchmarks/overlap_harness.py"""
+import random
+
+import pytest
+
+from MIDIAnimator.src import algorithms
+from MIDIAnimator.src.algorithms import addKeyframesBatch, OVERLAP_FUNCTIONS
+from overlap_harness import randomNotes, toKeyframeArrays, expectedKeys, same, perNote
+
+
+def noteSets(seed, count=200):
+    rng = random.Random(seed)
+    return [randomNotes(rng, rng.randrange(1, 12)) for _ in range(count)]
+
+
+def longNotes(seed, count=20):
+    # notes with many keyframes that overlap each other a lot
+    rng = random.Random(seed)
+    sets = []
+    for _ in range(count):
+        notes = []
+        time = 0.0
+        for _ in range(rng.randrange(2, 6)):
+            time += rng.choice((0, 1, 2))
+            frames = sorted({time} | {time + rng.randrange(1, 40) / 2 for _ in range(12)})
+            values = [rng.choice((-1, 0, 0.5, 1, 2)) for _ in frames]
+            notes.append(list(zip(frames, values)))
+        sets.append(notes)
+    return sets
+
+
+def restingNotes(notes):
+    return [[(frame, 0 if i in (0, len(note) - 1) else value) for i, (frame, value) in enumerate(note)] for note in notes]
+
+
+def countCalls(monkeypatch):
+    calls = []
+    addKeyframes = algorithms.addKeyframes
+    def counted(*args, **kwargs):
+        calls.append(None)
+        return addKeyframes(*args, **kwargs)
+    monkeypatch.setattr(algorithms, "addKeyframes", counted)
+    return calls
+
+
+def test_add_batch_matches_reference(monkeypatch):
+    sets = [restingNotes(notes) for notes in noteSets(seed=1)]
+    calls = countCalls(monkeypatch)
+
+    for notes, expected in zip(sets, expectedKeys(sets, "add")):
+        if expected is not None:
+            assert same(addKeyframesBatch(toKeyframeArrays(notes)), expected, 1e-9), notes
+
+    # every note starts and ends at rest, so the sweep is used
+    assert not calls
+
+
+def test_add_batch_fallback_matches_reference(monkeypatch):
+    # some notes don't start or end at rest
+    sets = [notes for notes in noteSets(seed=2) if any(note[0][1] != 0 or note[-1][1] != 0 for note in notes)]
+    calls = countCalls(monkeypatch)
+
+    for notes, expected in zip(sets, expectedKeys(sets, "add")):
+        if expected is not None:
+            assert same(addKeyframesBatch(toKeyframeArrays(notes)), expected, 1e-9), notes
+
+    assert calls
+
+
+@pytest.mark.parametrize("mode", list(OVERLAP_FUNCTIONS))
+def test_overlap_functions_match_reference(mode):
+    # short overlaps take the scalar path, long ones the NumPy path
+    sets = noteSets(seed=3) + longNotes(seed=4)
+    for notes, expected in zip(sets, expectedKeys(sets, mode)):
+        if expected is not None:
+            assert same(perNote(toKeyframeArrays(notes), mode), expected, 1e-9), notes
@@ -0,0 +1,59 @@
+"""regression tests for `planKeyframesParallel()`"""
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from MIDIAnimator.data_structures import KeyframeArray
+from MIDIAnimator.src import algorithms
+from MIDIAnimator.src.algorithms import planKeyframes, planKeyframesParallel
+
+
+def makeJobs(count):
+    jobs = []
+    for i in range(count):
+        noteKeys = [KeyframeArray([i + n, i + n + 2, i + n + 5], [0, 1 + n, 0]) for n in range(0, 12, 3)]
+        jobs.append((noteKeys, {"mode": "add"}))
+    return jobs
+
+
+def same(keys, expected):
+    return np.array_equal(keys.frames, expected.frames) and np.array_equal(keys.values, expected.values)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="the planning pool is only used on Linux")
+def test_stuck_worker_keeps_finished_results(monkeypatch):
+    jobs = makeJobs(8)
+    expected = [planKeyframes(noteKeys, **options) for noteKeys, options in jobs]
+
+    # the forked workers get stuck on job 3, this process counts the jobs it has to plan again
+    parent = os.getpid()
+    replanned = []
+    original = algorithms.planKeyframes
+    def planKeyframesStuck(noteKeys, **options):
+        if os.getpid() != parent:
+            if noteKeys[0].frames[0] == 3:
+                time.sleep(60)
+        else:
+            replanned.append(noteKeys[0].frames[0])
+        return original(noteKeys, **options)
+
+    monkeypatch.setattr(algorithms, "planKeyframes", planKeyframesStuck)
+    monkeypatch.setattr(algorithms, "PARALLEL_PLANNING_TIMEOUT", 2)
+
+    start = time.monotonic()
+    planned = planKeyframesParallel(jobs, workers=2)
+
+    assert time.monotonic() - start < 10
+    assert replanned == [3]
+    assert all(same(keys, exp) for keys, exp in zip(planned, expected))
+
+
+def test_parallel_matches_serial():
+    jobs = makeJobs(6) + [([], {"mode": "add"})]
+    expected = [planKeyframes(noteKeys, **options) for noteKeys, options in jobs]
+    for workers in (1, 3):
+        planned = planKeyframesParallel(jobs, workers=workers)
+        assert all(same(keys, exp) for keys, exp in zip(planned, expected))
@@ -0,0 +1,57 @@
+"""regression tests for `sampleKeyframes()`"""
+import random
+
+import numpy as np
+import pytest
+
+from MIDIAnimator.data_structures import KeyframeArray
+from MIDIAnimator.src.algorithms import sampleKeyframes, SAMPLED_MODES
+from bench_overlap_envelope import randomNotes
+
+
+def bruteForceSample(notes, mode, grid):
+    """combines the notes on every grid frame one by one"""
+    out = []
+    for frame in grid:
+        playing = [float(np.interp(frame, keys.frames, keys.values)) for keys in notes if keys.frames[0] <= frame <= keys.frames[-1]]
+        if mode == "min":
+            playing = [value for value in playing if value != 0]
+        if not playing:
+            out.append(0)
+        elif mode == "add":
+            out.append(sum(playing))
+        elif mode == "min":
+            out.append(min(playing))
+        elif mode == "max":
+            out.append(max(playing))
+        elif mode == "prev":
+            out.append(playing[0])
+        else:
+            out.append(playing[-1])
+    return np.array(out)
+
+
+@pytest.mark.parametrize("mode", SAMPLED_MODES)
+def test_sampled_matches_brute_force_on_the_grid(mode):
+    # every keyframe of `randomNotes()` is on a multiple of 0.25, so the sampled curve is exact on the grid
+    rng = random.Random(0)
+    for _ in range(200):
+        notes = randomNotes(rng, rng.randrange(1, 8))
+        keys = sampleKeyframes(notes, mode, 0.25)
+        grid = np.arange(keys.frames[0], keys.frames[-1] + 0.125, 0.25)
+        sampled = np.interp(grid, keys.frames, keys.values)
+        assert np.allclose(sampled, bruteForceSample(notes, mode, grid), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("mode", ["rvc", "prune", "nope"])
+def test_sampled_rejects_modes_it_cant_represent(mode):
+    with pytest.raises(ValueError):
+        sampleKeyframes([KeyframeArray([0, 1], [0, 1])], mode)
+
+
+def test_sampled_ignores_float_noise_in_the_slopes():
+    # a ramp sampled on a 0.1 grid has slopes that differ in the last bits
+    keys = sampleKeyframes([KeyframeArray([0, 30], [0, 0.7])], "add", 0.1)
+    assert len(keys) == 4
+    assert np.allclose(keys.frames, [-0.1, 0, 30, 30.1])
+    assert np.allclose(keys.values, [0, 0, 0.7, 0])
@@ -0,0 +1,28 @@
+"""regression tests for `simplifyKeyframes()`"""
+import pytest
+
+from MIDIAnimator.data_structures import KeyframeArray
+from MIDIAnimator.src.algorithms import simplifyKeyframes
+
+
+def simplifiedFrames(values, valueTolerance, frameTolerance=0):
+    keys = KeyframeArray(range(len(values)), values)
+    return simplifyKeyframes(keys, valueTolerance, frameTolerance).frames.tolist()
+
+
+@pytest.mark.parametrize("values, expected", [
+    ([0, 1, 2, 3, 0, 0], [0, 3, 4, 5]),
+    ([0, 0, 0, 5, 0, 0, 0], [0, 2, 3, 4, 6]),
+    ([0, 0, 0, 0], [0, 3]),
+])
+def test_zero_tolerance_removes_collinear_keyframes(values, expected):
+    assert simplifiedFrames(values, 0) == expected
+    # no keyframe is exactly on a line here, so a tiny tolerance must give the same keyframes
+    assert simplifiedFrames(values, 1e-9) == expected
+
+
+def test_zero_value_tolerance_uses_frame_tolerance():
+    # frame 1 has the value the line reaches at frame 1.5, half a frame off
+    assert simplifiedFrames([0, 1, 4], 0) == [0, 1, 2]
+    assert simplifiedFrames([0, 1, 4], 0, frameTolerance=0.5) == [0, 2]
+    assert simplifiedFrames([0, 1, 4], 0, frameTolerance=0.4) == [0, 1, 2]
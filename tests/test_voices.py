@@ -0,0 +1,73 @@
+"""regression tests for `MIDITrack.allocateVoices()` and `maxSimultaneousObjects()`"""
+import random
+
+import pytest
+
+from MIDIAnimator.data_structures import CacheInstance, FrameRange
+from MIDIAnimator.data_structures.midi import MIDITrack, MIDINote
+from MIDIAnimator.src.algorithms import maxSimultaneousObjects, maxSimultaneousObjectsSweep
+
+
+def randomIntervals(rng, count):
+    # whole frames so that notes often end on the frame another one starts, some notes have a length of 0
+    intervals = []
+    for _ in range(count):
+        start = rng.randrange(50)
+        intervals.append((start, start + rng.choice((0, 1, 2, 3, 5, 8))))
+    return intervals
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_voices_match_max_simultaneous_objects_and_cache(seed):
+    intervals = randomIntervals(random.Random(seed), 40)
+    track = MIDITrack("test")
+    track.notes = [MIDINote(0, 60, 100, start, end) for start, end in intervals]
+
+    voiceCount = track.allocateVoices()
+
+    sortedIntervals = sorted(intervals)
+    assert voiceCount == maxSimultaneousObjects(sortedIntervals)
+    assert voiceCount == maxSimultaneousObjectsSweep(intervals)
+
+    # the first-fit cache picks the same object for every note as its voice
+    cache = CacheInstance()
+    for note in sorted(track.notes, key=lambda note: (note.timeOn, note.timeOff)):
+        frameRange = FrameRange(note.timeOn, note.timeOff, None)
+        cache.addObject(frameRange)
+        assert cache.getCache()[note.voice][-1] is frameRange
+    assert len(cache.getCache()) == voiceCount
+
+    # notes on the same voice never overlap
+    byVoice = {}
+    for note in track.notes:
+        byVoice.setdefault(note.voice, []).append((note.timeOn, note.timeOff))
+    for spans in byVoice.values():
+        spans.sort()
+        assert all(end <= nextStart for (_, end), (nextStart, _) in zip(spans, spans[1:]))
+
+
+def test_touching_intervals_reuse_an_object():
+    assert maxSimultaneousObjects([(0, 10), (10, 20)]) == 1
+    assert maxSimultaneousObjectsSweep([(10, 20), (0, 10)]) == 1
+    assert maxSimultaneousObjectsSweep([(5, 5)]) == 1
+    assert maxSimultaneousObjectsSweep([(0, 10), (5, 5), (5, 5)]) == 2
+
+
+def test_heap_and_sweep_match_the_naive_cache():
+    rng = random.Random(0)
+    assert maxSimultaneousObjects([]) == maxSimultaneousObjectsSweep([]) == 0
+
+    for _ in range(50):
+        intervals = []
+        for _ in range(rng.randrange(1, 200)):
+            start = rng.uniform(0, 100)
+            intervals.append((start, start + rng.expovariate(0.2)))
+
+        cache = CacheInstance()
+        for start, end in sorted(intervals):
+            cache.addObject(FrameRange(start, end, None))
+
+        expected = len(cache.getCache())
+        assert maxSimultaneousObjects(sorted(intervals)) == expected
+        # the sweep doesn't need sorted intervals
+        assert maxSimultaneousObjectsSweep(intervals) == expected